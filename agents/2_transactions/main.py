@@ -1,15 +1,16 @@
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
+from azure.ai.projects.aio import AIProjectClient
+from azure.identity.aio import DefaultAzureCredential
 from utilities import Utilities
+from finance_data.tools import async_transactions_functions
 from azure.ai.projects.models import (
     Agent,
     AgentThread,
-    ToolSet,
-    OpenApiTool,
-    OpenApiAnonymousAuthDetails,
+    AsyncToolSet,
+    AsyncFunctionTool,
 )
 
 # Configure logging
@@ -31,7 +32,8 @@ TEMPERATURE = 0.1
 TOP_P = 0.1
 INSTRUCTIONS_FILE = "instructions/agent_instructions.txt"
 
-toolset = ToolSet()  # Changed from AsyncToolSet to SyncToolSet
+# Async tools, so function calls of concurrent runs don't block the event loop
+toolset = AsyncToolSet()
 utilities = Utilities()
 
 project_client = AIProjectClient.from_connection_string(
@@ -41,34 +43,14 @@ project_client = AIProjectClient.from_connection_string(
 
 def add_agent_tools() -> None:
     """Add tools to the agent."""
-    
-    auth = OpenApiAnonymousAuthDetails()
-
-    # Add fetch_data_using_sql_query tool
-    fetch_data_using_sql_query_spec = utilities.read_json_file("openapi_fetch_data_using_sql_query.json")
-    openapi_tool = OpenApiTool(
-        name="fetch_data_using_sql_query",
-        description="Fetch data from the database using a SQL query.",
-        auth=auth,
-        spec=fetch_data_using_sql_query_spec
-    )
-
-    # Add record_transaction tool
-    record_transaction_spec = utilities.read_json_file("openapi_record_transactions_logic_app.json")
-    openapi_tool.add_definition(
-        name="record_transaction",
-        description="Record a transaction in the Transactions table.",
-        auth=auth,
-        spec=record_transaction_spec
-    )
-
-    toolset.add(openapi_tool)
-
-    # Add function tools (if any)
-    # Example: toolset.add(FunctionTool(name="function_name", function=function))
+
+    # Add function tools, served from the per-user cache of finance_data.tools and run on its database executor.
+    # record_transaction and fetch_data_using_sql_query use the connection pool instead of the Logic Apps,
+    # and repeated queries are answered from the query result cache.
+    toolset.add(AsyncFunctionTool(functions=async_transactions_functions))
     return
 
-def initialize() -> tuple[Agent, AgentThread]:
+async def initialize() -> tuple[Agent, AgentThread]:
     """Initialize the agent and its thread."""
 
     if not INSTRUCTIONS_FILE:
@@ -86,7 +68,7 @@ def initialize() -> tuple[Agent, AgentThread]:
         
         print("Creating agent...")
         # Create the agent with the specified model and tools
-        agent = project_client.agents.create_agent(
+        agent = await project_client.agents.create_agent(
             model=MODEL_DEPLOYMENT_NAME,
             name=AGENT_NAME,
             instructions=instructions,
@@ -97,7 +79,7 @@ def initialize() -> tuple[Agent, AgentThread]:
         print(f"Created agent, ID: {agent.id}")
 
         print("Creating thread...")
-        thread = project_client.agents.create_thread()
+        thread = await project_client.agents.create_thread()
         print(f"Created thread, ID: {thread.id}")
 
         return agent, thread
@@ -106,24 +88,24 @@ def initialize() -> tuple[Agent, AgentThread]:
         logger.error("An error occurred initializing the agent: %s", str(e))
         logger.error("Please ensure you've enabled an instructions file.")
 
-def cleanup(agent: Agent, thread: AgentThread) -> None:
+async def cleanup(agent: Agent, thread: AgentThread) -> None:
     """Cleanup resources."""
     # Close the project client connection
-    project_client.agents.delete_thread(thread.id)
-    project_client.agents.delete_agent(agent.id)
-    project_client.close()
+    await project_client.agents.delete_thread(thread.id)
+    await project_client.agents.delete_agent(agent.id)
+    await project_client.close()
 
-def post_message(thread_id: str, content: str, agent: Agent, thread: AgentThread) -> None:
+async def post_message(thread_id: str, content: str, agent: Agent, thread: AgentThread) -> None:
     """Post a message to the Azure AI Agent Service."""
     try:
         # Create a new message in the thread
-        project_client.agents.create_message(
+        await project_client.agents.create_message(
             thread_id=thread_id,
             content=content,
             role="user",
         )
         
-        stream = project_client.agents.create_stream(
+        stream = await project_client.agents.create_stream(
             thread_id=thread.id,
             agent_id=agent.id,
             max_completion_tokens=MAX_COMPLETION_TOKENS,
@@ -132,17 +114,17 @@ def post_message(thread_id: str, content: str, agent: Agent, thread: AgentThread
             top_p=TOP_P,
             instructions=agent.instructions,
         )
-        with stream as s:
-            s.until_done()
+        async with stream as s:
+            await s.until_done()
 
     except Exception as e:
         logging.error(f"An error occurred while posting a message: {e}")
 
-def main() -> None:
+async def main() -> None:
     """
     Example questions to ask the agent: Add an expense of $50 for groceries, from today.
     """
-    agent, thread = initialize()
+    agent, thread = await initialize()
     if not agent or not thread:
         print("Failed to initialize agent or thread.")
         print("Exiting...")
@@ -151,8 +133,8 @@ def main() -> None:
     cmd = None
 
     while True:
-        prompt = input(
-            f"\n\nEnter your query (type exit or save to finish):").strip()
+        prompt = (await asyncio.to_thread(input,
+            f"\n\nEnter your query (type exit or save to finish):")).strip()
         if not prompt:
             continue
 
@@ -160,18 +142,19 @@ def main() -> None:
         if cmd in {"exit", "save"}:
             break
 
-        post_message(agent=agent, thread_id=thread.id, content=prompt, thread=thread)
+        await post_message(agent=agent, thread_id=thread.id, content=prompt, thread=thread)
 
     if cmd == "save":
         print("The agent has not been deleted, so you can continue experimenting with it in the Azure AI Foundry.")
         print(
             f"Navigate to https://ai.azure.com, select your project, then playgrounds, agents playgound, then select agent id: {agent.id}"
         )
+        await project_client.close()
     else:
-        cleanup(agent, thread)
+        await cleanup(agent, thread)
         print("The agent resources have been cleaned up.")
 
 if __name__ == "__main__":
     print("Starting program...")
-    main()  # Direct call instead of asyncio.run()
+    asyncio.run(main())
     print("Program finished.")
\ No newline at end of file
@@ -54,4 +54,69 @@ CREATE TABLE Budget (
     CONSTRAINT FK_Budget_Categories FOREIGN KEY (CategoryId) REFERENCES Categories(Id),
     CONSTRAINT FK_Budget_Users FOREIGN KEY (UserId) REFERENCES Users(Id),
     CONSTRAINT UQ_Budget UNIQUE (CategoryId, Year, Month, UserId)
-);
\ No newline at end of file
+);
+
+-- MonthlySummary table: totals of Transactions per user, month, category and type, kept up to date on every write.
+-- Use it instead of Transactions for totals by category or month, monthly evolution, budget compliance
+-- (join Budget on UserId, CategoryId, Year and Month), net balance and year-over-year comparisons.
+-- Use Transactions only when the analysis needs individual transactions or days (weekdays, frequency, outliers).
+CREATE TABLE MonthlySummary (
+    UserId INT NOT NULL,
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Type NVARCHAR(50) NOT NULL,
+    Total DECIMAL(14, 2) NOT NULL, -- SUM(Amount)
+    TransactionCount INT NOT NULL, -- COUNT(*)
+    MinAmount DECIMAL(10, 2) NOT NULL, -- MIN(Amount)
+    MaxAmount DECIMAL(10, 2) NOT NULL, -- MAX(Amount)
+    CONSTRAINT PK_MonthlySummary PRIMARY KEY (UserId, Year, Month, CategoryId, Type)
+);
+
+-- Expense forecasts per user, category and month (the current month and the next ones), recomputed nightly
+-- from the monthly history with a trend and seasonal model. Keyed like Budget; use it for projections and
+-- to tell whether the user will exceed a budget before the end of the month, instead of extrapolating transactions.
+CREATE TABLE SpendingForecasts (
+    UserId INT NOT NULL,
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Forecast DECIMAL(14, 2) NOT NULL, -- Expected expenses of the whole month
+    Lower DECIMAL(14, 2) NOT NULL, -- 80% interval
+    Upper DECIMAL(14, 2) NOT NULL,
+    SpentToDate DECIMAL(14, 2) NOT NULL, -- Expenses already recorded in the month when the forecast was computed
+    Budget DECIMAL(10, 2) NULL, -- Budget of the category and month, if any
+    ExceedProbability DECIMAL(5, 4) NULL, -- Probability (0-1) of ending the month above the budget
+    Method NVARCHAR(20) NOT NULL, -- seasonal, trend, mean or run-rate, by months of history
+    ComputedAt DATETIME2 NOT NULL,
+    CONSTRAINT PK_SpendingForecasts PRIMARY KEY (UserId, Year, Month, CategoryId)
+);
+
+-- Running statistics of the amounts per user, category and type, updated as each transaction is recorded
+-- (Mean and M2 with Welford's algorithm; Median and Mad, the median absolute deviation, are streaming estimates).
+CREATE TABLE CategoryStatistics (
+    UserId INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Type NVARCHAR(50) NOT NULL,
+    Count INT NOT NULL,
+    Mean FLOAT NOT NULL,
+    M2 FLOAT NOT NULL, -- Sum of squared deviations from the mean; variance = M2 / (Count - 1)
+    Median FLOAT NOT NULL,
+    Mad FLOAT NOT NULL,
+    CONSTRAINT PK_CategoryStatistics PRIMARY KEY (UserId, CategoryId, Type)
+);
+
+-- Transactions flagged when recorded because their amount was far above the usual ones of their category.
+-- Use it for unusual transactions instead of computing statistics over Transactions; join Transactions on Id
+-- for the description and account.
+CREATE TABLE TransactionOutliers (
+    TransactionId INT PRIMARY KEY, -- FK to Transactions(Id)
+    UserId INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Type NVARCHAR(50) NOT NULL,
+    Date DATETIME2 NOT NULL,
+    Amount DECIMAL(10, 2) NOT NULL,
+    UsualAmount DECIMAL(10, 2) NOT NULL, -- Median amount of the category when the transaction was recorded
+    ZScore FLOAT NOT NULL, -- Standard deviations above the mean
+    RobustScore FLOAT NOT NULL -- Distance from the median in MADs
+);
@@ -0,0 +1,78 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+class AgentDefinitionCache:
+    """
+    Process-wide TTL cache for Azure AI Agent definitions.
+    Missing definitions are fetched concurrently; expired ones are served as-is
+    while a background task refreshes them, so a warm cache never blocks chat start.
+    """
+
+    def __init__(self, fetch: Callable[..., Awaitable[Any]], ttl_seconds: float = 900):
+        self._fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, tuple[Any, float]] = {}
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get_many(self, agent_ids: list[str]) -> list[Any]:
+        """Return the definitions for the given agent IDs, in the same order."""
+        # Snapshot, so an invalidate() while this call awaits the lock or a fetch can't drop entries under it
+        entries = {agent_id: self._entries.get(agent_id) for agent_id in agent_ids}
+        missing = [agent_id for agent_id, entry in entries.items() if entry is None]
+        if missing:
+            async with self._lock:
+                # Another session may have loaded them while we were waiting
+                entries.update({agent_id: self._entries.get(agent_id) for agent_id in missing})
+                loading = [agent_id for agent_id in missing if entries[agent_id] is None]
+                if loading:
+                    self.misses += len(loading)
+                    entries.update(await self._load(loading))
+
+        self.hits += len(agent_ids) - len(missing)
+
+        now = time.monotonic()
+        stale = [agent_id for agent_id, entry in entries.items() if now - entry[1] > self.ttl_seconds]
+        if stale:
+            self._schedule_refresh(stale)
+
+        return [entries[agent_id][0] for agent_id in agent_ids]
+
+    async def get(self, agent_id: str) -> Any:
+        """Return a single agent definition."""
+        definitions = await self.get_many([agent_id])
+        return definitions[0]
+
+    def invalidate(self, agent_id: str | None = None) -> None:
+        """Drop one cached definition, or all of them."""
+        if agent_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(agent_id, None)
+
+    async def _load(self, agent_ids: list[str]) -> dict[str, tuple[Any, float]]:
+        definitions = await asyncio.gather(*(self._fetch(agent_id=agent_id) for agent_id in agent_ids))
+        fetched_at = time.monotonic()
+        loaded = {agent_id: (definition, fetched_at) for agent_id, definition in zip(agent_ids, definitions)}
+        self._entries.update(loaded)
+        return loaded
+
+    def _schedule_refresh(self, agent_ids: list[str]) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._refresh(agent_ids))
+
+    async def _refresh(self, agent_ids: list[str]) -> None:
+        try:
+            await self._load(agent_ids)
+            self.refreshes += 1
+        except Exception as e:
+            # Keep serving the previous definitions; the next access retries
+            logger.warning("Failed to refresh agent definitions %s: %s", agent_ids, e)
@@ -0,0 +1,58 @@
+"""
+Benchmark the receipt preprocessing stage over sample images.
+
+For each image reports the bytes and estimated vision tokens before and after preprocessing,
+then the throughput of the worker pool when many receipts arrive at once.
+
+Usage (from the app folder):
+    python benchmarks/bench_preprocess.py [images...] [--copies 32] [--workers 4]
+"""
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_processing import ReceiptPreprocessor, preprocess_image
+
+SAMPLE_IMAGES = [
+    Path(__file__).resolve().parents[2] / "agents" / "2_transactions" / "files" / "restaurant-bar-receipt-sample.jpg",
+]
+
+async def run_pool(preprocessor: ReceiptPreprocessor, images: list[str]) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(preprocessor.process(image) for image in images))
+    return time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("images", nargs="*", type=Path, default=SAMPLE_IMAGES)
+    parser.add_argument("--copies", type=int, default=32, help="Receipts submitted at once to the pool")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-long-edge", type=int, default=1568)
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'image':<40} {'bytes before':>14} {'bytes after':>12} {'tokens before':>14} {'tokens after':>13} {'ms':>7}")
+        for image in args.images:
+            start = time.perf_counter()
+            result = preprocess_image(str(image), str(Path(tmp) / f"{image.stem}.jpg"), args.max_long_edge, args.quality)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(
+                f"{image.name:<40} {result.original_bytes:>14,} {result.processed_bytes:>12,} "
+                f"{result.original_tokens:>14} {result.processed_tokens:>13} {elapsed_ms:>7.1f}"
+            )
+
+        preprocessor = ReceiptPreprocessor(max_workers=args.workers, max_long_edge=args.max_long_edge, quality=args.quality, output_dir=tmp)
+        batch = [str(image) for image in args.images] * args.copies
+        elapsed = asyncio.run(run_pool(preprocessor, batch))
+        preprocessor.shutdown()
+        print(f"\npool: {len(batch)} images in {elapsed:.2f} s ({len(batch) / elapsed:.1f} images/s with {args.workers} workers)")
+        print(f"saved {preprocessor.metrics.bytes_saved:,} bytes and ~{preprocessor.metrics.tokens_saved:,} image tokens")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark the local agent router on a labeled turn corpus.
+
+Reports coverage (turns answered without the LLM), precision of the routed turns,
+router latency and the selection LLM time saved for an assumed round trip.
+
+Usage (from the app folder):
+    python benchmarks/bench_router.py [--llm-ms 900] [--repeat 200]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from router import AgentRouter, Turn
+
+CORPUS_FILE = Path(__file__).parent / "router_corpus.json"
+
+def load_corpus(path: Path) -> list[tuple[list[Turn], str]]:
+    samples = []
+    with path.open("r", encoding="utf-8") as file:
+        for item in json.load(file):
+            turns = [Turn(role=h["role"], text=h["text"], name=h["name"]) for h in item["history"]]
+            turns.append(Turn(role="user", text=item["message"], has_image=item["has_image"]))
+            samples.append((turns, item["expected"]))
+    return samples
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=900.0, help="Assumed latency of one selection LLM call")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the corpus used to time the router")
+    args = parser.parse_args()
+
+    samples = load_corpus(CORPUS_FILE)
+    router = AgentRouter(
+        host_agent_name="HostAgent",
+        setup_agent_name="SetupAgent",
+        transactions_agent_name="TransactionsAgent",
+        analyzer_agent_name="AnalyzerAgent",
+    )
+
+    routed = correct = 0
+    errors = []
+    for turns, expected in samples:
+        agent = router.route(turns)
+        if agent is None:
+            continue
+        routed += 1
+        if agent == expected:
+            correct += 1
+        else:
+            errors.append((turns[-1].text, expected, agent))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for turns, _ in samples:
+            router.route(turns)
+    elapsed = time.perf_counter() - start
+    per_turn_us = elapsed / (args.repeat * len(samples)) * 1e6
+
+    total = len(samples)
+    print(f"Turns:            {total}")
+    print(f"Routed locally:   {routed} ({routed / total:.0%} coverage)")
+    print(f"Precision:        {correct}/{routed} ({correct / routed if routed else 0:.0%})")
+    print(f"Router latency:   {per_turn_us:.1f} us/turn")
+    print(f"LLM time saved:   {routed * args.llm_ms / 1000:.1f} s over the corpus (at {args.llm_ms:.0f} ms/call)")
+    for text, expected, agent in errors:
+        print(f"  mis-routed: {text!r} -> {agent} (expected {expected})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark websocket frames and CPU time of streamed answers.
+
+Simulates N concurrent answers of M tokens each, with a small delay between tokens, sent
+either one frame per token (the previous path) or through the TokenCoalescer. Each frame
+serializes a payload like Chainlit does before writing to the socket.
+
+Usage (from the app folder):
+    python benchmarks/bench_streaming.py [--answers 200] [--tokens 300] [--token-ms 2]
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from streaming import TokenCoalescer
+
+class SocketMessage:
+    """Stand-in for cl.Message that serializes one frame per stream_token call."""
+    frames = 0
+
+    def __init__(self):
+        self.author = None
+        self.content = ""
+
+    async def stream_token(self, token: str) -> None:
+        self.content += token
+        json.dumps({"id": id(self), "author": self.author, "token": token, "isSequence": False})
+        SocketMessage.frames += 1
+        await asyncio.sleep(0)
+
+async def per_token_answer(tokens: list[str], token_delay: float) -> None:
+    answer = SocketMessage()
+    for token in tokens:
+        await asyncio.sleep(token_delay)
+        answer.author = "TransactionsAgent"
+        await answer.stream_token(token)
+
+async def coalesced_answer(tokens: list[str], token_delay: float, max_chars: int, max_delay: float) -> None:
+    answer = SocketMessage()
+    stream = TokenCoalescer(answer, max_chars=max_chars, max_delay=max_delay)
+    for token in tokens:
+        await asyncio.sleep(token_delay)
+        await stream.add("TransactionsAgent", token)
+    await stream.close()
+
+async def run(label: str, answers: int, make_answer) -> None:
+    SocketMessage.frames = 0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(make_answer() for _ in range(answers)))
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    print(f"{label:<10} frames {SocketMessage.frames:>8,} ({SocketMessage.frames / answers:7.1f}/answer)   cpu {cpu:6.2f} s   wall {wall:6.2f} s")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--max-chars", type=int, default=64)
+    parser.add_argument("--max-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    tokens = [f"tok{i % 10} " for i in range(args.tokens)]
+    token_delay = args.token_ms / 1000
+    asyncio.run(run("per-token", args.answers, lambda: per_token_answer(tokens, token_delay)))
+    asyncio.run(run("coalesced", args.answers, lambda: coalesced_answer(tokens, token_delay, args.max_chars, args.max_ms / 1000)))
+
+if __name__ == "__main__":
+    main()
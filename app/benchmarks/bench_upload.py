@@ -0,0 +1,94 @@
+"""
+Benchmark receipt uploads offline with the local filesystem backend.
+
+Compares the previous blocking path (synchronous read and write inside the event loop, no
+de-duplication) with the async ReceiptUploader, while N concurrent sessions upload receipts
+of which a share are re-sent. A fixed per-request latency stands in for the network round trip.
+Reports wall time, bytes written and the worst event-loop stall.
+
+Usage (from the app folder):
+    python benchmarks/bench_upload.py [--sessions 50] [--size-kb 2048] [--duplicates 0.3] [--latency-ms 80]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from blob_storage import LocalFileBackend, ReceiptUploader
+
+class DelayedBackend(LocalFileBackend):
+    """Local backend with a simulated network round trip per upload."""
+
+    def __init__(self, root: Path, latency: float):
+        super().__init__(root)
+        self.latency = latency
+
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        await asyncio.sleep(self.latency)
+        return await super().upload(blob_name, data, content_type)
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Return the worst delay observed between two ticks of the event loop."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def blocking_upload(file_path: Path, target: Path, latency: float) -> None:
+    # Same shape as the previous synchronous upload: blocking I/O inside a coroutine
+    data = file_path.read_bytes()
+    time.sleep(latency)
+    (target / f"{file_path.name}-{time.perf_counter_ns()}").write_bytes(data)
+
+async def run(label: str, files: list[Path], upload) -> None:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(file_path) for file_path in files))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag_task
+    print(f"{label:<10} {elapsed * 1000:8.1f} ms total   worst loop stall {worst_lag * 1000:6.1f} ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Share of uploads that re-send a previous receipt")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Simulated network latency per upload")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sources = tmp / "sources"
+        sources.mkdir()
+        files = []
+        for i in range(args.sessions):
+            if files and random.random() < args.duplicates:
+                files.append(random.choice(files))
+                continue
+            path = sources / f"receipt-{i}.jpg"
+            path.write_bytes(os.urandom(args.size_kb * 1024))
+            files.append(path)
+
+        blocking_target = tmp / "blocking"
+        blocking_target.mkdir()
+        asyncio.run(run("blocking", files, lambda path: blocking_upload(path, blocking_target, args.latency_ms / 1000)))
+
+        uploader = ReceiptUploader(DelayedBackend(tmp / "async", args.latency_ms / 1000))
+        asyncio.run(run("async", files, uploader.upload_file))
+
+        blocking_bytes = sum(f.stat().st_size for f in blocking_target.iterdir())
+        print(f"bytes written: blocking {blocking_bytes:,}   async {uploader.metrics.bytes_uploaded:,}"
+              f"   ({uploader.metrics.deduplicated} duplicate uploads skipped)")
+
+if __name__ == "__main__":
+    main()
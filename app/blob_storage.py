@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class BlobStorageBackend(ABC):
+    """Storage target for uploaded files."""
+
+    @abstractmethod
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        """Store the data under blob_name (if not already there) and return its URL."""
+
+    async def close(self) -> None:
+        return None
+
+class AzureBlobBackend(BlobStorageBackend):
+    """Azure Blob Storage backend with one long-lived async client and a one-time container check."""
+
+    def __init__(self, account_url: str, container_name: str):
+        # Imported here so the local backend works without the Azure SDK installed
+        from azure.identity.aio import DefaultAzureCredential
+        from azure.storage.blob.aio import BlobServiceClient
+
+        self.container_name = container_name
+        self._credential = DefaultAzureCredential()
+        self._service_client = BlobServiceClient(account_url, credential=self._credential)
+        self._container_client = self._service_client.get_container_client(container_name)
+        self._container_ready = False
+        self._container_lock = asyncio.Lock()
+
+    async def _ensure_container(self) -> None:
+        if self._container_ready:
+            return
+        async with self._container_lock:
+            if not self._container_ready:
+                # Create the container if it doesn't exist
+                if not await self._container_client.exists():
+                    await self._container_client.create_container()
+                    logger.info("Container '%s' created", self.container_name)
+                self._container_ready = True
+
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        from azure.core.exceptions import ResourceExistsError
+        from azure.storage.blob import ContentSettings
+
+        await self._ensure_container()
+        blob_client = self._container_client.get_blob_client(blob_name)
+        try:
+            # Blob names are content hashes, so an existing blob already holds the same bytes
+            await blob_client.upload_blob(
+                data,
+                overwrite=False,
+                content_settings=ContentSettings(content_type=content_type) if content_type else None,
+            )
+        except ResourceExistsError:
+            logger.info("Blob '%s' already exists, upload skipped", blob_name)
+        return blob_client.url
+
+    async def close(self) -> None:
+        await self._service_client.close()
+        await self._credential.close()
+
+class LocalFileBackend(BlobStorageBackend):
+    """Local filesystem backend, for offline tests and benchmarks."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    async def upload(self, blob_name: str, data: bytes, content_type: str | None = None) -> str:
+        path = self.root / blob_name
+        if not path.exists():
+            await asyncio.to_thread(path.write_bytes, data)
+        return path.resolve().as_uri()
+
+@dataclass
+class UploadMetrics:
+    uploads: int = 0
+    deduplicated: int = 0
+    bytes_uploaded: int = 0
+
+class ReceiptUploader:
+    """
+    Async uploader that names blobs by content hash.
+    A file recently uploaded by this process (or being uploaded right now) is never sent twice;
+    the URLs of the last max_remembered uploads are kept, least recently used evicted first.
+    Older ones are sent again and skipped by the backend, since the blob already exists.
+    """
+
+    def __init__(self, backend: BlobStorageBackend, max_remembered: int = 1024):
+        self.backend = backend
+        self.max_remembered = max_remembered
+        self.metrics = UploadMetrics()
+        self._uploaded: OrderedDict[str, str] = OrderedDict()
+        self._pending: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def blob_name_for(data: bytes, file_name: str) -> str:
+        """Content-addressed blob name that keeps the original file extension."""
+        return hashlib.sha256(data).hexdigest() + Path(file_name).suffix.lower()
+
+    async def upload_file(self, file_path: str, file_name: str | None = None) -> str:
+        file_name = file_name or Path(file_path).name
+        # Read and hash off the event loop
+        data, blob_name = await asyncio.to_thread(self._read_and_name, file_path, file_name)
+        return await self._upload(data, file_name, blob_name)
+
+    async def upload_bytes(self, data: bytes, file_name: str) -> str:
+        blob_name = await asyncio.to_thread(self.blob_name_for, data, file_name)
+        return await self._upload(data, file_name, blob_name)
+
+    def _read_and_name(self, file_path: str, file_name: str) -> tuple[bytes, str]:
+        data = Path(file_path).read_bytes()
+        return data, self.blob_name_for(data, file_name)
+
+    async def _upload(self, data: bytes, file_name: str, blob_name: str) -> str:
+        url = self._uploaded.get(blob_name)
+        if url is not None:
+            self._uploaded.move_to_end(blob_name)
+            self.metrics.deduplicated += 1
+            return url
+
+        # Concurrent uploads of the same content share a single request
+        task = self._pending.get(blob_name)
+        if task is not None:
+            self.metrics.deduplicated += 1
+            return await task
+
+        content_type = mimetypes.guess_type(file_name)[0]
+        task = asyncio.ensure_future(self.backend.upload(blob_name, data, content_type))
+        self._pending[blob_name] = task
+        try:
+            url = await task
+        finally:
+            self._pending.pop(blob_name, None)
+
+        self._uploaded[blob_name] = url
+        if len(self._uploaded) > self.max_remembered:
+            self._uploaded.popitem(last=False)
+        self.metrics.uploads += 1
+        self.metrics.bytes_uploaded += len(data)
+        return url
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import datetime
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Alerts the TransactionsAgent raised and the user hasn't seen yet (a filtered index seek)
+PENDING_ALERTS_SQL = """
+SELECT a.Id, c.Name, a.Kind, a.Spent, a.Budget, a.Projected
+FROM BudgetAlerts a JOIN Categories c ON c.Id = a.CategoryId
+WHERE a.UserId = ? AND a.DeliveredAt IS NULL
+ORDER BY a.Id
+"""
+MARK_DELIVERED_SQL = "UPDATE BudgetAlerts SET DeliveredAt = ? WHERE Id = ? AND DeliveredAt IS NULL"
+
+@dataclass
+class BudgetAlert:
+    id: int
+    category: str
+    kind: str
+    spent: float
+    budget: float
+    projected: float | None = None
+
+    def to_message(self) -> str:
+        if self.kind == "projected":
+            return (f"📈 At this pace your **{self.category}** expenses will reach about {self.projected:.2f} this month, "
+                    f"above your budget of {self.budget:.2f} ({self.spent:.2f} spent so far).")
+        if self.spent >= self.budget:
+            return f"🚨 You have exceeded your **{self.category}** budget this month: {self.spent:.2f} spent of {self.budget:.2f}."
+        return (f"⚠️ You have spent {self.spent / self.budget:.0%} of your **{self.category}** budget this month "
+                f"({self.spent:.2f} of {self.budget:.2f}).")
+
+class BudgetAlertInbox:
+    """
+    Hands out the budget alerts written to BudgetAlerts by the TransactionsAgent, each one once.
+    It is read when the session starts and after the turns that recorded transactions, never polled,
+    through the connection pool of the data layer (finance_data.tools.pool).
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.delivered = 0
+
+    def take(self, user_id: int) -> list[BudgetAlert]:
+        with self.pool.connection() as conn:
+            alerts = [BudgetAlert(row[0], row[1], row[2], float(row[3]), float(row[4]), None if row[5] is None else float(row[5]))
+                      for row in conn.execute(PENDING_ALERTS_SQL, (user_id,)).fetchall()]
+            delivered_at = datetime.datetime.now().replace(microsecond=0).isoformat()
+            taken = []
+            for alert in alerts:
+                # Another session of the user may have taken it in the meantime
+                if conn.execute(MARK_DELIVERED_SQL, (delivered_at, alert.id)).rowcount:
+                    taken.append(alert)
+            conn.commit()
+        self.delivered += len(taken)
+        return taken
+
+    async def deliver(self, user_id: int, send) -> int:
+        """Send the pending alerts of the user with send(text); returns how many were sent."""
+        try:
+            alerts = await asyncio.to_thread(self.take, user_id)
+        except Exception as e:
+            # Alerts stay pending and are sent after the next write
+            logger.warning("Could not load the budget alerts of user %s: %s", user_id, e)
+            return 0
+        for alert in alerts:
+            await send(alert.to_message())
+        return len(alerts)
@@ -0,0 +1,112 @@
+import sys
+import logging
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatHistoryReducer, ChatMessageContent
+
+if sys.version_info >= (3, 11):
+    from typing import Self
+else:
+    from typing_extensions import Self
+
+logger = logging.getLogger(__name__)
+
+# Metadata flag of the messages the reducer never drops (the user-ID/date context message)
+PINNED_METADATA_KEY = "pinned"
+# What a pinned message is about; a newer pinned message with the same key replaces it
+PIN_KEY_METADATA_KEY = "pin_key"
+
+SUMMARIZATION_INSTRUCTIONS = """
+Update the running summary of a conversation between a user and the agents of a personal finance app.
+Keep the facts other agents need to continue: the user's goal, accounts, categories, amounts, dates,
+what was already recorded and what is still pending. Drop greetings and repetitions.
+Answer only with the updated summary, in at most {max_words} words.
+"""
+
+def is_pinned(message: ChatMessageContent) -> bool:
+    return message.metadata.get(PINNED_METADATA_KEY) == "true"
+
+def latest_pinned(messages: list[ChatMessageContent]) -> list[ChatMessageContent]:
+    """The pinned messages not replaced by a newer one with the same key, in history order."""
+    latest = {message.metadata.get(PIN_KEY_METADATA_KEY, ""): message for message in messages if is_pinned(message)}
+    return [message for message in messages if is_pinned(message) and latest[message.metadata.get(PIN_KEY_METADATA_KEY, "")] is message]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+def message_tokens(message: ChatMessageContent) -> int:
+    # A few tokens of overhead for the role and name of each message
+    return estimate_tokens(message.content or "") + 4
+
+class TokenBudgetSummarizationReducer(ChatHistoryReducer):
+    """
+    Chat history reducer that keeps the prompt under a token budget.
+    The latest pinned message of each key is always kept (older ones are dropped), the most recent messages are kept verbatim and older ones
+    are folded into a rolling summary. Only messages not summarized yet are sent to the model,
+    so each reduction costs one small call at most.
+    """
+
+    service: ChatCompletionClientBase | None = None
+    max_tokens: int = 3000
+    # After a reduction the history is brought down to this share of max_tokens, so the next turns don't reduce again
+    reduce_to_ratio: float = 0.6
+    summary_max_words: int = 150
+    summary: str = ""
+    summarized_count: int = 0
+
+    async def reduce(self) -> Self | None:
+        pinned = latest_pinned(self.messages)
+        conversation = [message for message in self.messages if not is_pinned(message)]
+        replaced = len(conversation) + len(pinned) < len(self.messages)
+
+        fixed_tokens = sum(message_tokens(message) for message in pinned) + estimate_tokens(self.summary)
+        recent = conversation[self.summarized_count:]
+        if fixed_tokens + sum(message_tokens(message) for message in recent) <= self.max_tokens:
+            if not self.summary and not replaced:
+                return None
+            self.messages = pinned + ([self._summary_message()] if self.summary else []) + recent
+            return self
+
+        # Keep the newest messages that fit the reduced budget, always at least target_count of them
+        budget = self.max_tokens * self.reduce_to_ratio - fixed_tokens
+        keep_from = len(conversation)
+        used = 0
+        while keep_from > self.summarized_count:
+            cost = message_tokens(conversation[keep_from - 1])
+            if used + cost > budget and len(conversation) - keep_from >= self.target_count:
+                break
+            used += cost
+            keep_from -= 1
+
+        if keep_from > self.summarized_count:
+            self.summary = await self._summarize(conversation[self.summarized_count:keep_from])
+            self.summarized_count = keep_from
+
+        self.messages = pinned + [self._summary_message()] + conversation[self.summarized_count:]
+        return self
+
+    def _summary_message(self) -> ChatMessageContent:
+        return ChatMessageContent(role=AuthorRole.ASSISTANT, content=f"SUMMARY OF THE EARLIER CONVERSATION:\n{self.summary}")
+
+    async def _summarize(self, messages: list[ChatMessageContent]) -> str:
+        transcript = "\n".join(f"{message.name or message.role.value}: {message.content}" for message in messages if message.content)
+        if self.service is not None:
+            chat_history = ChatHistory(system_message=SUMMARIZATION_INSTRUCTIONS.format(max_words=self.summary_max_words))
+            chat_history.add_user_message(f"CURRENT SUMMARY:\n{self.summary or '(empty)'}\n\nNEW MESSAGES:\n{transcript}")
+            try:
+                settings = self.service.get_prompt_execution_settings_class()()
+                response = await self.service.get_chat_message_content(chat_history, settings)
+                if response is not None and response.content:
+                    return response.content.strip()
+            except Exception as e:
+                logger.warning("History summarization failed, falling back to an extractive summary: %s", e)
+
+        # Extractive fallback: one line per new message, dropping the oldest lines beyond the word limit
+        lines = self.summary.splitlines() if self.summary else []
+        for message in messages:
+            text = (message.content or "").strip()
+            if text:
+                lines.append(f"- {message.name or message.role.value}: {text.splitlines()[0][:200]}")
+        while len(lines) > 1 and sum(len(line.split()) for line in lines) > self.summary_max_words:
+            lines.pop(0)
+        return "\n".join(lines)
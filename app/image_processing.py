@@ -0,0 +1,163 @@
+import os
+import math
+import shutil
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageFilter, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Smallest share of the photo the detected document must cover to be cropped
+MIN_DOCUMENT_AREA = 0.2
+
+@dataclass
+class PreprocessResult:
+    """Outcome of preprocessing one image."""
+    path: str
+    original_bytes: int
+    processed_bytes: int
+    original_tokens: int
+    processed_tokens: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.processed_tokens
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estimate the vision tokens of an image sent with high detail.
+    The image is fit in 2048x2048, its short side scaled to 768, and each 512px tile costs 170 tokens plus 85 base tokens.
+    """
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+def otsu_threshold(histogram: list[int]) -> int:
+    """Gray level that best separates the histogram into background and foreground."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background_count = background_sum = 0
+    best_level, best_variance = 0, 0.0
+    for level, count in enumerate(histogram):
+        background_count += count
+        if background_count == 0:
+            continue
+        foreground_count = total - background_count
+        if foreground_count == 0:
+            break
+        background_sum += level * count
+        background_mean = background_sum / background_count
+        foreground_mean = (weighted_total - background_sum) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+def crop_to_document(image: Image.Image, margin: float = 0.02) -> Image.Image:
+    """Crop the photo to the bright paper area; the image is returned unchanged when no document is found."""
+    preview = ImageOps.grayscale(image)
+    preview.thumbnail((256, 256))
+    threshold = otsu_threshold(preview.histogram())
+    mask = preview.point(lambda level: 255 if level > threshold else 0).filter(ImageFilter.MedianFilter(5))
+    box = mask.getbbox()
+    if box is None:
+        return image
+
+    left, top, right, bottom = box
+    if (right - left) * (bottom - top) < MIN_DOCUMENT_AREA * preview.width * preview.height:
+        return image
+
+    # Scale the box back to the full resolution image and keep a small margin
+    scale_x, scale_y = image.width / preview.width, image.height / preview.height
+    pad_x, pad_y = image.width * margin, image.height * margin
+    return image.crop((
+        max(0, int(left * scale_x - pad_x)),
+        max(0, int(top * scale_y - pad_y)),
+        min(image.width, int(right * scale_x + pad_x)),
+        min(image.height, int(bottom * scale_y + pad_y)),
+    ))
+
+def preprocess_image(source_path: str, target_path: str, max_long_edge: int = 1568, quality: int = 80) -> PreprocessResult:
+    """Fix the EXIF orientation, crop to the document, convert to grayscale, downscale and re-encode as JPEG."""
+    original_bytes = os.path.getsize(source_path)
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        original_tokens = estimate_image_tokens(*image.size)
+
+        image = crop_to_document(image)
+        image = ImageOps.grayscale(image)
+        image.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+        image.save(target_path, "JPEG", quality=quality, optimize=True)
+        processed_tokens = estimate_image_tokens(*image.size)
+
+    processed_bytes = os.path.getsize(target_path)
+    if processed_bytes >= original_bytes:
+        # Already small: keep the original file
+        os.remove(target_path)
+        return PreprocessResult(source_path, original_bytes, original_bytes, original_tokens, original_tokens)
+
+    return PreprocessResult(target_path, original_bytes, processed_bytes, original_tokens, processed_tokens)
+
+@dataclass
+class PreprocessMetrics:
+    images: int = 0
+    bytes_saved: int = 0
+    tokens_saved: int = 0
+
+class ReceiptPreprocessor:
+    """
+    Runs preprocess_image in a process pool so the event loop never does the pixel work.
+    The processed images are temporary files: discard() each result once it has been uploaded.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_long_edge: int = 1568, quality: int = 80, output_dir: str | None = None):
+        self.max_workers = max_workers
+        self.max_long_edge = max_long_edge
+        self.quality = quality
+        self._owns_output_dir = output_dir is None
+        self.output_dir = Path(output_dir or tempfile.mkdtemp(prefix="receipts-"))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.metrics = PreprocessMetrics()
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def process(self, source_path: str) -> PreprocessResult:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        target_path = self.output_dir / f"{Path(source_path).stem}-{os.urandom(4).hex()}.jpg"
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._executor, preprocess_image, source_path, str(target_path), self.max_long_edge, self.quality,
+        )
+
+        self.metrics.images += 1
+        self.metrics.bytes_saved += result.bytes_saved
+        self.metrics.tokens_saved += result.tokens_saved
+        logger.debug(
+            "Preprocessed '%s': %s -> %s bytes, ~%s -> %s image tokens",
+            source_path, result.original_bytes, result.processed_bytes, result.original_tokens, result.processed_tokens,
+        )
+        return result
+
+    def discard(self, result: PreprocessResult) -> None:
+        """Delete the processed image of a result; the original file is never touched."""
+        path = Path(result.path)
+        if path.parent == self.output_dir:
+            path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._owns_output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
@@ -1,5 +1,9 @@
 import os
+import asyncio
+import logging
 import datetime
+from copy import deepcopy
+from pathlib import Path
 from dotenv import load_dotenv
 from azure.ai.projects.aio import AIProjectClient
 from azure.identity.aio import DefaultAzureCredential
@@ -7,11 +11,23 @@ from semantic_kernel import Kernel
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 from semantic_kernel.agents.strategies import KernelFunctionSelectionStrategy, KernelFunctionTerminationStrategy
 from semantic_kernel.agents import AgentGroupChat, AzureAIAgent, AzureAIAgentSettings, ChatCompletionAgent
-from semantic_kernel.contents import ChatHistoryTruncationReducer, ChatMessageContent, ChatHistory, ImageContent, TextContent
-from semantic_kernel.functions import KernelFunctionFromPrompt
+from semantic_kernel.contents import ChatMessageContent, ChatHistory, ImageContent, TextContent
+from semantic_kernel.functions import KernelFunctionFromPrompt, KernelPlugin, kernel_function
 import chainlit as cl
 
 from utilities import Utilities
+from agent_cache import AgentDefinitionCache
+from router import AgentRouter, STATEMENT_FILE_EXTENSIONS, STATEMENT_FILE_MARKER
+from strategies import RoutedSelectionStrategy, HeuristicTerminationStrategy
+from termination import TERMINATION_MODES, TOOL_FLOW_COMPLETED
+from image_processing import ReceiptPreprocessor
+from history_reducer import PINNED_METADATA_KEY, PIN_KEY_METADATA_KEY, TokenBudgetSummarizationReducer, is_pinned
+from user_profile import UserProfile, UserProfileLoader, UserProfileStore
+from budget_alerts import BudgetAlertInbox
+from tracing import JsonLinesSpanExporter, Tracer
+from finance_data.tools import async_analyzer_functions, async_transactions_functions, invalidate_user_data, pool, query_cache
+
+logger = logging.getLogger(__name__)
 
 utilities = Utilities()
 
@@ -33,59 +49,119 @@ AGENT3_ID = os.getenv("AGENT3_ID")
 PROJECT_CONNECTION_STRING = os.getenv("PROJECT_CONNECTION_STRING")
 MODEL_DEPLOYMENT_NAME = os.getenv("MODEL_DEPLOYMENT_NAME")
 
+AGENT_CACHE_TTL_SECONDS = float(os.getenv("AGENT_CACHE_TTL_SECONDS", "900"))
+LOCAL_ROUTER_ENABLED = os.getenv("LOCAL_ROUTER_ENABLED", "true").lower() == "true"
+TERMINATION_MODE = os.getenv("TERMINATION_MODE", "hybrid").lower()
+if TERMINATION_MODE not in TERMINATION_MODES:
+    raise ValueError(f"TERMINATION_MODE must be one of {TERMINATION_MODES}, got '{TERMINATION_MODE}'")
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACING_EXPORT_FILE = os.getenv("TRACING_EXPORT_FILE")
+TRACING_PROMETHEUS_PORT = os.getenv("TRACING_PROMETHEUS_PORT")
+
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "3000"))
+HISTORY_MIN_RECENT_MESSAGES = int(os.getenv("HISTORY_MIN_RECENT_MESSAGES", "4"))
+
+BUDGET_ALERTS_ENABLED = os.getenv("BUDGET_ALERTS_ENABLED", "true").lower() == "true"
+
+RECEIPT_PREPROCESSING_ENABLED = os.getenv("RECEIPT_PREPROCESSING_ENABLED", "true").lower() == "true"
+RECEIPT_MAX_LONG_EDGE = int(os.getenv("RECEIPT_MAX_LONG_EDGE", "1568"))
+RECEIPT_JPEG_QUALITY = int(os.getenv("RECEIPT_JPEG_QUALITY", "80"))
+RECEIPT_PREPROCESSING_WORKERS = int(os.getenv("RECEIPT_PREPROCESSING_WORKERS", "2"))
+
 TERMINATION_KEYWORD = "FINISHED"
 
+# SetupAgent tools whose writes make the profile snapshot stale
+SETUP_WRITE_TOOLS = {"record_account", "record_category"}
+
+# TransactionsAgent tools whose writes can raise budget alerts
+TRANSACTION_WRITE_TOOLS = {"record_transaction", "import_bank_statement"}
+
+# Tools answered from the query result cache while the user's data doesn't change
+CACHED_QUERY_TOOLS = {"fetch_data_using_sql_query", "analyze_transactions"}
+
 # Initialize the AIProjectClient
 project_client = AIProjectClient.from_connection_string(
     credential=DefaultAzureCredential(),
     conn_str=PROJECT_CONNECTION_STRING,
 )
 
+# Agent definitions are cached for the whole process, not per chat session
+agent_cache = AgentDefinitionCache(
+    fetch=project_client.agents.get_agent,
+    ttl_seconds=AGENT_CACHE_TTL_SECONDS,
+)
+
+# Worker pool that shrinks receipt photos before upload and vision
+receipt_preprocessor = ReceiptPreprocessor(
+    max_workers=RECEIPT_PREPROCESSING_WORKERS,
+    max_long_edge=RECEIPT_MAX_LONG_EDGE,
+    quality=RECEIPT_JPEG_QUALITY,
+) if RECEIPT_PREPROCESSING_ENABLED else None
+
+# Spans of every chat turn, aggregated per stage and agent
+tracer = Tracer(
+    exporter=JsonLinesSpanExporter(TRACING_EXPORT_FILE, service_name="personal-finance-manager") if TRACING_EXPORT_FILE else None,
+    enabled=TRACING_ENABLED,
+)
+if TRACING_ENABLED and TRACING_PROMETHEUS_PORT:
+    tracer.serve_prometheus(int(TRACING_PROMETHEUS_PORT))
+
+# Loads the accounts, categories and budgets snapshot of each session
+profile_loader = UserProfileLoader(pool)
+
+# Budget alerts raised by the TransactionsAgent's writes, pushed into the chat of the user
+budget_alert_inbox = BudgetAlertInbox(pool) if BUDGET_ALERTS_ENABLED else None
+
+# Kernel and chat completion service shared by every chat session
+shared_kernel: Kernel | None = None
+
+# Function tools run in the app process, as a plugin of their agent's own kernel so no other agent is offered them
+agent_plugins = {
+    AGENT2_ID: KernelPlugin(name="Transactions", functions=[kernel_function(function) for function in async_transactions_functions]),
+    AGENT3_ID: KernelPlugin(name="Analyzer", functions=[kernel_function(function) for function in async_analyzer_functions]),
+}
+agent_kernels: dict[str, Kernel] = {}
+
+# Local router that answers clear selection turns without calling the LLM
+agent_router = AgentRouter(
+    host_agent_name=HOST_AGENT_NAME,
+    setup_agent_name=AGENT1_NAME,
+    transactions_agent_name=AGENT2_NAME,
+    analyzer_agent_name=AGENT3_NAME,
+) if LOCAL_ROUTER_ENABLED else None
+
 class KernelChatGroup:
+
+    def get_kernel(self,) -> Kernel:
+        global shared_kernel
+        if shared_kernel is None:
+            print("Initializing kernel...")
+            kernel = Kernel()
+            chat_completion_service = AzureChatCompletion(
+                service_id="open-ai-service"
+            )
+            kernel.add_service(chat_completion_service)
+            shared_kernel = kernel
+        return shared_kernel
     
     async def initialize_chat_group(self,)->AgentGroupChat:
-        print("Initializing kernel...")
-        # Instantiate client settings
-        ai_agent_settings = AzureAIAgentSettings()
-        
-        # Instantiate kernel
-        kernel = Kernel()
-        chat_completion_service = AzureChatCompletion(
-            service_id="open-ai-service"
-        )
-        kernel.add_service(chat_completion_service)
+        # Reuse the process-wide kernel
+        kernel = self.get_kernel()
         
         # Configure the kernel
         selection_function = self.selection_function()
         termination_function = self.termination_function()
-        history_reducer = ChatHistoryTruncationReducer(target_count=10)
-
-        # Initialize host agent
-        print("Getting host agent...")
-        host = await self.initialize_agent(
-            kernel=kernel,
-            agent_id=HOST_AGENT_ID,
-            )
-        
-        # Initialize agent 1
-        print("Getting agent 1...")
-        agent1 = await self.initialize_agent(
-            kernel=kernel,
-            agent_id=AGENT1_ID,
-            )
-
-        # Initialize agent 2
-        print("Getting agent 2...")
-        agent2 = await self.initialize_agent(
-            kernel=kernel,
-            agent_id=AGENT2_ID,
+        history_reducer = TokenBudgetSummarizationReducer(
+            service=kernel.get_service("open-ai-service"),
+            max_tokens=HISTORY_MAX_TOKENS,
+            target_count=HISTORY_MIN_RECENT_MESSAGES,
         )
 
-        # Initialize agent 3
-        print("Getting agent 3...")
-        agent3 = await self.initialize_agent(
+        # Get host agent and agents 1 to 3 (fetched concurrently on a cold cache)
+        host, agent1, agent2, agent3 = await self.initialize_agents(
             kernel=kernel,
-            agent_id=AGENT3_ID,
+            agent_ids=[HOST_AGENT_ID, AGENT1_ID, AGENT2_ID, AGENT3_ID],
         )
 
         # Create the vision agent using the kernel
@@ -111,39 +187,66 @@ class KernelChatGroup:
         print("Creating AgentGroupChat...")
         chat = AgentGroupChat(
             agents=[host, agent1, agent2, agent3, vision],
-            selection_strategy=KernelFunctionSelectionStrategy(
+            selection_strategy=RoutedSelectionStrategy(
+                router=agent_router,
+                tracer=tracer,
                 function=selection_function,
                 kernel=kernel,
                 result_parser=lambda result: str(result.value[0]).strip() if result.value[0] is not None else HOST_AGENT_NAME,
                 history_variable_name="history",
                 history_reducer=history_reducer,
             ),
-            termination_strategy=KernelFunctionTerminationStrategy(
+            termination_strategy=HeuristicTerminationStrategy(
+                mode=TERMINATION_MODE,
+                tracer=tracer,
                 agents=[host, agent1, agent2, agent3, vision],
                 function=termination_function,
                 kernel=kernel,
-                result_parser=lambda result: TERMINATION_KEYWORD in str(result.value[0]).lower(),
+                result_parser=lambda result: TERMINATION_KEYWORD.lower() in str(result.value[0]).lower(),
                 history_variable_name="history",
                 maximum_iterations=1,
+                # Each user message is a new turn of the same chat
+                automatic_reset=True,
                 history_reducer=history_reducer,
             ),
         )
         print("AgentGroupChat created.")
         return chat
 
-    async def initialize_agent(self, kernel: Kernel, agent_id: str,) -> AzureAIAgent:
-        # Get the agent definition
-        agent_definition = await project_client.agents.get_agent(
-            agent_id=agent_id,
-        )
+    async def initialize_agents(self, kernel: Kernel, agent_ids: list[str],) -> list[AzureAIAgent]:
+        # Get the agent definitions from the process-wide cache
+        agent_definitions = await agent_cache.get_many(agent_ids)
 
-        # Create the agent according to the obtained definition
-        agent = AzureAIAgent(
-            client=project_client,
-            definition=agent_definition,
-            kernel=kernel,
-        )
-        return agent
+        # Create the agents according to the obtained definitions
+        return [
+            AzureAIAgent(
+                client=project_client,
+                definition=self.plugin_definition(agent_definition) if agent_definition.id in agent_plugins else agent_definition,
+                kernel=self.get_agent_kernel(kernel, agent_definition.id),
+            )
+            for agent_definition in agent_definitions
+        ]
+
+    def get_agent_kernel(self, kernel: Kernel, agent_id: str) -> Kernel:
+        # A clone of the shared kernel with the agent's plugin, built once per process
+        if agent_id not in agent_plugins:
+            return kernel
+        if agent_id not in agent_kernels:
+            agent_kernel = kernel.clone()
+            agent_kernel.add_plugin(agent_plugins[agent_id])
+            agent_kernels[agent_id] = agent_kernel
+        return agent_kernels[agent_id]
+
+    def plugin_definition(self, agent_definition):
+        # The function tools registered by the agent's provisioning script only run in that script;
+        # here the plugin functions are sent with each run instead
+        agent_definition = deepcopy(agent_definition)
+        agent_definition.tools = [tool for tool in agent_definition.tools if tool.type != "function"]
+        return agent_definition
+
+    async def initialize_agent(self, kernel: Kernel, agent_id: str,) -> AzureAIAgent:
+        agents = await self.initialize_agents(kernel=kernel, agent_ids=[agent_id])
+        return agents[0]
     
     def selection_function(self,)->KernelFunctionFromPrompt:
         return KernelFunctionFromPrompt(
@@ -155,7 +258,7 @@ class KernelChatGroup:
             Choose only one of the following agents:
 
             - {AGENT1_NAME}: This agent is responsible for creating accounts and categories of income and expenses.
-            - {AGENT2_NAME}: This agent records financial movements and transactions.
+            - {AGENT2_NAME}: This agent records financial movements and transactions, and imports bank statement files.
             - {AGENT3_NAME}: This agent is responsible for analyzing the transactions data made by the user.
             - VisionAgent: If the user provides an image, this agent will extract the relevant information from it.
             - {HOST_AGENT_NAME}: For any other information requests related to the personal finance app.
@@ -190,28 +293,101 @@ class KernelChatGroup:
             """,
             )
 
-    def context_assistant_message(self,) -> ChatMessageContent:
+    async def load_user_profile(self,) -> UserProfileStore:
+        # Load the profile snapshot once per session
+        user_id = int(cl.user_session.get("user").metadata["UserId"])
+        profile_store = UserProfileStore(loader=profile_loader, user_id=user_id)
+        await profile_store.get()
+        cl.user_session.set("profile", profile_store)
+        return profile_store
+
+    async def push_budget_alerts(self, function_names: set[str] | None = None) -> int:
+        # Only after the writes that can raise alerts, or at the start of the session for the ones raised meanwhile
+        if budget_alert_inbox is None or (function_names is not None and not function_names & TRANSACTION_WRITE_TOOLS):
+            return 0
+        user_id = int(cl.user_session.get("user").metadata["UserId"])
+        sent = await budget_alert_inbox.deliver(user_id, lambda text: cl.Message(content=text, author="Budget alerts").send())
+        if sent:
+            logger.info("Budget alerts: %s pushed to user %s, %s in total", sent, user_id, budget_alert_inbox.delivered)
+        return sent
+
+    def context_assistant_message(self, profile: UserProfile | None = None, profile_version: int = 0) -> ChatMessageContent:
+        today = datetime.datetime.now().strftime("%d-%b-%Y")
+        profile_context = profile.to_context() if profile else ""
         return ChatMessageContent(
             content=f"""
             CONTEXT: 
             - The user ID I am talking to is: {cl.user_session.get("user").metadata["UserId"]}
-            - Today's date is: {datetime.datetime.now().strftime("%d-%b-%Y")}
+            - Today's date is: {today}
+{profile_context}
             """,
-            role="assistant"
+            role="assistant",
+            # Pinned so the history reducer never drops it
+            # Each new context message replaces the previous one in the reduced history
+            metadata={PINNED_METADATA_KEY: "true", PIN_KEY_METADATA_KEY: "context", "date": today, "profile_version": str(profile_version)},
         )
 
+    def needs_context_message(self, chat: AgentGroupChat, profile_version: int = 0) -> bool:
+        # Send the context once per chat, and again only when the date or the profile changed
+        today = datetime.datetime.now().strftime("%d-%b-%Y")
+        context_messages = [message for message in chat.history.messages if is_pinned(message)]
+        if not context_messages:
+            return True
+        metadata = context_messages[-1].metadata
+        return metadata.get("date") != today or metadata.get("profile_version") != str(profile_version)
+
+    def record_agent_turn(self, agent_name: str, response: str, function_names: set[str]) -> None:
+        if function_names & CACHED_QUERY_TOOLS:
+            logger.debug("Query cache: %s", query_cache.metrics.snapshot())
+
+        profile_store = cl.user_session.get("profile")
+        if profile_store is None:
+            return
+
+        # Reload the snapshot and the cached accounts and categories of the tools after the SetupAgent recorded an account or a category
+        if function_names & SETUP_WRITE_TOOLS or (agent_name == AGENT1_NAME and TOOL_FLOW_COMPLETED.search(response)):
+            profile_store.invalidate()
+            invalidate_user_data(profile_store.user_id)
+        elif agent_name in (AGENT2_NAME, AGENT3_NAME):
+            profile_store.record_turn(function_names)
+        logger.debug("Profile snapshot: %s loads, %s agent turns served, %s of them called a lookup tool",
+                     profile_store.loads, profile_store.turns_served, profile_store.lookup_turns)
+
     async def add_user_message_to_chat(self, chat: AgentGroupChat, message: cl.Message) -> AgentGroupChat:
         chat_messages = []
 
-        # If history reducer erase context message, add it again (11 = current target_count + 1 )
-        if len(chat.history.messages) % 11 == 0:
-            context_message = self.context_assistant_message()
+        # A new user message starts a new turn for the termination metrics
+        if isinstance(chat.termination_strategy, HeuristicTerminationStrategy):
+            chat.termination_strategy.metrics.start_turn()
+
+        # Add the context message the history reducer keeps pinned
+        profile_store = cl.user_session.get("profile")
+        with tracer.span("profile_load"):
+            profile = await profile_store.get() if profile_store else None
+        profile_version = profile_store.version if profile_store else 0
+        if self.needs_context_message(chat, profile_version):
+            context_message = self.context_assistant_message(profile, profile_version)
             chat_messages.append(context_message)
         
         # If message has images, add image to the message
         images = [file for file in message.elements if "image" in file.mime]
         if images:
-            uri = utilities.upload_to_azure_blob(file_path=images[0].path, blob_name=images[0].name)
+            file_path, blob_name = images[0].path, images[0].name
+            result = None
+            if receipt_preprocessor is not None:
+                # Upload the reduced image, re-encoded as JPEG unless the original was already smaller
+                with tracer.span("image_preprocess") as span:
+                    result = await receipt_preprocessor.process(images[0].path)
+                    span.set(bytes_saved=result.bytes_saved, image_tokens_saved=result.tokens_saved)
+                if result.path != images[0].path:
+                    file_path, blob_name = result.path, Path(images[0].name).with_suffix(".jpg").name
+            try:
+                with tracer.span("blob_upload"):
+                    uri = await utilities.upload_to_azure_blob(file_path=file_path, blob_name=blob_name)
+            finally:
+                # The processed image is only needed for the upload
+                if result is not None:
+                    await asyncio.to_thread(receipt_preprocessor.discard, result)
             user_message = ChatMessageContent(
                 role="user",
                 items=[
@@ -219,6 +395,16 @@ class KernelChatGroup:
                     ImageContent(uri=uri),
                 ]
                 )
+        elif statements := [file for file in message.elements if Path(file.name).suffix.lower() in STATEMENT_FILE_EXTENSIONS]:
+            # Bank statements are imported in bulk by the TransactionsAgent from the uploaded file
+            with tracer.span("blob_upload"):
+                uri = await utilities.upload_to_azure_blob(file_path=statements[0].path, blob_name=statements[0].name)
+            user_message = ChatMessageContent(
+                role="user",
+                items=[
+                    TextContent(text=f"{message.content} ({STATEMENT_FILE_MARKER} {uri})"),
+                ]
+                )
         else:
             user_message = ChatMessageContent(
                 role="user",
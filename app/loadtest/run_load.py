@@ -0,0 +1,185 @@
+"""
+Drive N simultaneous chat sessions through a synthetic model of the app's serving path.
+
+Each session replays the steps of on_chat_start/on_message with the app's real building blocks
+(agent definition cache, local router, termination heuristics, token coalescer, tracer), wired
+together here rather than through the Chainlit handlers and Semantic Kernel. The Azure AI Agent
+Service, the tools and the selection/termination LLM calls are modelled by
+synthetic_agent_service.py as latencies, so the results bound the app's own overhead per turn;
+they are not an end-to-end measurement of the deployed app.
+
+Reports throughput, turn and first-token latency percentiles, event-loop lag and memory per session.
+
+Usage (from the app folder):
+    python loadtest/run_load.py [--sessions 200] [--messages 5] [--ramp-s 5] [--llm-ms 900]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from agent_cache import AgentDefinitionCache
+from router import AgentRouter, Turn
+from streaming import TokenCoalescer
+from termination import TerminationHeuristics
+from tracing import Tracer
+from synthetic_agent_service import SyntheticAgentService, SyntheticServiceConfig, SyntheticToolServer
+
+AGENT_NAMES = ["HostAgent", "SetupAgent", "TransactionsAgent", "AnalyzerAgent"]
+CORPUS_FILE = Path(__file__).resolve().parent.parent / "benchmarks" / "router_corpus.json"
+
+class SilentMessage:
+    """cl.Message stand-in that keeps the streamed text."""
+
+    def __init__(self):
+        self.author = None
+        self.content = ""
+
+    async def stream_token(self, token: str) -> None:
+        self.content += token
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        config = SyntheticServiceConfig(
+            run_start_ms=args.run_ms,
+            token_interval_ms=args.token_ms,
+            tokens_per_answer=args.tokens,
+            tool_latency_ms=args.tool_ms,
+            tool_call_probability=args.tool_probability,
+        )
+        self.tool_server = SyntheticToolServer(config).start()
+        self.client = SyntheticAgentService(config, self.tool_server)
+        self.agent_cache = AgentDefinitionCache(fetch=self.client.agents.get_agent)
+        self.router = AgentRouter(*AGENT_NAMES)
+        self.heuristics = TerminationHeuristics()
+        self.tracer = Tracer()
+        self.messages = [item["message"] for item in json.loads(CORPUS_FILE.read_text(encoding="utf-8")) if item["message"]]
+        self.turn_latencies: list[float] = []
+        self.first_token_latencies: list[float] = []
+        self.chat_start_latencies: list[float] = []
+        self.loop_lags: list[float] = []
+        self.llm_calls = 0
+
+    async def session(self, index: int) -> None:
+        await asyncio.sleep(random.uniform(0, self.args.ramp_s))
+
+        # on_chat_start
+        start = time.perf_counter()
+        with self.tracer.span("chat_start", session_id=f"session-{index}"):
+            await self.agent_cache.get_many(AGENT_NAMES)
+        self.chat_start_latencies.append(time.perf_counter() - start)
+
+        threads: dict[str, str] = {}
+        history: list[Turn] = []
+        for _ in range(self.args.messages):
+            text = random.choice(self.messages)
+            history.append(Turn(role="user", text=text))
+            start = time.perf_counter()
+            with self.tracer.span("turn", session_id=f"session-{index}"):
+                answer = await self.turn(history, threads, start)
+            self.turn_latencies.append(time.perf_counter() - start)
+            history.append(answer)
+            await asyncio.sleep(random.uniform(0, self.args.think_s))
+
+    async def turn(self, history: list[Turn], threads: dict[str, str], start: float) -> Turn:
+        # on_message: selection
+        with self.tracer.span("selection"):
+            agent_name = self.router.route(history)
+            if agent_name is None:
+                self.llm_calls += 1
+                await asyncio.sleep(self.args.llm_ms / 1000)
+                agent_name = random.choice(AGENT_NAMES)
+
+        # Agent run on the agent's thread
+        agents = self.client.agents
+        if agent_name not in threads:
+            threads[agent_name] = (await agents.create_thread()).id
+        await agents.create_message(thread_id=threads[agent_name], role="user", content=history[-1].text)
+
+        message = SilentMessage()
+        stream = TokenCoalescer(message)
+        first_token = None
+        with self.tracer.span("agent_run", agent=agent_name):
+            async with await agents.create_stream(thread_id=threads[agent_name], agent_id=agent_name) as events:
+                async for event_type, data in events:
+                    if event_type == "thread.message.delta":
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        await stream.add(agent_name, data["delta"]["content"][0]["text"]["value"])
+            await stream.close()
+        self.first_token_latencies.append(first_token or 0.0)
+
+        # Termination
+        with self.tracer.span("termination", agent=agent_name):
+            if self.heuristics.decide(agent_name, message.content) is None:
+                self.llm_calls += 1
+                await asyncio.sleep(self.args.llm_ms / 1000)
+
+        return Turn(role="assistant", text=message.content, name=agent_name)
+
+    async def monitor_loop_lag(self, stop: asyncio.Event, interval: float = 0.01) -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lags.append(time.perf_counter() - start - interval)
+
+    async def run(self) -> None:
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(self.monitor_loop_lag(stop))
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        await asyncio.gather(*(self.session(i) for i in range(self.args.sessions)))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stop.set()
+        await monitor
+        self.tool_server.stop()
+        self.report(elapsed, (peak - baseline) / self.args.sessions)
+
+    def report(self, elapsed: float, memory_per_session: float) -> None:
+        turns = len(self.turn_latencies)
+        ms = lambda values, q: percentile(values, q) * 1000
+        print(f"sessions {self.args.sessions}, turns {turns} in {elapsed:.1f} s -> {turns / elapsed:.1f} turns/s")
+        print(f"chat start   p50 {ms(self.chat_start_latencies, .5):7.0f} ms  p95 {ms(self.chat_start_latencies, .95):7.0f} ms  p99 {ms(self.chat_start_latencies, .99):7.0f} ms")
+        print(f"turn         p50 {ms(self.turn_latencies, .5):7.0f} ms  p95 {ms(self.turn_latencies, .95):7.0f} ms  p99 {ms(self.turn_latencies, .99):7.0f} ms")
+        print(f"first token  p50 {ms(self.first_token_latencies, .5):7.0f} ms  p95 {ms(self.first_token_latencies, .95):7.0f} ms  p99 {ms(self.first_token_latencies, .99):7.0f} ms")
+        print(f"loop lag     p50 {ms(self.loop_lags, .5):7.1f} ms  p99 {ms(self.loop_lags, .99):7.1f} ms  max {max(self.loop_lags, default=0) * 1000:7.1f} ms")
+        print(f"memory       ~{memory_per_session / 1024:.1f} KiB per session (peak traced)")
+        print(f"remote calls {self.client.agents.calls}, tool calls {self.tool_server.calls}, LLM calls {self.llm_calls}")
+        print(f"router       {self.router.metrics.snapshot()}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5, help="Messages sent by each session")
+    parser.add_argument("--ramp-s", type=float, default=5.0, help="Sessions start uniformly over this many seconds")
+    parser.add_argument("--think-s", type=float, default=1.0, help="Maximum pause of a user between messages")
+    parser.add_argument("--llm-ms", type=float, default=900.0, help="Latency of a selection or termination LLM call")
+    parser.add_argument("--run-ms", type=float, default=400.0, help="Latency before an agent run starts streaming")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Interval between streamed tokens")
+    parser.add_argument("--tokens", type=int, default=120, help="Tokens per answer")
+    parser.add_argument("--tool-ms", type=float, default=700.0, help="Latency of a Logic App tool call")
+    parser.add_argument("--tool-probability", type=float, default=0.5, help="Share of runs that call a tool")
+    args = parser.parse_args()
+    asyncio.run(LoadTest(args).run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Synthetic model of the remote calls of a chat turn, for load tests.
+
+This is not a drop-in AIProjectClient and doesn't exercise the Azure SDK: SyntheticAgentService
+only has the shape of the agent operations a turn performs (get_agent, create_thread,
+create_message, create_stream) with simplified signatures, and returns plain objects after a
+configurable latency. Streams emit (event_type, data) tuples with "thread.message.delta" payloads
+shaped like the service's, and a run may call an OpenAPI path served by SyntheticToolServer over
+HTTP before answering, to model the latency of a Logic App tool. Use it to measure the app's own
+overhead (event loop, caches, router, coalescing) under many sessions, not the SDK or the handlers.
+"""
+import json
+import time
+import random
+import asyncio
+import threading
+import itertools
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AGENTS_PATH = Path(__file__).resolve().parents[2] / "agents"
+
+@dataclass
+class SyntheticServiceConfig:
+    get_agent_ms: float = 150.0
+    create_thread_ms: float = 80.0
+    create_message_ms: float = 60.0
+    run_start_ms: float = 400.0
+    token_interval_ms: float = 15.0
+    tokens_per_answer: int = 120
+    tool_latency_ms: float = 700.0
+    tool_call_probability: float = 0.5
+    jitter: float = 0.2
+
+    def delay(self, ms: float) -> float:
+        return max(0.0, ms * (1 + random.uniform(-self.jitter, self.jitter)) / 1000)
+
+class SyntheticToolServer:
+    """Serves every path of the repo's OpenAPI tool specs and answers after tool_latency_ms."""
+
+    def __init__(self, config: SyntheticServiceConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.paths = self.load_paths()
+        self.calls = 0
+        server = self
+
+        class ToolHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?")[0]
+                if path not in server.paths:
+                    self.send_error(404)
+                    return
+                time.sleep(server.config.delay(server.config.tool_latency_ms))
+                server.calls += 1
+                if "user_query" in request:
+                    body = {"ResultSets": {"Table1": [{"Id": 1, "Name": "Cash", "Type": "Cash"}]}}
+                else:
+                    body = {"Result": "Success"}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                return
+
+        self.httpd = ThreadingHTTPServer((host, port), ToolHandler)
+        self.url = f"http://{host}:{self.httpd.server_port}"
+
+    @staticmethod
+    def load_paths() -> set[str]:
+        """Collect the operation paths (with their server path prefix) of every OpenAPI spec in the agents."""
+        paths = set()
+        for spec_file in AGENTS_PATH.glob("*/files/openapi_*.json"):
+            spec = json.loads(spec_file.read_text(encoding="utf-8"))
+            prefix = urllib.parse.urlparse(spec["servers"][0]["url"]).path.rstrip("/")
+            for path in spec["paths"]:
+                paths.add(prefix + path)
+        return paths
+
+    def start(self) -> "SyntheticToolServer":
+        threading.Thread(target=self.httpd.serve_forever, name="synthetic-tools", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+
+    def call(self, path: str, body: dict) -> dict:
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+class SyntheticStream:
+    """Async iterator of (event_type, data) tuples, like the agent service event stream."""
+
+    def __init__(self, service: "SyntheticAgentsOperations", thread_id: str, agent_id: str):
+        self.service = service
+        self.thread_id = thread_id
+        self.agent_id = agent_id
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self.events()
+
+    async def events(self):
+        config = self.service.config
+        yield "thread.run.created", {"thread_id": self.thread_id, "agent_id": self.agent_id}
+        await asyncio.sleep(config.delay(config.run_start_ms))
+
+        if self.service.tool_server is not None and random.random() < config.tool_call_probability:
+            path = random.choice(sorted(self.service.tool_server.paths))
+            yield "thread.run.step.created", {"type": "tool_calls", "path": path}
+            await asyncio.to_thread(self.service.tool_server.call, path, {"user_query": "SELECT 1"})
+            yield "thread.run.step.completed", {"type": "tool_calls", "path": path}
+
+        for i in range(config.tokens_per_answer):
+            await asyncio.sleep(config.delay(config.token_interval_ms))
+            token = "?" if i == config.tokens_per_answer - 1 else f"tok{i % 10} "
+            yield "thread.message.delta", {"delta": {"content": [{"text": {"value": token}}]}}
+        yield "thread.run.completed", {"thread_id": self.thread_id}
+
+    async def until_done(self) -> None:
+        async for _ in self.events():
+            pass
+
+@dataclass
+class SyntheticAgentsOperations:
+    config: SyntheticServiceConfig
+    tool_server: SyntheticToolServer | None = None
+    threads: dict = field(default_factory=dict)
+    calls: dict = field(default_factory=dict)
+    _ids: itertools.count = field(default_factory=itertools.count)
+
+    def _count(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    async def get_agent(self, agent_id: str):
+        self._count("get_agent")
+        await asyncio.sleep(self.config.delay(self.config.get_agent_ms))
+        return SimpleNamespace(id=agent_id, name=agent_id, instructions="", tools=[])
+
+    async def create_thread(self):
+        self._count("create_thread")
+        await asyncio.sleep(self.config.delay(self.config.create_thread_ms))
+        thread_id = f"thread_{next(self._ids)}"
+        self.threads[thread_id] = []
+        return SimpleNamespace(id=thread_id)
+
+    async def create_message(self, thread_id: str, role: str, content):
+        self._count("create_message")
+        await asyncio.sleep(self.config.delay(self.config.create_message_ms))
+        self.threads[thread_id].append((role, content))
+        return SimpleNamespace(id=f"msg_{next(self._ids)}", thread_id=thread_id)
+
+    async def create_stream(self, thread_id: str, agent_id: str, **kwargs) -> SyntheticStream:
+        self._count("create_stream")
+        return SyntheticStream(self, thread_id, agent_id)
+
+class SyntheticAgentService:
+    """Synthetic agent operations under .agents, like project_client.agents; not an AIProjectClient."""
+
+    def __init__(self, config: SyntheticServiceConfig | None = None, tool_server: SyntheticToolServer | None = None):
+        self.agents = SyntheticAgentsOperations(config or SyntheticServiceConfig(), tool_server)
+
+    async def close(self) -> None:
+        return None
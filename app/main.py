@@ -1,14 +1,24 @@
+import os
+import time
+import asyncio
 import chainlit as cl
+from semantic_kernel.contents import FunctionCallContent, FunctionResultContent
 
 from utilities import Utilities
-from kernel import KernelChatGroup
+from kernel import KernelChatGroup, tracer
+from streaming import TokenCoalescer
+
+# Tokens are sent to the browser in frames of up to STREAM_COALESCE_CHARS characters or every STREAM_COALESCE_MS
+STREAM_COALESCE_CHARS = int(os.getenv("STREAM_COALESCE_CHARS", "64"))
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", "30"))
 
 utilities = Utilities()
 kernel = KernelChatGroup()
 
 @cl.password_auth_callback
-def auth_callback(username: str, password: str):
-    identifier, metadata = utilities.authenticate_user(username, password)
+async def auth_callback(username: str, password: str):
+    # Off the event loop, so a slow user store doesn't stall the other sessions
+    identifier, metadata = await asyncio.to_thread(utilities.authenticate_user, username, password)
     if identifier :
         return cl.User(
                 identifier=identifier, 
@@ -45,11 +55,18 @@ async def set_starters():
 
 @cl.on_chat_start
 async def on_chat_start():
-    chat = await kernel.initialize_chat_group()
-    cl.user_session.set("chat", chat)
+    with tracer.span("chat_start", session_id=cl.context.session.id):
+        chat = await kernel.initialize_chat_group()
+        cl.user_session.set("chat", chat)
+        await kernel.load_user_profile()
+        await kernel.push_budget_alerts()
 
 @cl.on_message
 async def on_message(message: cl.Message):
+    with tracer.span("turn", session_id=cl.context.session.id) as turn:
+        await handle_message(message, turn)
+
+async def handle_message(message: cl.Message, turn):
     chat = cl.user_session.get("chat")
     answer = cl.Message(content="")
 
@@ -57,23 +74,54 @@ async def on_message(message: cl.Message):
     await temp_msg.send()
 
     # Add needed messages to the chat group
-    chat = await kernel.add_user_message_to_chat(chat=chat, message=message) 
+    with tracer.span("add_user_message"):
+        chat = await kernel.add_user_message_to_chat(chat=chat, message=message) 
 
     # Invoke the chat group
-    async for response in chat.invoke_stream():
-        if temp_msg:
-            await temp_msg.remove()
-        if response.content:
-            answer.author=str(response.name)
-            await answer.stream_token(str(response.content))
+    function_names = set()
+    tool_calls = {}
+    stream = TokenCoalescer(answer, max_chars=STREAM_COALESCE_CHARS, max_delay=STREAM_COALESCE_MS / 1000)
+    with tracer.span("invoke_stream") as invoke_span:
+        async for response in chat.invoke_stream():
+            if temp_msg:
+                await temp_msg.remove()
+                temp_msg = None
+            for item in response.items:
+                # Tool calls are timed from the call to its result (or to the next streamed text)
+                if isinstance(item, FunctionCallContent):
+                    function_names.add(item.function_name)
+                    tool_calls.setdefault(item.id, (item.function_name, time.time_ns()))
+                elif isinstance(item, FunctionResultContent) and item.id in tool_calls:
+                    name, start_ns = tool_calls.pop(item.id)
+                    tracer.record("tool_call", start_ns, time.time_ns(), tool=name, agent=str(response.name))
+            if response.content:
+                for name, start_ns in tool_calls.values():
+                    tracer.record("tool_call", start_ns, time.time_ns(), tool=name, agent=str(response.name))
+                tool_calls.clear()
+                await stream.add(str(response.name), str(response.content))
+        stream_metrics = await stream.close()
+        invoke_span.set(agent=answer.author, completion_chunks=stream_metrics.tokens, frames=stream_metrics.frames,
+                        time_to_first_token_ms=round(stream_metrics.time_to_first_token_ms or 0.0, 1))
+
+    # The agent run goes from the end of the selection to the start of the termination check
+    selection, termination = invoke_span.child("selection"), invoke_span.child("termination")
+    if selection is not None:
+        end_ns = termination.start_ns if termination is not None else invoke_span.end_ns
+        tracer.record("agent_run", selection.end_ns, end_ns, agent=answer.author, completion_chunks=stream_metrics.tokens)
 
     # Add vision agent response to the agent chat group history
     # It's not a default behavior of the ChatCompletionAgent
     if answer.author == "VisionAgent":
         chat = await kernel.add_chat_completion_agent_response_to_history(chat=chat, response=answer.content)
 
+    kernel.record_agent_turn(agent_name=answer.author, response=answer.content, function_names=function_names)
+    turn.set(agent=answer.author)
+
     await answer.send()
 
+    # Budgets crossed by the transactions just recorded
+    await kernel.push_budget_alerts(function_names)
+
 """
 # Enable only for testing or debugging purposes
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass, field
+
+VISION_AGENT_NAME = "VisionAgent"
+
+# Bank statement attachments are uploaded and referenced in the user message with this marker
+STATEMENT_FILE_EXTENSIONS = {".csv", ".ofx", ".qfx", ".qif"}
+STATEMENT_FILE_MARKER = "Statement file url:"
+
+# Replies that confirm what an agent just asked (e.g. the receipt data extracted by the VisionAgent)
+AFFIRMATIVE_REPLY = re.compile(
+    r"^\s*(yes|yep|yeah|sure|ok|okay|correct|right|confirmed?|that'?s (right|correct)|looks (good|right|correct))\b",
+    re.IGNORECASE,
+)
+
+@dataclass
+class Turn:
+    """Minimal view of a chat message used by the router."""
+    role: str
+    text: str
+    name: str | None = None
+    has_image: bool = False
+
+@dataclass
+class RouterMetrics:
+    """Counters of turns answered locally (hits) and sent to the LLM prompt (misses)."""
+    hits: int = 0
+    misses: int = 0
+    hits_by_rule: dict[str, int] = field(default_factory=dict)
+
+    def record_hit(self, rule: str) -> None:
+        self.hits += 1
+        self.hits_by_rule[rule] = self.hits_by_rule.get(rule, 0) + 1
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 3),
+            "hits_by_rule": dict(self.hits_by_rule),
+        }
+
+class AgentRouter:
+    """
+    Local fast path for agent selection.
+    Clear turns are resolved with rules and a keyword-weighted linear classifier;
+    route() returns None for ambiguous turns so the caller falls back to the LLM prompt.
+    """
+
+    def __init__(
+        self,
+        host_agent_name: str,
+        setup_agent_name: str,
+        transactions_agent_name: str,
+        analyzer_agent_name: str,
+        vision_agent_name: str = VISION_AGENT_NAME,
+        min_score: float = 2.0,
+        min_margin: float = 2.0,
+    ):
+        self.host_agent_name = host_agent_name
+        self.setup_agent_name = setup_agent_name
+        self.transactions_agent_name = transactions_agent_name
+        self.analyzer_agent_name = analyzer_agent_name
+        self.vision_agent_name = vision_agent_name
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.metrics = RouterMetrics()
+
+        # (pattern, agent, weight): the score of an agent is the sum of the weights of its matching patterns
+        self.features: list[tuple[re.Pattern, str, float]] = [
+            # Setup: creating accounts and categories
+            (r"\b(create|add|new|set ?up|open|register)\b[\w\s']{0,25}\b(accounts?|categor(y|ies))\b", setup_agent_name, 3),
+            (r"\b(accounts?|categor(y|ies))\b[\w\s']{0,15}\b(for|called|named)\b", setup_agent_name, 1),
+            (r"\b(credit card|debit card|savings|checking|wallet|cash)\b", setup_agent_name, 0.5),
+
+            # Transactions: recording movements
+            (r"\b(create|record|register|log|add|save|enter)\b[\w\s']{0,25}\b(transactions?|expenses?|income|payments?|purchases?|movements?)\b", transactions_agent_name, 3),
+            (r"\b(i )?(spent|paid|bought|earned|received|got paid|purchased)\b", transactions_agent_name, 2),
+            (r"(\$|€|£)\s?\d|\b\d+([.,]\d{1,2})?\s?(usd|eur|dollars|euros|pesos)\b", transactions_agent_name, 1),
+
+            # Analyzer: questions over the recorded data
+            (r"\banaly[sz](e|is|ing)\b", analyzer_agent_name, 3),
+            (r"\bhow much (did|have|do) i\b", analyzer_agent_name, 3),
+            (r"\b(report|summary|summari[sz]e|chart|graph|trends?|breakdown|insights?|compare|comparison|outliers?|forecast|projection|distribution)\b", analyzer_agent_name, 2),
+            (r"\b(over|exceed(ed)?|within) (my )?budget\b", analyzer_agent_name, 2),
+            (r"\b(last|this|previous|past) (week|month|year|quarter)\b", analyzer_agent_name, 1),
+            (r"\b(top|highest|most|least|average)\b", analyzer_agent_name, 1),
+
+            # Host: greetings and questions about the app itself
+            (r"^\s*(hi|hello|hey|good (morning|afternoon|evening))\b[\s!.]*$", host_agent_name, 3),
+            (r"\b(what can you do|how does (this|the) app|who are you|help me understand)\b", host_agent_name, 3),
+            (r"\b(what is|what's|explain|tips?|advice)\b", host_agent_name, 1),
+        ]
+        self.features = [(re.compile(pattern, re.IGNORECASE), agent, weight) for pattern, agent, weight in self.features]
+
+    def classify(self, text: str) -> tuple[str | None, float, float]:
+        """Return the best agent for the text, its score and its margin over the runner-up."""
+        scores: dict[str, float] = {}
+        for pattern, agent, weight in self.features:
+            if pattern.search(text):
+                scores[agent] = scores.get(agent, 0) + weight
+        if not scores:
+            return None, 0.0, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_agent, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return best_agent, best_score, best_score - runner_up
+
+    def route(self, turns: list[Turn]) -> str | None:
+        """Return the name of the next agent, or None if the turn is ambiguous."""
+        agent, rule = self._route(turns)
+        if agent is None:
+            self.metrics.record_miss()
+        else:
+            self.metrics.record_hit(rule)
+        return agent
+
+    def _route(self, turns: list[Turn]) -> tuple[str | None, str | None]:
+        if not turns or turns[-1].role != "user":
+            return None, None
+        message = turns[-1]
+
+        # An image attachment is always read by the VisionAgent first
+        if message.has_image:
+            return self.vision_agent_name, "image"
+
+        # A bank statement is imported by the TransactionsAgent
+        if STATEMENT_FILE_MARKER in message.text:
+            return self.transactions_agent_name, "statement"
+
+        agent, score, margin = self.classify(message.text)
+        clear_intent = agent is not None and score >= self.min_score and margin >= self.min_margin
+
+        previous = self._previous_agent_turn(turns)
+        if previous is not None and previous.text.rstrip().endswith("?"):
+            # The user confirms the receipt data, so the transaction can be recorded
+            if previous.name == self.vision_agent_name:
+                if AFFIRMATIVE_REPLY.match(message.text):
+                    return self.transactions_agent_name, "vision_confirmed"
+            # An agent asked for more information and the user did not switch task
+            elif previous.name and (not clear_intent or agent == previous.name):
+                return previous.name, "multi_step_flow"
+
+        if clear_intent:
+            return agent, "intent"
+        return None, None
+
+    def _previous_agent_turn(self, turns: list[Turn]) -> Turn | None:
+        for turn in reversed(turns[:-1]):
+            if turn.role == "assistant" and turn.name:
+                return turn
+            if turn.role == "user":
+                return None
+        return None
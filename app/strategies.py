@@ -0,0 +1,73 @@
+import time
+import logging
+from pydantic import Field
+from semantic_kernel.agents import Agent
+from semantic_kernel.agents.strategies import KernelFunctionSelectionStrategy, KernelFunctionTerminationStrategy
+from semantic_kernel.contents import ChatMessageContent, ImageContent
+
+from router import AgentRouter, Turn
+from termination import TerminationHeuristics, TerminationMetrics
+from tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+def to_turns(history: list[ChatMessageContent]) -> list[Turn]:
+    """Convert the chat history into the lightweight turns used by the local router."""
+    return [
+        Turn(
+            role=getattr(message.role, "value", str(message.role)),
+            text=message.content or "",
+            name=message.name,
+            has_image=any(isinstance(item, ImageContent) for item in message.items),
+        )
+        for message in history
+    ]
+
+class RoutedSelectionStrategy(KernelFunctionSelectionStrategy):
+    """Selection strategy that asks the local router first and only calls the selection prompt on a miss."""
+
+    router: AgentRouter | None = None
+    tracer: Tracer = Field(default_factory=lambda: Tracer(enabled=False))
+
+    async def select_agent(self, agents: list[Agent], history: list[ChatMessageContent]) -> Agent:
+        with self.tracer.span("selection", history_messages=len(history)) as span:
+            if self.router is not None:
+                agent_name = self.router.route(to_turns(history))
+                agent = next((agent for agent in agents if agent.name == agent_name), None)
+                if agent is not None:
+                    span.set(route="local", selected_agent=agent.name)
+                    return agent
+            agent = await super().select_agent(agents, history)
+            span.set(route="llm", selected_agent=agent.name)
+            return agent
+
+class HeuristicTerminationStrategy(KernelFunctionTerminationStrategy):
+    """
+    Termination strategy that decides locally when it can.
+    mode "llm" always calls the termination prompt, "hybrid" calls it only when the heuristics are undecided
+    and "heuristic" never calls it (undecided turns end, maximum_iterations already bounds them).
+    Every turn ends in a termination, so the chat is reset for the next user message.
+    """
+
+    automatic_reset: bool = True
+    mode: str = "hybrid"
+    heuristics: TerminationHeuristics = Field(default_factory=TerminationHeuristics)
+    metrics: TerminationMetrics = Field(default_factory=TerminationMetrics)
+    tracer: Tracer = Field(default_factory=lambda: Tracer(enabled=False))
+
+    async def should_agent_terminate(self, agent: Agent, history: list[ChatMessageContent]) -> bool:
+        with self.tracer.span("termination", agent=agent.name) as span:
+            if self.mode != "llm":
+                response = (history[-1].content or "") if history else ""
+                decision = self.heuristics.decide(agent.name, response)
+                if decision is not None or self.mode == "heuristic":
+                    self.metrics.record_skip()
+                    logger.info("Termination decided locally for %s: %s", agent.name, self.metrics.turn_snapshot())
+                    span.set(decided="local")
+                    return True if decision is None else decision
+
+            start = time.perf_counter()
+            result = await super().should_agent_terminate(agent, history)
+            self.metrics.record_llm_call((time.perf_counter() - start) * 1000)
+            span.set(decided="llm")
+            return result
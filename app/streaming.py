@@ -0,0 +1,71 @@
+import time
+import asyncio
+from dataclasses import dataclass
+
+@dataclass
+class StreamMetrics:
+    tokens: int = 0
+    frames: int = 0
+    time_to_first_token_ms: float | None = None
+
+class TokenCoalescer:
+    """
+    Buffers streamed tokens and sends them to a Chainlit message in larger frames.
+    A frame is sent when the buffer reaches max_chars, max_delay seconds after its first token,
+    when the author (agent) changes, and on close().
+    """
+
+    def __init__(self, message, max_chars: int = 64, max_delay: float = 0.03):
+        self.message = message
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.metrics = StreamMetrics()
+        self._buffer: list[str] = []
+        self._buffered_chars = 0
+        self._author: str | None = None
+        self._started_at = time.perf_counter()
+        self._timer: asyncio.TimerHandle | None = None
+        self._lock = asyncio.Lock()
+
+    async def add(self, author: str, token: str) -> None:
+        if self.metrics.time_to_first_token_ms is None:
+            self.metrics.time_to_first_token_ms = (time.perf_counter() - self._started_at) * 1000
+        self.metrics.tokens += 1
+
+        if author != self._author:
+            # Never mix two agents in one frame
+            await self.flush()
+            self._author = author
+            self.message.author = author
+
+        self._buffer.append(token)
+        self._buffered_chars += len(token)
+        if self._buffered_chars >= self.max_chars:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush_later)
+
+    def _flush_later(self) -> None:
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_chars = 0
+        # Frames are sent one at a time so they arrive in order
+        async with self._lock:
+            await self.message.stream_token(chunk)
+            self.metrics.frames += 1
+
+    async def close(self) -> StreamMetrics:
+        await self.flush()
+        # Wait for a flush started by the timer
+        async with self._lock:
+            pass
+        return self.metrics
@@ -0,0 +1,80 @@
+import re
+from dataclasses import dataclass
+
+# The agent is waiting for the user: a question or an explicit request for input
+QUESTION_ENDING = re.compile(
+    r"(\?\s*[\W_]*$)|(\b(please (provide|confirm|let me know|tell me|specify)|let me know|could you (tell|provide|confirm))\b[^.!?]*[.!]?\s*$)",
+    re.IGNORECASE,
+)
+
+# The agent closed a tool flow (record_account, record_category, record_transaction...)
+TOOL_FLOW_COMPLETED = re.compile(
+    r"\b(has|have) been (successfully )?(recorded|registered|created|saved|added)\b|\b(recorded|registered|created|saved|added) successfully\b",
+    re.IGNORECASE,
+)
+
+# Markdown table or chart returned by the analyzer
+REPORT_RENDERED = re.compile(r"^\s*\|.+\|\s*$", re.MULTILINE)
+
+TERMINATION_MODES = ("llm", "hybrid", "heuristic")
+
+class TerminationHeuristics:
+    """Local termination rules; decide() returns None when the turn can't be decided without the LLM."""
+
+    def __init__(self, vision_agent_name: str = "VisionAgent"):
+        self.vision_agent_name = vision_agent_name
+
+    def decide(self, agent_name: str | None, response: str) -> bool | None:
+        if not response.strip():
+            return None
+        # The VisionAgent always finishes by asking the user to confirm the extracted data
+        if agent_name == self.vision_agent_name:
+            return True
+        if QUESTION_ENDING.search(response):
+            return True
+        if TOOL_FLOW_COMPLETED.search(response):
+            return True
+        if REPORT_RENDERED.search(response):
+            return True
+        return None
+
+@dataclass
+class TerminationMetrics:
+    """Counts of termination decisions taken locally vs by the LLM, per turn and in total."""
+    llm_calls: int = 0
+    skipped_llm_calls: int = 0
+    turn_llm_calls: int = 0
+    turn_skipped_llm_calls: int = 0
+    average_llm_ms: float = 800.0
+
+    def start_turn(self) -> None:
+        self.turn_llm_calls = 0
+        self.turn_skipped_llm_calls = 0
+
+    def record_skip(self) -> None:
+        self.skipped_llm_calls += 1
+        self.turn_skipped_llm_calls += 1
+
+    def record_llm_call(self, elapsed_ms: float) -> None:
+        # The first measurement replaces the default estimate, the next ones are smoothed
+        if self.llm_calls == 0:
+            self.average_llm_ms = elapsed_ms
+        else:
+            self.average_llm_ms = 0.8 * self.average_llm_ms + 0.2 * elapsed_ms
+        self.llm_calls += 1
+        self.turn_llm_calls += 1
+
+    @property
+    def turn_ms_saved(self) -> float:
+        return self.turn_skipped_llm_calls * self.average_llm_ms
+
+    @property
+    def ms_saved(self) -> float:
+        return self.skipped_llm_calls * self.average_llm_ms
+
+    def turn_snapshot(self) -> dict:
+        return {
+            "skipped_llm_calls": self.turn_skipped_llm_calls,
+            "llm_calls": self.turn_llm_calls,
+            "ms_saved": round(self.turn_ms_saved),
+        }
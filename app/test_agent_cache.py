@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from agent_cache import AgentDefinitionCache
+
+class FakeAgents:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_agent(self, agent_id):
+        self.calls.append(agent_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return {"id": agent_id, "version": self.calls.count(agent_id)}
+
+def test_cold_cache_fetches_concurrently_and_warm_cache_is_local():
+    async def scenario():
+        agents = FakeAgents()
+        cache = AgentDefinitionCache(fetch=agents.get_agent, ttl_seconds=60)
+        definitions = await cache.get_many(["host", "setup", "transactions", "analyzer"])
+        assert [d["id"] for d in definitions] == ["host", "setup", "transactions", "analyzer"]
+        assert agents.max_in_flight == 4
+
+        # Concurrent chat starts on a warm cache make no remote calls
+        await asyncio.gather(*(cache.get_many(["host", "setup"]) for _ in range(10)))
+        assert len(agents.calls) == 4
+
+    asyncio.run(scenario())
+
+def test_concurrent_cold_starts_share_one_fetch():
+    async def scenario():
+        agents = FakeAgents()
+        cache = AgentDefinitionCache(fetch=agents.get_agent, ttl_seconds=60)
+        await asyncio.gather(*(cache.get("host") for _ in range(5)))
+        assert agents.calls == ["host"]
+
+    asyncio.run(scenario())
+
+def test_stale_entries_are_served_while_refreshing():
+    async def scenario():
+        agents = FakeAgents()
+        cache = AgentDefinitionCache(fetch=agents.get_agent, ttl_seconds=0)
+        first = await cache.get("host")
+        second = await cache.get("host")
+        assert second == first
+        await cache._refresh_task
+        third = await cache.get("host")
+        assert third["version"] == 2
+
+    asyncio.run(scenario())
+
+def test_invalidate_during_a_cold_fetch_does_not_break_the_caller():
+    async def scenario():
+        agents = FakeAgents()
+        cache = AgentDefinitionCache(fetch=agents.get_agent, ttl_seconds=60)
+        await cache.get("host")
+        # "setup" is fetched while another session invalidates "host"
+        pending = asyncio.create_task(cache.get_many(["host", "setup"]))
+        await asyncio.sleep(0)
+        cache.invalidate("host")
+        definitions = await pending
+        assert [d["id"] for d in definitions] == ["host", "setup"]
+
+    asyncio.run(scenario())
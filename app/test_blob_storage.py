@@ -0,0 +1,34 @@
+import asyncio
+from blob_storage import LocalFileBackend, ReceiptUploader
+
+def test_resent_receipt_is_uploaded_once(tmp_path):
+    receipt = tmp_path / "receipt.JPG"
+    receipt.write_bytes(b"fake receipt bytes")
+    uploader = ReceiptUploader(LocalFileBackend(tmp_path / "blobs"))
+
+    async def scenario():
+        first = await uploader.upload_file(str(receipt))
+        # Same content sent again, even under another name and concurrently
+        others = await asyncio.gather(*(uploader.upload_bytes(b"fake receipt bytes", "copy.jpg") for _ in range(3)))
+        return first, others
+
+    first, others = asyncio.run(scenario())
+    assert all(url == first for url in others)
+    assert first.endswith(".jpg")
+    assert uploader.metrics.uploads == 1
+    assert uploader.metrics.deduplicated == 3
+    assert len(list((tmp_path / "blobs").iterdir())) == 1
+
+def test_remembered_uploads_are_bounded(tmp_path):
+    uploader = ReceiptUploader(LocalFileBackend(tmp_path / "blobs"), max_remembered=2)
+
+    async def scenario():
+        for content in (b"first", b"second", b"first", b"third"):
+            await uploader.upload_bytes(content, "receipt.png")
+        # "second" was the least recently used, it is uploaded again (the backend skips the existing blob)
+        await uploader.upload_bytes(b"second", "receipt.png")
+
+    asyncio.run(scenario())
+    assert len(uploader._uploaded) == 2
+    assert uploader.metrics.uploads == 4 and uploader.metrics.deduplicated == 1
+    assert len(list((tmp_path / "blobs").iterdir())) == 3
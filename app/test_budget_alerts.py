@@ -0,0 +1,38 @@
+import sqlite3
+import asyncio
+from finance_data.db_pool import ConnectionPool
+from budget_alerts import BudgetAlertInbox
+
+def create_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Categories (Id INTEGER PRIMARY KEY, Name TEXT, Type TEXT, UserId INT);
+        CREATE TABLE BudgetAlerts (Id INTEGER PRIMARY KEY, UserId INT, Year INT, Month INT, CategoryId INT, Kind TEXT,
+                                   Spent REAL, Budget REAL, Projected REAL, CreatedAt TEXT, DeliveredAt TEXT);
+        INSERT INTO Categories VALUES (1, 'Food', 'Expense', 1), (2, 'Fuel', 'Expense', 2);
+        INSERT INTO BudgetAlerts VALUES (1, 1, 2025, 4, 1, '80%', 85, 100, NULL, '2025-04-10', NULL),
+                                        (2, 1, 2025, 4, 1, 'projected', 85, 100, 140, '2025-04-10', NULL),
+                                        (3, 2, 2025, 4, 2, '100%', 210, 200, NULL, '2025-04-10', NULL);
+    """)
+    conn.commit()
+    conn.close()
+
+def test_pending_alerts_are_sent_once(tmp_path):
+    path = tmp_path / "finance.db"
+    create_database(path)
+    inbox = BudgetAlertInbox(ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False)))
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    async def scenario():
+        assert await inbox.deliver(1, send) == 2
+        assert await inbox.deliver(1, send) == 0
+
+    asyncio.run(scenario())
+    assert "85% of your **Food** budget" in sent[0]
+    assert "about 140.00" in sent[1]
+    assert inbox.delivered == 2
+    # The alerts of the other user are still pending
+    assert inbox.take(2)[0].to_message().startswith("🚨 You have exceeded your **Fuel** budget")
@@ -0,0 +1,18 @@
+import asyncio
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from history_reducer import PINNED_METADATA_KEY, PIN_KEY_METADATA_KEY, TokenBudgetSummarizationReducer
+
+def context(date: str) -> ChatMessageContent:
+    return ChatMessageContent(role=AuthorRole.ASSISTANT, content=f"CONTEXT: today is {date}",
+                              metadata={PINNED_METADATA_KEY: "true", PIN_KEY_METADATA_KEY: "context", "date": date})
+
+def test_only_the_latest_context_message_is_kept():
+    reducer = TokenBudgetSummarizationReducer(max_tokens=3000, target_count=2)
+    reducer.messages = [context("17-Oct-2026"), ChatMessageContent(role=AuthorRole.USER, content="Hi"),
+                        context("18-Oct-2026"), ChatMessageContent(role=AuthorRole.USER, content="Record 12 for lunch")]
+
+    assert asyncio.run(reducer.reduce()) is reducer
+    assert [message.content for message in reducer.messages] == ["CONTEXT: today is 18-Oct-2026", "Hi", "Record 12 for lunch"]
+    # Nothing else to drop
+    assert asyncio.run(reducer.reduce()) is None
@@ -0,0 +1,17 @@
+import asyncio
+from PIL import Image
+from image_processing import ReceiptPreprocessor
+
+def test_processed_images_are_temporary(tmp_path):
+    photo = tmp_path / "receipt.png"
+    Image.effect_noise((1200, 1600), 60).convert("RGB").save(photo)
+    preprocessor = ReceiptPreprocessor(max_workers=1, max_long_edge=400)
+    try:
+        result = asyncio.run(preprocessor.process(str(photo)))
+        assert result.path != str(photo) and result.processed_bytes < result.original_bytes
+        preprocessor.discard(result)
+        assert list(preprocessor.output_dir.iterdir()) == []
+        assert photo.exists()
+    finally:
+        preprocessor.shutdown()
+    assert not preprocessor.output_dir.exists()
@@ -0,0 +1,38 @@
+from router import AgentRouter, Turn
+
+router = AgentRouter(
+    host_agent_name="HostAgent",
+    setup_agent_name="SetupAgent",
+    transactions_agent_name="TransactionsAgent",
+    analyzer_agent_name="AnalyzerAgent",
+)
+
+def user(text, has_image=False):
+    return Turn(role="user", text=text, has_image=has_image)
+
+def agent(name, text):
+    return Turn(role="assistant", text=text, name=name)
+
+def test_image_goes_to_vision_agent():
+    assert router.route([user("record this", has_image=True)]) == "VisionAgent"
+
+def test_statement_file_goes_to_transactions_agent():
+    assert router.route([user("import this (Statement file url: https://x/y.csv)")]) == "TransactionsAgent"
+
+def test_clear_intents_are_routed_locally():
+    assert router.route([user("I want to create a category")]) == "SetupAgent"
+    assert router.route([user("I spent $45 on groceries today")]) == "TransactionsAgent"
+    assert router.route([user("I want to analyze my transactions of the last month")]) == "AnalyzerAgent"
+
+def test_agent_waiting_for_an_answer_keeps_the_turn():
+    turns = [user("I spent 20 on lunch"), agent("TransactionsAgent", "Which account did you use?"), user("Cash")]
+    assert router.route(turns) == "TransactionsAgent"
+
+def test_confirmed_receipt_goes_to_transactions_agent():
+    turns = [user("receipt", has_image=True), agent("VisionAgent", "Is this information correct?"), user("Yes")]
+    assert router.route(turns) == "TransactionsAgent"
+
+def test_ambiguous_turn_falls_back_to_the_llm():
+    local_router = AgentRouter("HostAgent", "SetupAgent", "TransactionsAgent", "AnalyzerAgent")
+    assert local_router.route([user("What about my accounts?")]) is None
+    assert local_router.metrics.snapshot()["misses"] == 1
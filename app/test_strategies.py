@@ -0,0 +1,45 @@
+import asyncio
+from semantic_kernel import Kernel
+from semantic_kernel.agents import AgentGroupChat, ChatCompletionAgent
+from semantic_kernel.agents.strategies import SequentialSelectionStrategy
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.contents import AuthorRole, ChatMessageContent, StreamingChatMessageContent
+from semantic_kernel.functions import KernelFunctionFromPrompt
+
+from strategies import HeuristicTerminationStrategy
+
+class ScriptedChatService(ChatCompletionClientBase):
+    """Answers every request with the next scripted reply."""
+    replies: list[str]
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings):
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=self.replies.pop(0))]
+
+    async def _inner_get_streaming_chat_message_contents(self, chat_history, settings, function_invoke_attempt=0):
+        yield [StreamingChatMessageContent(role=AuthorRole.ASSISTANT, content=self.replies.pop(0), choice_index=0)]
+
+def test_the_same_chat_serves_consecutive_turns():
+    kernel = Kernel()
+    kernel.add_service(ScriptedChatService(ai_model_id="scripted", service_id="scripted",
+                                           replies=["Which account did you use?", "Your expense has been recorded successfully."]))
+    agent = ChatCompletionAgent(kernel=kernel, name="TransactionsAgent", instructions="Record transactions.")
+    prompt = KernelFunctionFromPrompt(function_name="termination", prompt="Is the goal achieved?")
+    # Terminated like KernelChatGroup.initialize_chat_group, with decisions the heuristics take locally
+    chat = AgentGroupChat(
+        agents=[agent],
+        selection_strategy=SequentialSelectionStrategy(),
+        termination_strategy=HeuristicTerminationStrategy(mode="heuristic", agents=[agent], function=prompt, kernel=kernel,
+                                                          maximum_iterations=1),
+    )
+
+    async def turn(text: str) -> str:
+        await chat.add_chat_message(ChatMessageContent(role=AuthorRole.USER, content=text))
+        return "".join([str(response.content) async for response in chat.invoke_stream()])
+
+    async def scenario():
+        assert await turn("I spent 12 on lunch") == "Which account did you use?"
+        assert chat.is_complete
+        assert await turn("Cash") == "Your expense has been recorded successfully."
+        assert chat.termination_strategy.metrics.skipped_llm_calls == 2
+
+    asyncio.run(scenario())
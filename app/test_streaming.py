@@ -0,0 +1,37 @@
+import asyncio
+from streaming import TokenCoalescer
+
+class FakeMessage:
+    def __init__(self):
+        self.author = None
+        self.frames = []
+
+    async def stream_token(self, token):
+        self.frames.append((self.author, token))
+
+def test_tokens_are_coalesced_by_size_and_split_on_agent_switch():
+    message = FakeMessage()
+
+    async def scenario():
+        stream = TokenCoalescer(message, max_chars=10, max_delay=10)
+        for token in ["Hel", "lo ", "wor", "ld!"]:
+            await stream.add("HostAgent", token)
+        await stream.add("SetupAgent", "Next")
+        return await stream.close()
+
+    metrics = asyncio.run(scenario())
+    assert message.frames == [("HostAgent", "Hello world!"), ("SetupAgent", "Next")]
+    assert metrics.frames == 2 and metrics.tokens == 5
+    assert metrics.time_to_first_token_ms is not None
+
+def test_idle_buffer_is_flushed_after_the_delay():
+    message = FakeMessage()
+
+    async def scenario():
+        stream = TokenCoalescer(message, max_chars=1000, max_delay=0.01)
+        await stream.add("HostAgent", "partial")
+        await asyncio.sleep(0.05)
+        assert message.frames == [("HostAgent", "partial")]
+        await stream.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,20 @@
+from termination import TerminationHeuristics, TerminationMetrics
+
+heuristics = TerminationHeuristics()
+
+def test_question_to_the_user_ends_the_turn():
+    assert heuristics.decide("TransactionsAgent", "Which account did you use for this expense?") is True
+    assert heuristics.decide("SetupAgent", "Please provide the name of the new category.") is True
+
+def test_completed_tool_flow_ends_the_turn():
+    assert heuristics.decide("TransactionsAgent", "Your expense has been recorded successfully. 🎉") is True
+
+def test_undecided_response_is_left_to_the_llm():
+    assert heuristics.decide("HostAgent", "An emergency fund covers three to six months of expenses.") is None
+
+def test_metrics_report_skipped_calls_per_turn():
+    metrics = TerminationMetrics()
+    metrics.record_llm_call(500)
+    metrics.start_turn()
+    metrics.record_skip()
+    assert metrics.turn_snapshot() == {"skipped_llm_calls": 1, "llm_calls": 0, "ms_saved": 500}
@@ -0,0 +1,33 @@
+import json
+import urllib.request
+from tracing import JsonLinesSpanExporter, Tracer
+
+def test_child_spans_share_the_trace_and_session(tmp_path):
+    export_file = tmp_path / "spans.jsonl"
+    tracer = Tracer(exporter=JsonLinesSpanExporter(str(export_file), service_name="test"))
+
+    with tracer.span("turn", session_id="abc") as turn:
+        with tracer.span("selection", agent="SetupAgent"):
+            pass
+        tracer.record("agent_run", turn.start_ns, turn.start_ns + 5_000_000, agent="SetupAgent")
+
+    records = [json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0] for line in export_file.read_text().splitlines()]
+    assert [record["name"] for record in records] == ["selection", "agent_run", "turn"]
+    assert {record["traceId"] for record in records} == {turn.trace_id}
+    assert all(record["parentSpanId"] == turn.span_id for record in records[:2])
+    assert {"key": "session_id", "value": {"stringValue": "abc"}} in records[0]["attributes"]
+    assert turn.child("selection") is not None
+
+def test_percentiles_are_exposed_per_stage_and_agent():
+    tracer = Tracer()
+    for duration in range(1, 101):
+        tracer.aggregator.observe("agent_run", "AnalyzerAgent", float(duration))
+    stats = tracer.aggregator.percentiles()[("agent_run", "AnalyzerAgent")]
+    assert (stats[0.5], stats[0.95], stats[0.99], stats["count"]) == (51.0, 96.0, 100.0, 100)
+
+    server = tracer.serve_prometheus(port=0, host="127.0.0.1")
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics").read().decode()
+    finally:
+        server.shutdown()
+    assert 'pfm_stage_latency_milliseconds{stage="agent_run",agent="AnalyzerAgent",quantile="0.95"} 96.000' in body
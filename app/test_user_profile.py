@@ -0,0 +1,59 @@
+import sqlite3
+import asyncio
+import datetime
+from finance_data.db_pool import ConnectionPool
+from user_profile import UserProfile, UserProfileLoader, UserProfileStore
+
+def create_database(path):
+    conn = sqlite3.connect(path)
+    today = datetime.date.today()
+    conn.executescript("""
+        CREATE TABLE Accounts (Id INTEGER PRIMARY KEY, Name TEXT, Type TEXT, UserId INT);
+        CREATE TABLE Categories (Id INTEGER PRIMARY KEY, Name TEXT, Type TEXT, UserId INT);
+        CREATE TABLE Budget (Id INTEGER PRIMARY KEY, CategoryId INT, Year INT, Month INT, Amount REAL, UserId INT);
+        INSERT INTO Accounts VALUES (1, 'Cash', 'Cash', 1), (2, 'Visa', 'Credit card', 2);
+        INSERT INTO Categories VALUES (1, 'Food', 'Expense', 1);
+    """)
+    conn.execute("INSERT INTO Budget VALUES (1, 1, ?, ?, 300, 1)", (today.year, today.month))
+    conn.commit()
+    conn.close()
+
+def test_profile_is_loaded_once_until_invalidated(tmp_path):
+    path = tmp_path / "finance.db"
+    create_database(path)
+    store = UserProfileStore(UserProfileLoader(ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False))), user_id=1)
+
+    async def scenario():
+        profile = await store.get()
+        await store.get()
+        assert store.loads == 1
+        assert "1: Cash [Cash]" in profile.to_context()
+        assert "Visa" not in profile.to_context()
+        assert "Food: 300.00" in profile.to_context()
+
+        store.invalidate()
+        await store.get()
+        assert store.loads == 2 and store.version == 2
+
+    asyncio.run(scenario())
+
+def test_turns_served_and_lookups_are_counted():
+    store = UserProfileStore(loader=None, user_id=1)
+    store.record_turn({"get_user_accounts"})
+    assert store.turns_served == 0  # No snapshot in the context
+
+    store.profile = UserProfile(user_id=1)
+    store.record_turn({"record_transaction"})
+    store.record_turn({"get_user_accounts", "get_transaction_categories"})
+    assert (store.turns_served, store.lookup_turns) == (2, 1)
+
+def test_failed_load_is_retried(tmp_path):
+    path = tmp_path / "finance.db"
+    store = UserProfileStore(UserProfileLoader(ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False))), user_id=1)
+
+    async def scenario():
+        assert await store.get() is None  # No tables yet
+        create_database(path)
+        assert (await store.get()).accounts[0]["name"] == "Cash"
+
+    asyncio.run(scenario())
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+    # Finished child spans, kept so a turn can derive stages from them (not exported)
+    children: list = field(default_factory=list, repr=False)
+    parent: "Span | None" = field(default=None, repr=False)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def child(self, name: str) -> "Span | None":
+        """Last finished child span with the given name."""
+        return next((span for span in reversed(self.children) if span.name == name), None)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+# Span currently open in this task; child spans take their trace and parent from it
+current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+class LatencyAggregator:
+    """Keeps the most recent durations per (stage, agent) and computes percentiles over them."""
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._samples: dict[tuple[str, str], deque] = {}
+        self._counts: dict[tuple[str, str], int] = {}
+        self._sums: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, agent: str, duration_ms: float) -> None:
+        key = (stage, agent)
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(duration_ms)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._sums[key] = self._sums.get(key, 0.0) + duration_ms
+
+    def percentiles(self, quantiles: tuple[float, ...] = (0.5, 0.95, 0.99)) -> dict[tuple[str, str], dict]:
+        result = {}
+        with self._lock:
+            for key, samples in self._samples.items():
+                ordered = sorted(samples)
+                stats = {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles}
+                stats["count"] = self._counts[key]
+                stats["sum"] = self._sums[key]
+                result[key] = stats
+        return result
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP pfm_stage_latency_milliseconds Latency of each chat stage per agent.",
+            "# TYPE pfm_stage_latency_milliseconds summary",
+        ]
+        for (stage, agent), stats in sorted(self.percentiles().items()):
+            labels = f'stage="{stage}",agent="{agent}"'
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'pfm_stage_latency_milliseconds{{{labels},quantile="{q}"}} {stats[q]:.3f}')
+            lines.append(f"pfm_stage_latency_milliseconds_sum{{{labels}}} {stats['sum']:.3f}")
+            lines.append(f"pfm_stage_latency_milliseconds_count{{{labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+class JsonLinesSpanExporter:
+    """Appends each span as one OTLP/JSON resourceSpans record per line."""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        record = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "personal-finance-manager"},
+                    "spans": [{
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        "parentSpanId": span.parent_id or "",
+                        "name": span.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": [{"key": key, "value": otlp_value(value)} for key, value in span.attributes.items()],
+                        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                    }],
+                }],
+            }]
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class Tracer:
+    """Structured spans for the stages of a chat turn, aggregated per agent and optionally exported."""
+
+    def __init__(self, exporter: JsonLinesSpanExporter | None = None, enabled: bool = True):
+        self.exporter = exporter
+        self.enabled = enabled
+        self.aggregator = LatencyAggregator()
+
+    def _new_span(self, name: str, attributes: dict) -> Span:
+        parent = current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+            parent=parent,
+        )
+        # Every span of a turn carries the session ID of the turn
+        if parent and "session_id" in parent.attributes:
+            span.attributes.setdefault("session_id", parent.attributes["session_id"])
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self._new_span(name, attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.finish(span)
+
+    def record(self, name: str, start_ns: int, end_ns: int, **attributes) -> Span:
+        """Record a span whose boundaries were measured elsewhere."""
+        span = self._new_span(name, attributes)
+        span.start_ns, span.end_ns = start_ns, end_ns
+        self.finish(span)
+        return span
+
+    def finish(self, span: Span) -> None:
+        if span.parent is not None:
+            span.parent.children.append(span)
+        if not self.enabled:
+            return
+        self.aggregator.observe(span.name, str(span.attributes.get("agent", "-")), span.duration_ms)
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+    def serve_prometheus(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Expose /metrics in Prometheus text format from a background thread."""
+        aggregator = self.aggregator
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = aggregator.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                return
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="prometheus-metrics", daemon=True).start()
+        return server
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import datetime
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Tools whose answers are in the snapshot: agents calling them anyway looked the data up again
+LOOKUP_TOOLS = {"get_user_accounts", "get_transaction_categories"}
+
+@dataclass
+class UserProfile:
+    """Compact snapshot of the user's accounts, categories and current-month budgets."""
+    user_id: int
+    accounts: list[dict] = field(default_factory=list)
+    categories: list[dict] = field(default_factory=list)
+    budgets: list[dict] = field(default_factory=list)
+    period: str = ""
+
+    def to_context(self) -> str:
+        accounts = "; ".join(f"{a['id']}: {a['name']} [{a['type']}]" for a in self.accounts) or "none"
+        categories = "; ".join(f"{c['id']}: {c['name']} [{c['type']}]" for c in self.categories) or "none"
+        budgets = "; ".join(f"{b['category']}: {b['amount']:.2f}" for b in self.budgets) or "none"
+        return "\n".join([
+            f"- User accounts (id: name [type]): {accounts}",
+            f"- User categories (id: name [type]): {categories}",
+            f"- Budgets for {self.period} (category: amount): {budgets}",
+        ])
+
+class UserProfileLoader:
+    """Loads a UserProfile from the finance database through the data layer's connection pool (finance_data.tools.pool)."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def load(self, user_id: int) -> UserProfile:
+        today = datetime.date.today()
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT Id, Name, Type FROM Accounts WHERE UserId = ?", (user_id,)).fetchall()
+            accounts = [{"id": row[0], "name": row[1], "type": row[2]} for row in rows]
+
+            rows = conn.execute("SELECT Id, Name, Type FROM Categories WHERE UserId = ?", (user_id,)).fetchall()
+            categories = [{"id": row[0], "name": row[1], "type": row[2]} for row in rows]
+
+            rows = conn.execute(
+                """SELECT c.Name, b.Amount FROM Budget b JOIN Categories c ON c.Id = b.CategoryId
+                WHERE b.UserId = ? AND b.Year = ? AND b.Month = ?""",
+                (user_id, today.year, today.month),
+            ).fetchall()
+            budgets = [{"category": row[0], "amount": float(row[1])} for row in rows]
+
+        return UserProfile(user_id, accounts, categories, budgets, period=today.strftime("%b-%Y"))
+
+class UserProfileStore:
+    """
+    Per-session holder of the user profile snapshot.
+    The profile is loaded once and reloaded only after a setup tool wrote accounts or categories.
+    """
+
+    def __init__(self, loader: UserProfileLoader, user_id: int):
+        self.loader = loader
+        self.user_id = user_id
+        self.profile: UserProfile | None = None
+        self.version = 0
+        self.stale = True
+        self.loads = 0
+        self.turns_served = 0
+        self.lookup_turns = 0
+
+    async def get(self) -> UserProfile | None:
+        if self.stale:
+            try:
+                self.profile = await asyncio.to_thread(self.loader.load, self.user_id)
+                self.loads += 1
+                self.version += 1
+                self.stale = False
+            except Exception as e:
+                # Retried on the next turn; meanwhile the agents look the data up with their tools
+                logger.warning("Could not load the profile of user %s: %s", self.user_id, e)
+                self.profile = None
+        return self.profile
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    def record_turn(self, function_names: set[str]) -> None:
+        """Count the agent turns that had the snapshot in their context, and those that still called a lookup tool."""
+        if self.profile is not None:
+            self.turns_served += 1
+            if function_names & LOOKUP_TOOLS:
+                self.lookup_turns += 1
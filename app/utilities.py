@@ -1,12 +1,22 @@
 import os
-from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient
 from dotenv import load_dotenv        
 
+from blob_storage import AzureBlobBackend, BlobStorageBackend, LocalFileBackend, ReceiptUploader
+
 # Load environment variables 
 load_dotenv()
 AZURE_STORAGE_ACCOUNT_URL = os.getenv("AZURE_STORAGE_ACCOUNT_URL")
 AZURE_STORAGE_CONTAINER_NAME = os.getenv("AZURE_STORAGE_CONTAINER_NAME")
+BLOB_STORAGE_BACKEND = os.getenv("BLOB_STORAGE_BACKEND", "azure").lower()
+LOCAL_BLOB_STORAGE_PATH = os.getenv("LOCAL_BLOB_STORAGE_PATH", ".files/uploads")
+
+def create_blob_backend() -> BlobStorageBackend:
+    if BLOB_STORAGE_BACKEND == "local":
+        return LocalFileBackend(LOCAL_BLOB_STORAGE_PATH)
+    return AzureBlobBackend(AZURE_STORAGE_ACCOUNT_URL, AZURE_STORAGE_CONTAINER_NAME)
+
+# One uploader (and one pooled storage client) for the whole process
+uploader: ReceiptUploader | None = None
 
 class Utilities:
 
@@ -26,36 +36,14 @@ class Utilities:
         else:
             return None
         
-    def upload_to_azure_blob(self, file_path, blob_name=None):
+    async def upload_to_azure_blob(self, file_path, blob_name=None) -> str:
+        global uploader
+        if uploader is None:
+            uploader = ReceiptUploader(create_blob_backend())
 
-        default_credential = DefaultAzureCredential()
+        # The blob is named after the file content; blob_name only provides the extension
+        url = await uploader.upload_file(file_path, file_name=blob_name)
+        print(f"File '{file_path}' stored as '{url}'")
 
-        # Create the BlobServiceClient object
-        blob_service_client = BlobServiceClient(AZURE_STORAGE_ACCOUNT_URL, credential=default_credential)
-        
-        # Get a reference to the container
-        container_client = blob_service_client.get_container_client(AZURE_STORAGE_CONTAINER_NAME)
-        
-        # Create the container if it doesn't exist
-        if not container_client.exists():
-            container_client.create_container()
-            print(f"Container '{AZURE_STORAGE_CONTAINER_NAME}' created")
-        
-        # If blob_name not specified, use the file name
-        if blob_name is None:
-            blob_name = os.path.basename(file_path)
-        
-        # Create blob client
-        blob_client = blob_service_client.get_blob_client(
-            container=AZURE_STORAGE_CONTAINER_NAME, 
-            blob=blob_name
-        )
-        
-        # Upload the file
-        with open(file_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
-        
-        print(f"File '{file_path}' uploaded to container '{AZURE_STORAGE_CONTAINER_NAME}' as '{blob_name}'")
-        
         # Return the URL of the blob
-        return blob_client.url
\ No newline at end of file
+        return url
@@ -0,0 +1,98 @@
+"""
+Benchmark analyze_transactions against answering the analysis catalog with one generated SQL query per question.
+
+For each size, one user gets that many transactions over 24 months in a local SQLite database. The
+per-question path runs the queries the AnalyzerAgent writes for each section of its instructions
+through fetch_data_using_sql_query (with the SQL guard, without the result cache); the analytics path
+fetches the transactions once and computes every section with NumPy. --round-trip-ms adds the network
+round trip to Azure SQL to every statement of both paths.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_analytics.py [--sizes 10000 100000 1000000] [--repeat 3] [--round-trip-ms 0]
+"""
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import date
+from pathlib import Path
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.sql_guard import SqlGuard
+from finance_data.sql_query import SqlQueryService
+from finance_data.analytics import AnalyticsService
+
+# One query per question of the analysis catalog, as the agent writes them
+QUESTIONS = {
+    "category totals": "SELECT c.Name, t.Type, SUM(t.Amount) AS Total, COUNT(*) AS Count FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId "
+                       "WHERE t.UserId = {user} AND t.Date >= '{start}' GROUP BY c.Name, t.Type ORDER BY Total DESC",
+    "distribution": "SELECT c.Name, SUM(t.Amount) * 100.0 / SUM(SUM(t.Amount)) OVER () AS Percentage FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId "
+                    "WHERE t.UserId = {user} AND t.Type = 'Expense' AND t.Date >= '{start}' GROUP BY c.Name",
+    "monthly evolution": "SELECT YEAR(Date) AS Year, MONTH(Date) AS Month, SUM(CASE WHEN Type = 'Income' THEN Amount ELSE 0 END) AS Income, "
+                         "SUM(CASE WHEN Type = 'Expense' THEN Amount ELSE 0 END) AS Expenses FROM Transactions "
+                         "WHERE UserId = {user} AND Date >= '{start}' GROUP BY YEAR(Date), MONTH(Date) ORDER BY Year, Month",
+    "deficit months": "SELECT YEAR(Date) AS Year, MONTH(Date) AS Month, SUM(CASE WHEN Type = 'Income' THEN Amount ELSE -Amount END) AS Net "
+                      "FROM Transactions WHERE UserId = {user} AND Date >= '{start}' GROUP BY YEAR(Date), MONTH(Date) "
+                      "HAVING SUM(CASE WHEN Type = 'Income' THEN Amount ELSE -Amount END) < 0",
+    "budget compliance": "SELECT c.Name, b.Year, b.Month, b.Amount AS Budget, SUM(t.Amount) AS Spent FROM Budget b "
+                         "JOIN Categories c ON c.Id = b.CategoryId JOIN Transactions t ON t.CategoryId = b.CategoryId AND t.UserId = b.UserId "
+                         "AND YEAR(t.Date) = b.Year AND MONTH(t.Date) = b.Month WHERE b.UserId = {user} AND t.Type = 'Expense' "
+                         "GROUP BY c.Name, b.Year, b.Month, b.Amount HAVING SUM(t.Amount) > b.Amount",
+    "day of week": "SELECT DATENAME(weekday, Date) AS Day, SUM(Amount) AS Total, COUNT(*) AS Count FROM Transactions "
+                   "WHERE UserId = {user} AND Type = 'Expense' AND Date >= '{start}' GROUP BY DATENAME(weekday, Date) ORDER BY Total DESC",
+    "frequency": "SELECT COUNT(*) AS Count, COUNT(DISTINCT CAST(Date AS DATE)) AS Days, MIN(Date) AS First, MAX(Date) AS Last "
+                 "FROM Transactions WHERE UserId = {user} AND Type = 'Expense' AND Date >= '{start}'",
+    "outliers": "WITH s AS (SELECT CategoryId, AVG(Amount) AS Average, AVG(Amount * Amount) AS Square, COUNT(*) AS Count FROM Transactions "
+                "WHERE UserId = {user} AND Date >= '{start}' GROUP BY CategoryId) "
+                "SELECT TOP 10 t.Id, t.Date, t.Amount, t.Description, s.Average FROM Transactions t JOIN s ON s.CategoryId = t.CategoryId "
+                "WHERE t.UserId = {user} AND t.Date >= '{start}' AND s.Count >= 8 "
+                "AND (t.Amount - s.Average) * (t.Amount - s.Average) > 9 * (s.Square - s.Average * s.Average) ORDER BY t.Amount - s.Average DESC",
+    "projection": "SELECT SUM(Amount) AS Spent FROM Transactions WHERE UserId = {user} AND Type = 'Expense' AND Date >= '{month}'",
+    "year over year": "SELECT YEAR(Date) AS Year, MONTH(Date) AS Month, SUM(Amount) AS Expenses FROM Transactions "
+                      "WHERE UserId = {user} AND Type = 'Expense' AND Date >= '{start}' GROUP BY YEAR(Date), MONTH(Date)",
+}
+
+def timed(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--round-trip-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    today = date.today()
+    start = date(today.year - 2, today.month, 1).isoformat()
+    values = {"user": 1, "start": start, "month": today.replace(day=1).isoformat()}
+    print(f"{'rows':>9} {'per-question ms':>16} {'queries':>8} {'analytics ms':>13} {'statements':>11} {'speedup':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            storage = SqliteStorage(Path(directory) / "finance.db")
+            storage.initialize()
+            SyntheticDataGenerator(storage).generate(users=1, transactions=size)
+            pool = ConnectionPool(storage.connect)
+            sql_service = SqlQueryService(pool, storage, guard=SqlGuard())
+            analytics = AnalyticsService(pool, storage)
+
+            queries = [query.format(**values) for query in QUESTIONS.values()]
+            for query in queries:
+                assert "error" not in json.loads(sql_service.fetch(1, query)), query
+            per_question = timed(lambda: [sql_service.fetch(1, query) for query in queries], args.repeat)
+            # Every generated query also reads the data version and the table sizes for the guard
+            per_question += len(queries) * 2 * args.round_trip_ms
+            summary = json.loads(analytics.analyze(1, start))
+            statements = 4 if summary["outliers"] else 3
+            vectorized = timed(lambda: analytics.analyze(1, start), args.repeat) + statements * args.round_trip_ms
+            print(f"{summary['range']['transactions']:>9,} {per_question:16.1f} {len(queries):>8} {vectorized:13.1f} {statements:>11} {per_question / vectorized:7.1f}x")
+
+if __name__ == "__main__":
+    main()
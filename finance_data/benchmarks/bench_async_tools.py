@@ -0,0 +1,81 @@
+"""
+Benchmark concurrent tool calls with blocking vs async user functions.
+
+N simulated runs each call get_user_accounts-style lookups against a local SQLite database,
+with --latency-ms added to every query for the network round trip to Azure SQL. The blocking
+variant calls the function inside the event loop (what a sync tool does in an async process);
+the async variant awaits the DatabaseExecutor wrapper. Reports wall time and the worst event-loop stall.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_async_tools.py [--runs 50] [--calls 4] [--latency-ms 20]
+"""
+import json
+import time
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from finance_data.db_pool import ConnectionPool, DatabaseExecutor
+
+async def monitor_loop(stop: asyncio.Event, stalls: list[float], interval: float = 0.005) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+async def measure(runs: int, calls: int, tool) -> tuple[float, float]:
+    stop, stalls = asyncio.Event(), []
+    monitor = asyncio.create_task(monitor_loop(stop, stalls))
+    await asyncio.sleep(0)
+
+    async def run(user_id: int) -> None:
+        for _ in range(calls):
+            result = tool(user_id)
+            if asyncio.iscoroutine(result):
+                await result
+            # Model latency between the tool calls of one run
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i % 10 + 1) for i in range(runs)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    return elapsed, max(stalls, default=0.0)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50, help="Concurrent agent runs")
+    parser.add_argument("--calls", type=int, default=4, help="Tool calls per run")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated network round trip per query")
+    parser.add_argument("--workers", type=int, default=8, help="Connection pool and executor size")
+    args = parser.parse_args()
+
+    path = Path(tempfile.mkdtemp()) / "bench.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("CREATE TABLE Accounts (Id INTEGER PRIMARY KEY, UserId INTEGER, Name TEXT, Type TEXT);")
+    conn.executemany("INSERT INTO Accounts (UserId, Name, Type) VALUES (?, ?, ?)", [(u, f"Account {i}", "Bank") for u in range(1, 11) for i in range(5)])
+    conn.commit()
+    conn.close()
+
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), max_size=args.workers)
+
+    def get_user_accounts(user_id: int) -> str:
+        with pool.connection() as conn:
+            time.sleep(args.latency_ms / 1000)
+            rows = conn.execute("SELECT Id, Name, Type FROM Accounts WHERE UserId = ?", (user_id,)).fetchall()
+        return json.dumps({"accounts": [{"id": row[0], "name": row[1], "type": row[2]} for row in rows]})
+
+    executor = DatabaseExecutor(max_workers=args.workers)
+    blocking = asyncio.run(measure(args.runs, args.calls, get_user_accounts))
+    non_blocking = asyncio.run(measure(args.runs, args.calls, executor.wrap(get_user_accounts)))
+    executor.shutdown()
+
+    calls = args.runs * args.calls
+    print(f"blocking tools: {blocking[0] * 1000:8.0f} ms for {calls} calls, worst loop stall {blocking[1] * 1000:6.1f} ms")
+    print(f"async tools:    {non_blocking[0] * 1000:8.0f} ms for {calls} calls, worst loop stall {non_blocking[1] * 1000:6.1f} ms")
+
+if __name__ == "__main__":
+    main()
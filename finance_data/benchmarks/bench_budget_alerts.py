@@ -0,0 +1,84 @@
+"""
+Benchmark budget alerts: evaluated on each write vs polling the budgets.
+
+Generates synthetic history in a local SQLite database, then records --writes expenses in the current
+month through TransactionWriter with and without the BudgetAlertEvaluator, and times one polling pass
+that compares the month-to-date Transactions sums of every user with their budgets (what a periodic
+alert job would run every few minutes, whether anything was recorded or not).
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_budget_alerts.py [--users 20] [--transactions 200000] [--writes 200]
+"""
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import date
+from pathlib import Path
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.transaction_writer import TransactionWriter
+from finance_data.budget_alerts import BudgetAlertEvaluator
+
+POLL_SQL = """
+SELECT b.UserId, b.CategoryId, b.Amount, SUM(t.Amount) AS Spent
+FROM Budget b
+JOIN Transactions t ON t.UserId = b.UserId AND t.CategoryId = b.CategoryId AND t.Type = 'Expense'
+ AND t.Date >= ? AND t.Date < ?
+WHERE b.Year = ? AND b.Month = ?
+GROUP BY b.UserId, b.CategoryId, b.Amount
+HAVING SUM(t.Amount) >= 0.8 * b.Amount
+"""
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    today = date.today()
+    first = today.replace(day=1)
+    after = (first.replace(year=first.year + 1, month=1) if first.month == 12 else first.replace(month=first.month + 1))
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        conn = storage.connect()
+        # Current-month budgets of every expense category, so every write is evaluated
+        conn.execute("""INSERT OR IGNORE INTO Budget (CategoryId, Year, Month, Amount, UserId)
+                        SELECT Id, ?, ?, 300, UserId FROM Categories WHERE Type = 'Expense'""", (today.year, today.month))
+        conn.commit()
+        categories = conn.execute("SELECT c.UserId, c.Id, MIN(a.Id) FROM Categories c JOIN Accounts a ON a.UserId = c.UserId "
+                                  "WHERE c.Type = 'Expense' GROUP BY c.UserId, c.Id").fetchall()
+
+        rng = random.Random(0)
+        pool = ConnectionPool(storage.connect, max_size=1)
+        writers = {"record": TransactionWriter(pool, "sqlite"),
+                   "record + alerts": TransactionWriter(pool, "sqlite", alerts=BudgetAlertEvaluator("sqlite"))}
+        timings = {name: [] for name in writers}
+        for index in range(args.writes):
+            name = "record" if index % 2 else "record + alerts"
+            user_id, category_id, account_id = rng.choice(categories)
+            transaction = {"Type": "Expense", "AccountId": account_id, "CategoryId": category_id,
+                           "Date": today.isoformat(), "Amount": round(rng.uniform(5, 60), 2), "Description": "Benchmark"}
+            start = time.perf_counter()
+            writers[name].record(user_id, [transaction])
+            timings[name].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        over = conn.execute(POLL_SQL, (first.isoformat(), after.isoformat(), today.year, today.month)).fetchall()
+        poll_ms = (time.perf_counter() - start) * 1000
+        raised = conn.execute("SELECT COUNT(*) FROM BudgetAlerts").fetchone()[0]
+
+    for name, values in timings.items():
+        print(f"{name:<16} p50 {statistics.median(values):8.3f} ms per write")
+    # The writes only raise the alerts of the budgets they cross; the poll lists every budget already above 80%
+    print(f"{raised} alerts raised by the writes; one polling pass over {args.transactions:,} transactions took {poll_ms:.1f} ms "
+          f"({len(over)} budgets at 80% or more)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the duplicate check of a new transaction: fingerprint index seek vs a scan of the user's history.
+
+Generates synthetic history in a local SQLite database, backfills the fingerprints, then checks
+--checks random transactions both ways: DuplicateDetector.find, and loading every transaction of
+the user to compare amount, date and description in Python (what catching duplicates afterwards takes).
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_duplicates.py [--users 20] [--transactions 200000] [--checks 200]
+"""
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.duplicates import DuplicateDetector, Fingerprint, normalize_description, similarity
+
+def scan(conn, fingerprint: Fingerprint) -> list[int]:
+    rows = conn.execute("SELECT Id, Date, Amount, Description FROM Transactions WHERE UserId = ?", (fingerprint.user_id,)).fetchall()
+    matches = []
+    for transaction_id, date, amount, description in rows:
+        candidate = Fingerprint.of(fingerprint.user_id, date, amount, description, None)
+        if (candidate.amount_cents == fingerprint.amount_cents and abs(candidate.day_number - fingerprint.day_number) <= 1
+                and similarity(candidate.description, fingerprint.description) >= 0.5):
+            matches.append(transaction_id)
+    return matches
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--checks", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        detector = DuplicateDetector()
+        backfill = detector.backfill(storage)
+        print(f"Backfilled {backfill.fingerprinted} fingerprints in {backfill.seconds:.1f} s "
+              f"({backfill.fingerprinted / backfill.seconds:,.0f} rows/s)")
+
+        conn = storage.connect()
+        rng = random.Random(0)
+        samples = conn.execute("SELECT UserId, Date, Amount, Description FROM Transactions ORDER BY RANDOM() LIMIT ?", (args.checks,)).fetchall()
+        timings = {"index": [], "scan": []}
+        for user_id, date, amount, description in samples:
+            # A re-said expense: same amount, a slightly different description
+            fingerprint = Fingerprint.of(user_id, date, amount, description + rng.choice(["", " again", "!"]), None)
+            start = time.perf_counter()
+            found = {duplicate["Id"] for duplicate in detector.find(conn, fingerprint)}
+            timings["index"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            scanned = set(scan(conn, fingerprint))
+            timings["scan"].append((time.perf_counter() - start) * 1000)
+            assert found == scanned, (found, scanned, normalize_description(description))
+
+    print(f"{args.checks} checks against {args.transactions // args.users:,} transactions per user")
+    for name, values in timings.items():
+        print(f"{name:<6} p50 {statistics.median(values):8.3f} ms  max {max(values):8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark the nightly spending forecast batch.
+
+Compares fitting every (user, category) series with its own least squares call to fitting the
+series of the same history length together, then runs the whole batch (read MonthlySummary and
+Budget, fit, write SpendingForecasts) on a local SQLite database with one and with several
+worker processes.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_forecasting.py [--users 2000] [--transactions 400000] [--workers 4]
+"""
+import os
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.forecasting import HISTORY_MONTHS, fit, run_forecasts
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--transactions", type=int, default=400000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    # Ten expense categories per user
+    series = np.random.default_rng(0).gamma(2, 50, size=(HISTORY_MONTHS, args.users * 10))
+    targets = HISTORY_MONTHS + np.arange(4)
+    start = time.perf_counter()
+    for column in range(series.shape[1]):
+        fit(series[:, column:column + 1], 0, targets)
+    one_by_one = time.perf_counter() - start
+    start = time.perf_counter()
+    fit(series, 0, targets)
+    together = time.perf_counter() - start
+    print(f"Fit {series.shape[1]:,} series: one by one {one_by_one * 1000:.0f} ms, together {together * 1000:.1f} ms ({one_by_one / together:.0f}x)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        generation = SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        print(f"Loaded {generation.transactions:,} transactions in {generation.seconds:.1f} s")
+        for workers in sorted({1, args.workers}):
+            report = run_forecasts(storage, workers=workers)
+            print(f"Batch with {workers} workers: {report.forecasts:,} forecasts for {report.users:,} users in {report.seconds:.2f} s "
+                  f"({report.users / report.seconds:,.0f} users/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark the bulk statement import against a local SQLite database.
+
+Writes a synthetic CSV statement of --rows rows, imports it with the StatementImporter and
+reports rows/s and the peak traced memory, which stays flat as --rows grows. The baseline
+inserts and commits one row at a time, like one record_transaction call per row.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_import.py [--rows 200000] [--batch-size 1000] [--commit-every 10000]
+"""
+import csv
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+from datetime import date, timedelta
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.statement_import import StatementImporter, INSERT_TRANSACTION_SQL, parse_statement
+
+sqlite3.register_adapter(Decimal, str)
+
+DESCRIPTIONS = ["Supermarket groceries", "Fuel station", "Restaurant", "Pharmacy", "Salary", "Cinema", "Electricity bill"]
+
+def write_statement(path: Path, rows: int) -> None:
+    start = date(2024, 1, 1)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Date", "Description", "Amount"])
+        for i in range(rows):
+            description = random.choice(DESCRIPTIONS)
+            amount = 2500 if description == "Salary" else -round(random.uniform(2, 300), 2)
+            writer.writerow([(start + timedelta(days=i % 365)).isoformat(), description, f"{amount:.2f}"])
+
+def create_database(path: Path) -> None:
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Accounts (Id INTEGER PRIMARY KEY, Name TEXT, UserId INTEGER);
+        CREATE TABLE Categories (Id INTEGER PRIMARY KEY, Name TEXT, Type TEXT, UserId INTEGER);
+        CREATE TABLE Transactions (Id INTEGER PRIMARY KEY, Type TEXT, AccountId INTEGER, CategoryId INTEGER,
+            UserId INTEGER, Date TEXT, Amount REAL, Description TEXT, AttachmentUrl TEXT);
+        INSERT INTO Accounts VALUES (1, 'Checking', 1);
+        INSERT INTO Categories VALUES (1, 'Groceries', 'Expense', 1), (2, 'Salary', 'Income', 1), (3, 'Uncategorized', NULL, 1);
+    """)
+    conn.commit()
+    conn.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--commit-every", type=int, default=10000)
+    parser.add_argument("--baseline-rows", type=int, default=2000, help="Rows inserted one commit at a time")
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp())
+    statement, database = directory / "statement.csv", directory / "finance.db"
+    write_statement(statement, args.rows)
+    create_database(database)
+    pool = ConnectionPool(lambda: sqlite3.connect(database, check_same_thread=False))
+    importer = StatementImporter(pool, batch_size=args.batch_size, commit_every=args.commit_every)
+
+    # Baseline: one insert and one commit per row
+    mapper = importer.load_mapper(user_id=1, account_id=1)
+    with open(statement, encoding="utf-8", newline="") as file, pool.connection() as conn:
+        rows = parse_statement(file, "csv")
+        start = time.perf_counter()
+        for _, row in zip(range(args.baseline_rows), rows):
+            conn.execute(INSERT_TRANSACTION_SQL, mapper.map(row))
+            conn.commit()
+        baseline = args.baseline_rows / (time.perf_counter() - start)
+
+    report = importer.import_file(statement, user_id=1, account_id=1)
+
+    # Second pass for the memory peak only, tracemalloc slows the import down
+    tracemalloc.start()
+    importer.import_file(statement, user_id=1, account_id=1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"row by row:  {baseline:10.0f} rows/s")
+    print(f"bulk import: {report.rows_per_second:10.0f} rows/s  ({report.rows_imported} rows, {report.batches} batches, {report.commits} commits)")
+    print(f"peak traced memory during import: {peak / 1024:.0f} KiB for a {statement.stat().st_size / 1024 / 1024:.1f} MiB statement")
+
+if __name__ == "__main__":
+    main()
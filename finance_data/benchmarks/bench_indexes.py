@@ -0,0 +1,129 @@
+"""
+Benchmark representative agent queries before and after the schema migrations.
+
+Generates synthetic history in a local SQLite database with the base schema only (primary and
+foreign keys, like database/azure-sql-schema.sql), then runs a suite of queries generated from the
+AnalyzerAgent and user-function patterns with random users, categories and date ranges. Records the
+query plan and median time of each pattern, applies the migrations in database/migrations and runs
+the same queries again. Queries are written in T-SQL and translated for SQLite.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_indexes.py [--users 50] [--transactions 500000] [--queries 20] [--output report.json]
+"""
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.migrations import apply_migrations
+
+PATTERNS = {
+    "accounts lookup": "SELECT Id, Name, Type FROM Accounts WHERE UserId = {user}",
+    "categories by type": "SELECT Id, Name FROM Categories WHERE UserId = {user} AND Type = 'Expense'",
+    "spending by category": """
+        SELECT c.Name, SUM(t.Amount) AS Total FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId
+        WHERE t.UserId = {user} AND t.Type = 'Expense' AND t.Date >= '{start}' AND t.Date < '{end}'
+        GROUP BY c.Name ORDER BY Total DESC""",
+    "category evolution": """
+        SELECT FORMAT(Date, 'yyyy-MM') AS Month, SUM(Amount) AS Total FROM Transactions
+        WHERE UserId = {user} AND CategoryId = {category} AND Date >= '{start}'
+        GROUP BY FORMAT(Date, 'yyyy-MM') ORDER BY Month""",
+    "weekday spending": """
+        SELECT DATENAME(weekday, Date) AS Day, SUM(Amount) AS Total FROM Transactions
+        WHERE UserId = {user} AND Type = 'Expense' AND Date >= '{start}' AND Date < '{end}'
+        GROUP BY DATENAME(weekday, Date)""",
+    "largest transactions": """
+        SELECT TOP 5 Date, Amount, Description FROM Transactions
+        WHERE UserId = {user} AND Date >= '{start}' AND Date < '{end}' ORDER BY Amount DESC""",
+    "budget vs actual": """
+        SELECT b.CategoryId, b.Amount, ISNULL(SUM(t.Amount), 0) AS Spent FROM Budget b
+        LEFT JOIN Transactions t ON t.UserId = b.UserId AND t.CategoryId = b.CategoryId
+         AND t.Date >= '{start}' AND t.Date < '{next_month}'
+        WHERE b.UserId = {user} AND b.Year = {year} AND b.Month = {month}
+        GROUP BY b.CategoryId, b.Amount""",
+    "account balance": """
+        SELECT SUM(CASE WHEN Type = 'Income' THEN Amount ELSE -Amount END) AS Balance FROM Transactions
+        WHERE AccountId = {account} AND Date < '{end}'""",
+}
+
+def generate_queries(conn, count: int, seed: int = 0) -> dict[str, list[str]]:
+    """count instances of every pattern with random users, categories, accounts and date ranges."""
+    rng = random.Random(seed)
+    users = [row[0] for row in conn.execute("SELECT Id FROM Users")]
+    first, last = (datetime.fromisoformat(value) for value in conn.execute("SELECT MIN(Date), MAX(Date) FROM Transactions").fetchone())
+    queries = {name: [] for name in PATTERNS}
+    for _ in range(count):
+        user = rng.choice(users)
+        start = (first + timedelta(days=rng.randrange(max(1, (last - first).days - 90)))).replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        values = {
+            "user": user,
+            "category": rng.choice([row[0] for row in conn.execute("SELECT Id FROM Categories WHERE UserId = ?", (user,))]),
+            "account": rng.choice([row[0] for row in conn.execute("SELECT Id FROM Accounts WHERE UserId = ?", (user,))]),
+            "start": start.strftime("%Y-%m-%d"),
+            "end": (start + timedelta(days=rng.choice([30, 60, 90]))).strftime("%Y-%m-%d"),
+            "next_month": next_month.strftime("%Y-%m-%d"),
+            "year": start.year,
+            "month": start.month,
+        }
+        for name, pattern in PATTERNS.items():
+            queries[name].append(" ".join(pattern.format(**values).split()))
+    return queries
+
+def run_suite(conn, storage: SqliteStorage, queries: dict[str, list[str]]) -> dict[str, dict]:
+    conn.execute("ANALYZE")
+    results = {}
+    for name, instances in queries.items():
+        translated = [storage.translate(sql) for sql in instances]
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + translated[0])]
+        timings = []
+        for sql in translated:
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {"median_ms": statistics.median(timings), "max_ms": max(timings), "plan": plan}
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transactions", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=20, help="Generated instances of every query pattern")
+    parser.add_argument("--output", default=None, help="Write the plans and timings to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize(migrate=False)
+        SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        conn = storage.connect()
+        queries = generate_queries(conn, args.queries)
+
+        before = run_suite(conn, storage, queries)
+        start = time.perf_counter()
+        migrations = apply_migrations(conn, storage.dialect)
+        migration_seconds = time.perf_counter() - start
+        after = run_suite(conn, storage, queries)
+
+    print(f"{args.transactions:,} transactions, {args.users} users, {args.queries} queries per pattern")
+    print(f"Applied {', '.join(f'{m.version:04d}_{m.name}' for m in migrations)} in {migration_seconds:.1f} s")
+    print(f"{'pattern':<22} {'before ms':>10} {'after ms':>9} {'speedup':>8}  plan after")
+    for name in PATTERNS:
+        speedup = before[name]["median_ms"] / max(after[name]["median_ms"], 1e-6)
+        print(f"{name:<22} {before[name]['median_ms']:10.2f} {after[name]['median_ms']:9.2f} {speedup:7.0f}x  "
+              f"{' | '.join(after[name]['plan'])}")
+
+    if args.output:
+        report = {"transactions": args.transactions, "users": args.users, "queries": queries,
+                  "migrations": [f"{m.version:04d}_{m.name}" for m in migrations], "before": before, "after": after}
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark outlier detection: flags kept at write time vs statistics recomputed over the history.
+
+Generates synthetic history in a local SQLite database and backfills the category statistics, then
+measures the cost OutlierDetector.observe adds to the insert of a transaction, and answers "which of
+my transactions of the last 3 months were unusual?" for --reports users both ways: a lookup of
+TransactionOutliers, and loading every transaction of the user to compute the median and MAD of
+each category in Python (what the agent's query over Transactions amounts to).
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_outliers.py [--users 20] [--transactions 200000] [--reports 50]
+"""
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.outliers import OutlierDetector, MAD_SCALE
+from finance_data.transaction_writer import INSERT_RETURNING_ID_SQL
+
+LOOKUP_SQL = "SELECT TransactionId FROM TransactionOutliers WHERE UserId = ? AND Date >= ?"
+SINCE = "2025-01-01"
+
+def scan(conn, user_id: int, detector: OutlierDetector) -> list[int]:
+    rows = conn.execute("SELECT Id, CategoryId, Type, Date, Amount FROM Transactions WHERE UserId = ?", (user_id,)).fetchall()
+    amounts = {}
+    for _, category_id, type, _, amount in rows:
+        amounts.setdefault((category_id, type), []).append(float(amount))
+    spread = {}
+    for key, values in amounts.items():
+        median = statistics.median(values)
+        spread[key] = (median, statistics.median(abs(value - median) for value in values))
+    return [transaction_id for transaction_id, category_id, type, date, amount in rows
+            if date >= SINCE and len(amounts[(category_id, type)]) >= detector.min_count and spread[(category_id, type)][1]
+            and (float(amount) - spread[(category_id, type)][0]) / (MAD_SCALE * spread[(category_id, type)][1]) >= detector.robust_threshold]
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--reports", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        detector = OutlierDetector("sqlite")
+        backfill = detector.backfill(storage)
+        print(f"Backfilled the statistics of {backfill.transactions} transactions in {backfill.seconds:.1f} s "
+              f"({backfill.transactions / backfill.seconds:,.0f} rows/s), {backfill.outliers} flagged")
+
+        conn = storage.connect()
+        samples = conn.execute("SELECT Type, AccountId, CategoryId, UserId, Date, Amount, Description, AttachmentUrl "
+                               "FROM Transactions ORDER BY RANDOM() LIMIT ?", (args.reports * 4,)).fetchall()
+        writes = {"insert": [], "insert + observe": []}
+        for index, row in enumerate(samples):
+            name = "insert" if index % 2 else "insert + observe"
+            start = time.perf_counter()
+            transaction_id = conn.execute(INSERT_RETURNING_ID_SQL["sqlite"], row).fetchone()[0]
+            if name != "insert":
+                detector.observe(conn, [(transaction_id, row)])
+            writes[name].append((time.perf_counter() - start) * 1000)
+            conn.rollback()
+
+        user_ids = [row[0] for row in conn.execute("SELECT Id FROM Users").fetchall()]
+        timings = {"lookup": [], "scan": []}
+        flagged = scanned = 0
+        for index in range(args.reports):
+            user_id = user_ids[index % len(user_ids)]
+            start = time.perf_counter()
+            flagged += len(conn.execute(LOOKUP_SQL, (user_id, SINCE)).fetchall())
+            timings["lookup"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            scanned += len(scan(conn, user_id, detector))
+            timings["scan"].append((time.perf_counter() - start) * 1000)
+
+    for name, values in writes.items():
+        print(f"{name:<16} p50 {statistics.median(values):8.3f} ms per recorded transaction")
+    print(f"{args.reports} reports over {args.transactions // args.users:,} transactions per user "
+          f"({flagged} flagged at write time, {scanned} by the scan)")
+    for name, values in timings.items():
+        print(f"{name:<7} p50 {statistics.median(values):8.3f} ms  max {max(values):8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark user function calls per second with and without the connection pool.
+
+Runs get_user_accounts/get_transaction_categories style queries from N threads against a local
+SQLite database (or the database of --connection-string through pyodbc). With SQLite, --connect-ms
+adds a fixed delay to every new connection to stand in for the TLS and login handshake of Azure SQL.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_pool.py [--calls 2000] [--threads 8] [--connect-ms 40] [--connection-string "..."]
+"""
+import time
+import sqlite3
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from finance_data.db_pool import ConnectionPool
+
+QUERIES = [
+    ("SELECT Id, Name, Type FROM Accounts WHERE UserId = ?", (1,)),
+    ("SELECT Id, Name, Description FROM Categories WHERE UserId = ?", (1,)),
+]
+
+def create_sqlite_database(path: Path) -> None:
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Accounts (Id INTEGER PRIMARY KEY, UserId INTEGER, Name TEXT, Type TEXT);
+        CREATE TABLE Categories (Id INTEGER PRIMARY KEY, UserId INTEGER, Name TEXT, Description TEXT);
+        CREATE INDEX IX_Accounts_UserId ON Accounts (UserId);
+        CREATE INDEX IX_Categories_UserId ON Categories (UserId);
+    """)
+    conn.executemany("INSERT INTO Accounts (UserId, Name, Type) VALUES (?, ?, ?)",
+                     [(user_id, f"Account {i}", "Bank") for user_id in range(1, 50) for i in range(5)])
+    conn.executemany("INSERT INTO Categories (UserId, Name, Description) VALUES (?, ?, ?)",
+                     [(user_id, f"Category {i}", "") for user_id in range(1, 50) for i in range(20)])
+    conn.commit()
+    conn.close()
+
+def run(calls: int, threads: int, call) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(call, range(calls)))
+    return calls / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--connect-ms", type=float, default=40.0, help="Simulated handshake per new SQLite connection")
+    parser.add_argument("--connection-string", default=None, help="Benchmark an ODBC database instead of SQLite")
+    args = parser.parse_args()
+
+    if args.connection_string:
+        import pyodbc
+
+        def connect():
+            return pyodbc.connect(args.connection_string)
+    else:
+        path = Path(tempfile.mkdtemp()) / "bench.db"
+        create_sqlite_database(path)
+
+        def connect():
+            time.sleep(args.connect_ms / 1000)
+            return sqlite3.connect(path, check_same_thread=False)
+
+    def without_pool(i: int) -> None:
+        sql, params = QUERIES[i % len(QUERIES)]
+        conn = connect()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        conn.close()
+
+    pool = ConnectionPool(connect, max_size=args.threads)
+
+    def with_pool(i: int) -> None:
+        sql, params = QUERIES[i % len(QUERIES)]
+        with pool.connection() as conn:
+            conn.execute(sql, params).fetchall()
+
+    # Fewer calls without the pool, it is much slower
+    baseline = run(max(args.calls // 10, args.threads), args.threads, without_pool)
+    pooled = run(args.calls, args.threads, with_pool)
+    pool.close()
+
+    print(f"without pool: {baseline:8.1f} calls/s")
+    print(f"with pool:    {pooled:8.1f} calls/s  ({pooled / baseline:.1f}x)")
+    print(f"pool metrics: {pool.metrics.snapshot()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark fetch_data_using_sql_query with and without the query result cache.
+
+Replays analyzer sessions against a local SQLite database: every turn asks one of a few reports,
+often re-asked in another form (reformatted, other aliases, filters in another order), and now and
+then the user records a transaction, which bumps their data version. --logic-app-ms adds the
+Logic App round trip to every uncached query, for the path the cache replaces.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_query_cache.py [--users 20] [--transactions 500000] [--turns 500] [--logic-app-ms 250]
+"""
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.query_cache import QueryResultCache
+from finance_data.sql_query import SqlQueryService
+from finance_data.statement_import import INSERT_TRANSACTION_SQL
+
+# Each report in the forms an agent writes it across turns
+REPORTS = [
+    ["SELECT c.Name, SUM(t.Amount) AS Total FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId WHERE t.UserId = {user} AND t.Type = 'Expense' GROUP BY c.Name",
+     "select cat.Name, sum(tr.Amount) as Total from Transactions as tr join Categories cat on cat.Id = tr.CategoryId where tr.Type = N'Expense' and tr.UserId = {user} group by cat.Name"],
+    ["SELECT FORMAT(Date, 'yyyy-MM') AS Month, SUM(CASE WHEN Type = 'Income' THEN Amount ELSE -Amount END) AS Net FROM Transactions WHERE UserId = {user} GROUP BY FORMAT(Date, 'yyyy-MM')",
+     "SELECT FORMAT(Date, 'yyyy-MM') AS Month,\n       SUM(CASE WHEN Type = 'Income' THEN Amount ELSE -Amount END) AS Net\nFROM [Transactions]\nWHERE UserId = {user}\nGROUP BY FORMAT(Date, 'yyyy-MM');"],
+    ["SELECT DATENAME(weekday, Date) AS Day, SUM(Amount) AS Total FROM Transactions WHERE UserId = {user} AND Type = 'Expense' GROUP BY DATENAME(weekday, Date)",
+     "SELECT DATENAME(weekday, Date) AS Day, SUM(Amount) AS Total FROM Transactions WHERE Type = 'Expense' AND UserId = {user} GROUP BY DATENAME(weekday, Date)"],
+    ["SELECT TOP 10 Date, Amount, Description FROM Transactions WHERE UserId = {user} AND Type = 'Expense' ORDER BY Amount DESC"],
+]
+
+def replay(service: SqlQueryService, storage: SqliteStorage, users: list[int], turns: int, write_probability: float,
+           logic_app_ms: float, seed: int = 0) -> list[float]:
+    rng = random.Random(seed)
+    conn = storage.connect()
+    latencies = []
+    for _ in range(turns):
+        user = rng.choice(users)
+        if rng.random() < write_probability:
+            conn.execute(INSERT_TRANSACTION_SQL, ("Expense", 1, 1, user, "2025-01-01 10:00:00", 9.5, "Coffee", None))
+            conn.commit()
+        query = rng.choice(rng.choice(REPORTS)).format(user=user)
+        misses = service.cache.metrics.misses if service.cache else 0
+        start = time.perf_counter()
+        service.fetch(user, query)
+        elapsed = (time.perf_counter() - start) * 1000
+        if service.cache is None or service.cache.metrics.misses > misses:
+            elapsed += logic_app_ms
+        latencies.append(elapsed)
+    return latencies
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=500000)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--active-users", type=int, default=5, help="Users chatting during the replay")
+    parser.add_argument("--write-probability", type=float, default=0.05)
+    parser.add_argument("--logic-app-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        generation = SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        print(f"Loaded {generation.transactions:,} transactions in {generation.seconds:.1f} s ({generation.rows_per_second:,.0f} rows/s)")
+        users = list(range(1, args.active_users + 1))
+
+        results = {}
+        for name, cache in (("uncached", None), ("cached", QueryResultCache())):
+            service = SqlQueryService(ConnectionPool(storage.connect), storage, cache=cache)
+            results[name] = (replay(service, storage, users, args.turns, args.write_probability, args.logic_app_ms), cache)
+
+    print(f"{args.turns} turns, {args.active_users} users, {args.write_probability:.0%} writes, Logic App {args.logic_app_ms:.0f} ms per uncached query")
+    print(f"{'path':<10} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    for name, (latencies, cache) in results.items():
+        ordered = sorted(latencies)
+        print(f"{name:<10} {statistics.median(ordered):9.2f} {ordered[int(0.95 * len(ordered))]:9.2f} {sum(ordered) / 1000:9.1f}")
+    print(f"Cache: {results['cached'][1].metrics.snapshot()}")
+
+if __name__ == "__main__":
+    main()
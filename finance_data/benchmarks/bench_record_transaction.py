@@ -0,0 +1,112 @@
+"""
+Benchmark recording receipts with the in-process record_transaction tool vs the Logic App.
+
+The Logic App path is simulated by a local HTTP server that takes one transaction per POST
+(like openapi_record_transactions_logic_app.json), waits --logic-app-ms for the workflow run and
+its SQL connector, then inserts the row. The native path validates and inserts every item of the
+receipt in one TransactionWriter call through the connection pool. Both write to a local SQLite database.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_record_transaction.py [--receipts 50] [--items 4] [--logic-app-ms 300]
+"""
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+import urllib.request
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.statement_import import INSERT_TRANSACTION_SQL
+from finance_data.transaction_writer import TransactionWriter, parse_transaction_date
+
+def create_database(path: Path) -> SqliteStorage:
+    storage = SqliteStorage(path)
+    storage.initialize()
+    conn = storage.connect()
+    conn.executescript("""
+        INSERT INTO Users (Id, Name, Email) VALUES (1, 'Ana', 'ana@example.com');
+        INSERT INTO Accounts (Id, Name, Type, UserId) VALUES (1, 'Credit card', 'Credit card', 1);
+        INSERT INTO Categories (Id, Name, Type, UserId) VALUES (1, 'Restaurants', 'Expense', 1);
+    """)
+    conn.close()
+    return storage
+
+def start_logic_app(storage: SqliteStorage, latency_ms: float) -> ThreadingHTTPServer:
+    class LogicAppHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency_ms / 1000)
+            conn = storage.connect()
+            conn.execute(INSERT_TRANSACTION_SQL, (request["Type"], request["AccountId"], request["CategoryId"], request["UserId"],
+                                                  parse_transaction_date(request["Date"]), request["Amount"], request["Description"], None))
+            conn.commit()
+            conn.close()
+            payload = json.dumps({"Result": "Success"}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LogicAppHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def receipt(index: int, items: int) -> list[dict]:
+    return [{"Type": "Expense", "AccountId": 1, "CategoryId": 1, "UserId": 1, "Date": "2025-04-20T14:30:00Z",
+             "Amount": 5 + item, "Description": f"Receipt {index} item {item}"} for item in range(items)]
+
+def report(name: str, latencies: list[float], items: int) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f"{name:<22} {statistics.median(latencies):9.1f} {p95:9.1f} {statistics.median(latencies) / items:12.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--receipts", type=int, default=50)
+    parser.add_argument("--items", type=int, default=4)
+    parser.add_argument("--logic-app-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = create_database(Path(directory) / "finance.db")
+
+        server = start_logic_app(storage, args.logic_app_ms)
+        url = f"http://127.0.0.1:{server.server_port}/workflows/record_transaction/invoke"
+        logic_app = []
+        for index in range(args.receipts):
+            start = time.perf_counter()
+            # One tool call per transaction
+            for item in receipt(index, args.items):
+                request = urllib.request.Request(url, data=json.dumps(item).encode("utf-8"), headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+            logic_app.append((time.perf_counter() - start) * 1000)
+        server.shutdown()
+
+        writer = TransactionWriter(ConnectionPool(storage.connect))
+        native = []
+        for index in range(args.receipts):
+            start = time.perf_counter()
+            result = writer.record(1, receipt(index, args.items))
+            assert result["Result"] == "Success", result
+            native.append((time.perf_counter() - start) * 1000)
+
+        rows = storage.connect().execute("SELECT COUNT(*) FROM Transactions").fetchone()[0]
+
+    print(f"{args.receipts} receipts of {args.items} items ({rows} rows), Logic App latency {args.logic_app_ms:.0f} ms")
+    print(f"{'path':<22} {'p50 ms':>9} {'p95 ms':>9} {'ms per row':>12}")
+    report("Logic App (HTTP)", logic_app, args.items)
+    report("record_transaction", native, args.items)
+    print(f"Speedup (p50): {statistics.median(logic_app) / statistics.median(native):,.0f}x")
+
+if __name__ == "__main__":
+    main()
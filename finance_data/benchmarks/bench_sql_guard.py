@@ -0,0 +1,67 @@
+"""
+Benchmark fetch_data_using_sql_query with and without the SQL guard on queries an agent writes.
+
+Runs each query against a local SQLite database unguarded and guarded: the guard scopes the tables to
+the user, adds the TOP limit and rewrites functions on Date into ranges. Runaway queries (cartesian
+joins) are only run guarded, where they are rejected before reaching the database.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_sql_guard.py [--users 20] [--transactions 500000] [--repeat 5]
+"""
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.sql_guard import SqlGuard
+from finance_data.sql_query import SqlQueryService
+
+QUERIES = {
+    "year filter, no UserId": ("SELECT c.Name, SUM(t.Amount) AS Total FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId "
+                               "WHERE YEAR(t.Date) = 2025 AND t.Type = 'Expense' GROUP BY c.Name", True),
+    "month filter": ("SELECT SUM(Amount) AS Total FROM Transactions WHERE UserId = 1 AND YEAR(Date) = 2025 AND MONTH(Date) = 3", True),
+    "last 30 days": ("SELECT Date, Amount, Description FROM Transactions WHERE UserId = 1 AND DATEDIFF(day, Date, GETDATE()) <= 30", True),
+    "every transaction": ("SELECT * FROM Transactions WHERE UserId = 1", True),
+    "cartesian join": ("SELECT COUNT(*) FROM Transactions a, Transactions b WHERE a.UserId = 1", False),
+}
+
+def measure(service: SqlQueryService, query: str, repeat: int) -> tuple[float, str]:
+    timings, result = [], ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = service.fetch(1, query)
+        timings.append((time.perf_counter() - start) * 1000)
+    payload = json.loads(result)
+    outcome = payload["error"] if "error" in payload else f"{len(payload['ResultSets']['Table1']):,} rows"
+    return statistics.median(timings), outcome
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        generation = SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        print(f"Loaded {generation.transactions:,} transactions in {generation.seconds:.1f} s ({generation.rows_per_second:,.0f} rows/s)")
+        pool = ConnectionPool(storage.connect)
+        unguarded = SqlQueryService(pool, storage)
+        guarded = SqlQueryService(pool, storage, guard=SqlGuard())
+
+        print(f"{'query':<24} {'unguarded ms':>13} {'guarded ms':>11}  result (unguarded / guarded)")
+        for name, (query, run_unguarded) in QUERIES.items():
+            before, before_outcome = measure(unguarded, query, args.repeat) if run_unguarded else (float("nan"), "not run")
+            after, after_outcome = measure(guarded, query, args.repeat)
+            print(f"{name:<24} {before:13.2f} {after:11.2f}  {before_outcome} / {after_outcome[:70]}")
+        print(f"Guard: {guarded.guard.metrics.__dict__}")
+
+if __name__ == "__main__":
+    main()
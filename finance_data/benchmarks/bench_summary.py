@@ -0,0 +1,86 @@
+"""
+Benchmark typical AnalyzerAgent reports on raw Transactions vs the MonthlySummary table.
+
+Generates synthetic history in a local SQLite database (the summary is maintained by triggers
+while loading), then runs each report as T-SQL translated for SQLite, both ways, and checks
+they return the same result.
+
+Usage (from the finance_data folder):
+    python benchmarks/bench_summary.py [--users 5] [--transactions 1000000] [--repeat 5]
+"""
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+
+# (name, query on Transactions, query on MonthlySummary)
+REPORTS = [
+    ("category totals",
+     """SELECT c.Name, SUM(t.Amount) AS Total FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId
+        WHERE t.UserId = 1 AND t.Type = 'Expense' GROUP BY c.Name ORDER BY c.Name""",
+     """SELECT c.Name, SUM(s.Total) AS Total FROM MonthlySummary s JOIN Categories c ON c.Id = s.CategoryId
+        WHERE s.UserId = 1 AND s.Type = 'Expense' GROUP BY c.Name ORDER BY c.Name"""),
+    ("monthly net balance",
+     """SELECT YEAR(Date) AS Year, MONTH(Date) AS Month,
+        SUM(CASE WHEN Type = 'Income' THEN Amount ELSE -Amount END) AS Net
+        FROM Transactions WHERE UserId = 1 GROUP BY YEAR(Date), MONTH(Date) ORDER BY Year, Month""",
+     """SELECT Year, Month, SUM(CASE WHEN Type = 'Income' THEN Total ELSE -Total END) AS Net
+        FROM MonthlySummary WHERE UserId = 1 GROUP BY Year, Month ORDER BY Year, Month"""),
+    ("budget compliance",
+     """SELECT b.Year, b.Month, b.CategoryId, b.Amount - ISNULL(SUM(t.Amount), 0) AS Remaining FROM Budget b
+        LEFT JOIN Transactions t ON t.UserId = b.UserId AND t.CategoryId = b.CategoryId AND t.Type = 'Expense'
+         AND YEAR(t.Date) = b.Year AND MONTH(t.Date) = b.Month
+        WHERE b.UserId = 1 GROUP BY b.Year, b.Month, b.CategoryId, b.Amount ORDER BY b.Year, b.Month, b.CategoryId""",
+     """SELECT b.Year, b.Month, b.CategoryId, b.Amount - ISNULL(s.Total, 0) AS Remaining FROM Budget b
+        LEFT JOIN MonthlySummary s ON s.UserId = b.UserId AND s.CategoryId = b.CategoryId AND s.Type = 'Expense'
+         AND s.Year = b.Year AND s.Month = b.Month
+        WHERE b.UserId = 1 ORDER BY b.Year, b.Month, b.CategoryId"""),
+    ("year over year",
+     """SELECT MONTH(Date) AS Month, YEAR(Date) AS Year, SUM(Amount) AS Spent FROM Transactions
+        WHERE UserId = 1 AND Type = 'Expense' GROUP BY MONTH(Date), YEAR(Date) ORDER BY Month, Year""",
+     """SELECT Month, Year, SUM(Total) AS Spent FROM MonthlySummary
+        WHERE UserId = 1 AND Type = 'Expense' GROUP BY Month, Year ORDER BY Month, Year"""),
+]
+
+def timed(conn, sql: str, repeat: int) -> tuple[float, list]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(sql).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+def rounded(rows: list) -> list:
+    return [tuple(round(value, 2) if isinstance(value, float) else value for value in row) for row in rows]
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(Path(directory) / "finance.db")
+        storage.initialize()
+        generation = SyntheticDataGenerator(storage).generate(users=args.users, transactions=args.transactions)
+        print(f"Loaded {generation.transactions:,} transactions with the summary triggers in {generation.seconds:.1f} s "
+              f"({generation.rows_per_second:,.0f} rows/s)")
+
+        conn = storage.connect()
+        user_rows = conn.execute("SELECT COUNT(*) FROM Transactions WHERE UserId = 1").fetchone()[0]
+        summary_rows = conn.execute("SELECT COUNT(*) FROM MonthlySummary WHERE UserId = 1").fetchone()[0]
+        print(f"User 1: {user_rows:,} transactions, {summary_rows:,} summary rows")
+        print(f"{'report':<22} {'raw ms':>9} {'summary ms':>11} {'speedup':>8}")
+        for name, raw_sql, summary_sql in REPORTS:
+            raw_ms, raw_rows = timed(conn, storage.translate(raw_sql), args.repeat)
+            summary_ms, summary_rows = timed(conn, storage.translate(summary_sql), args.repeat)
+            assert rounded(raw_rows) == rounded(summary_rows), name
+            print(f"{name:<22} {raw_ms:9.1f} {summary_ms:11.2f} {raw_ms / summary_ms:7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Data layer of the personal finance agents: storage, migrations, the tools of the TransactionsAgent and
+the AnalyzerAgent (finance_data.tools) and the batch jobs that maintain the derived tables.
+"""
@@ -0,0 +1,290 @@
+"""
+Local analytics engine behind the analyze_transactions tool.
+
+Instead of one generated SQL query per question, the transactions of a user in a date range are
+fetched once (one index range scan on IX_Transactions_UserId_Date) into a columnar frame of NumPy
+arrays, and the whole analysis catalog of the AnalyzerAgent instructions is computed with
+vectorized passes (bincount group-bys, masks) into one compact JSON summary:
+category totals and distribution, monthly evolution and net balance, budget compliance,
+day-of-week habits, frequency, outliers, projection of the current month and year-over-year.
+"""
+import json
+import time
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from .storage import Storage
+from .query_cache import QueryResultCache, DATA_VERSION_SQL
+
+logger = logging.getLogger(__name__)
+
+TYPES = ("Expense", "Income", "Transfer", "Investment")
+EXPENSE, INCOME, TRANSFER, INVESTMENT = range(len(TYPES))
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Dates as day numbers and types as codes, so every column converts straight to a NumPy array
+TRANSACTIONS_SQL = """
+SELECT Id, DATEDIFF(day, '1970-01-01', Date) AS Day, Amount, CategoryId,
+       CASE Type WHEN 'Expense' THEN 0 WHEN 'Income' THEN 1 WHEN 'Transfer' THEN 2 ELSE 3 END AS TypeCode
+FROM Transactions
+WHERE UserId = ? AND Date >= ? AND Date < ?
+"""
+CATEGORIES_SQL = "SELECT Id, Name FROM Categories WHERE UserId = ?"
+BUDGETS_SQL = "SELECT CategoryId, Year, Month, Amount FROM Budget WHERE UserId = ? AND Year BETWEEN ? AND ?"
+DESCRIPTIONS_SQL = "SELECT Id, Description FROM Transactions WHERE UserId = ? AND Id IN ({ids})"
+
+@dataclass
+class TransactionFrame:
+    """Columns of the transactions of one user; categories are codes into category_ids."""
+    ids: np.ndarray
+    days: np.ndarray
+    amounts: np.ndarray
+    types: np.ndarray
+    categories: np.ndarray
+    category_ids: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "TransactionFrame":
+        count = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 5
+        category_ids, categories = np.unique(np.fromiter(columns[3], dtype=np.int64, count=count), return_inverse=True)
+        return cls(
+            ids=np.fromiter(columns[0], dtype=np.int64, count=count),
+            days=np.fromiter(columns[1], dtype=np.int64, count=count),
+            amounts=np.fromiter(map(float, columns[2]), dtype=np.float64, count=count),
+            types=np.fromiter(columns[4], dtype=np.int8, count=count),
+            categories=categories.astype(np.int64),
+            category_ids=category_ids,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def months(self) -> np.ndarray:
+        """Months since 1970-01, for group-bys by month."""
+        return self.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+def month_label(month: int) -> str:
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+def robust_z(values: np.ndarray) -> np.ndarray:
+    """Distance from the median in median absolute deviations (scaled to a standard deviation)."""
+    if not values.size:
+        return values
+    median = np.median(values)
+    mad = np.median(np.abs(values - median)) * 1.4826
+    return (values - median) / mad if mad else np.zeros_like(values)
+
+def category_analysis(frame: TransactionFrame, names: dict[int, str]) -> dict:
+    result = {}
+    label = lambda code: names.get(int(frame.category_ids[code]), str(frame.category_ids[code]))
+    for type_code, key in ((EXPENSE, "expenses"), (INCOME, "income")):
+        mask = frame.types == type_code
+        totals = np.bincount(frame.categories[mask], weights=frame.amounts[mask], minlength=len(frame.category_ids))
+        counts = np.bincount(frame.categories[mask], minlength=len(frame.category_ids))
+        order = np.argsort(-totals)
+        order = order[totals[order] > 0]
+        grand_total = totals.sum()
+        result[key] = {
+            "total": round(float(grand_total), 2),
+            "by_category": [{"category": label(code), "total": round(float(totals[code]), 2), "count": int(counts[code]),
+                             "share": round(float(totals[code] / grand_total), 4)} for code in order],
+        }
+    result["investment_total"] = round(float(frame.amounts[frame.types == INVESTMENT].sum()), 2)
+    return result
+
+def monthly_analysis(frame: TransactionFrame, months: np.ndarray, first: int, count: int, complete: int) -> dict:
+    """Totals of the count months from first; only the complete ones are checked for unusual spending."""
+    index = months - first
+    income = np.bincount(index[frame.types == INCOME], weights=frame.amounts[frame.types == INCOME], minlength=count)
+    expenses = np.bincount(index[frame.types == EXPENSE], weights=frame.amounts[frame.types == EXPENSE], minlength=count)
+    net = income - expenses
+    z = np.zeros(count)
+    z[:complete] = robust_z(expenses[:complete])
+    labels = [month_label(first + i) for i in range(count)]
+    return {
+        "months": [{"month": labels[i], "income": round(float(income[i]), 2), "expenses": round(float(expenses[i]), 2),
+                    "net": round(float(net[i]), 2)} for i in range(count)],
+        "deficit_months": [labels[i] for i in np.flatnonzero(net < 0)],
+        "unusual_months": [{"month": labels[i], "expenses": round(float(expenses[i]), 2),
+                            "direction": "peak" if z[i] > 0 else "drop"} for i in np.flatnonzero(np.abs(z) > 2.5)],
+        "average_monthly_expenses": round(float(expenses.mean()), 2) if count else 0.0,
+        "average_monthly_income": round(float(income.mean()), 2) if count else 0.0,
+    }
+
+def budget_analysis(frame: TransactionFrame, months: np.ndarray, budgets: list, names: dict[int, str]) -> dict:
+    if not budgets:
+        return {"budgets": 0, "over_budget": []}
+    mask = frame.types == EXPENSE
+    codes = {int(category_id): code for code, category_id in enumerate(frame.category_ids)}
+    width = len(frame.category_ids)
+    # Spending per (month, category) in one pass, looked up for every budget row
+    first = int(months.min()) if len(months) else 0
+    keys = (months[mask] - first) * width + frame.categories[mask]
+    spent = np.bincount(keys, weights=frame.amounts[mask]) if keys.size else np.zeros(0)
+    over, under = [], 0.0
+    for category_id, year, month, amount in budgets:
+        key = ((year - 1970) * 12 + month - 1 - first) * width + codes.get(category_id, -1)
+        value = float(spent[key]) if category_id in codes and 0 <= key < len(spent) else 0.0
+        if value > float(amount):
+            over.append({"category": names.get(category_id, str(category_id)), "month": f"{year}-{month:02d}",
+                         "budget": round(float(amount), 2), "spent": round(value, 2), "over_by": round(value - float(amount), 2)})
+        else:
+            under += float(amount) - value
+    over.sort(key=lambda entry: -entry["over_by"])
+    return {"budgets": len(budgets), "over_budget": over[:20], "over_budget_count": len(over),
+            "total_surplus_in_budget": round(under, 2)}
+
+def habits_analysis(frame: TransactionFrame) -> dict:
+    mask = frame.types == EXPENSE
+    days = frame.days[mask]
+    if not days.size:
+        return {}
+    # 1970-01-01 was a Thursday
+    weekdays = (days + 3) % 7
+    totals = np.bincount(weekdays, weights=frame.amounts[mask], minlength=7)
+    counts = np.bincount(weekdays, minlength=7)
+    active_days = np.unique(days)
+    span = int(days.max() - days.min()) + 1
+    gaps = np.diff(active_days)
+    return {
+        "by_weekday": [{"day": WEEKDAYS[i], "total": round(float(totals[i]), 2), "count": int(counts[i])} for i in range(7)],
+        "highest_spending_day": WEEKDAYS[int(np.argmax(totals))],
+        "frequency": {
+            "expenses_per_day": round(days.size / span, 2),
+            "expenses_per_week": round(days.size / span * 7, 2),
+            "days_with_expenses_share": round(active_days.size / span, 3),
+            "average_days_between_expenses": round(float(gaps.mean()), 2) if gaps.size else None,
+            "average_expense": round(float(frame.amounts[mask].mean()), 2),
+        },
+    }
+
+def outlier_analysis(frame: TransactionFrame, names: dict[int, str], limit: int = 10, threshold: float = 3.0) -> list[dict]:
+    """Transactions far above the usual amount of their category and type."""
+    groups = frame.categories * len(TYPES) + frame.types
+    counts = np.bincount(groups)
+    sums = np.bincount(groups, weights=frame.amounts)
+    squares = np.bincount(groups, weights=frame.amounts ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        deviations = np.sqrt(np.maximum(squares / counts - means ** 2, 0))
+        z = (frame.amounts - means[groups]) / deviations[groups]
+    z[(counts[groups] < 8) | ~np.isfinite(z)] = 0
+    candidates = np.flatnonzero(z > threshold)
+    top = candidates[np.argsort(-z[candidates])][:limit]
+    return [{"Id": int(frame.ids[i]), "date": str(np.datetime64(int(frame.days[i]), "D")), "type": TYPES[frame.types[i]],
+             "category": names.get(int(frame.category_ids[frame.categories[i]]), ""), "amount": round(float(frame.amounts[i]), 2),
+             "category_average": round(float(means[groups[i]]), 2), "z_score": round(float(z[i]), 1)} for i in top]
+
+def projection_analysis(frame: TransactionFrame, months: np.ndarray, today: date, monthly: dict) -> dict:
+    current = (today.year - 1970) * 12 + today.month - 1
+    mask = (frame.types == EXPENSE) & (months == current)
+    spent = float(frame.amounts[mask].sum())
+    days_in_month = (date(today.year + today.month // 12, today.month % 12 + 1, 1) - timedelta(days=1)).day
+    completed = [month["expenses"] for month in monthly["months"] if month["month"] < month_label(current)][-3:]
+    return {
+        "month": month_label(current),
+        "spent_to_date": round(spent, 2),
+        "projected_month_expenses": round(spent / today.day * days_in_month, 2),
+        "average_of_last_3_months": round(sum(completed) / len(completed), 2) if completed else None,
+    }
+
+def year_over_year_analysis(monthly: dict) -> dict:
+    by_month = {month["month"]: month for month in monthly["months"]}
+    comparisons = []
+    for label, month in by_month.items():
+        previous = by_month.get(f"{int(label[:4]) - 1}{label[4:]}")
+        if previous:
+            change = (month["expenses"] - previous["expenses"]) / previous["expenses"] if previous["expenses"] else None
+            comparisons.append({"month": label, "expenses": month["expenses"], "previous_year_expenses": previous["expenses"],
+                                "income": month["income"], "previous_year_income": previous["income"],
+                                "expenses_change": round(change, 4) if change is not None else None})
+    years = {}
+    for label, month in by_month.items():
+        totals = years.setdefault(label[:4], {"year": int(label[:4]), "income": 0.0, "expenses": 0.0, "months": 0})
+        totals["income"] += month["income"]
+        totals["expenses"] += month["expenses"]
+        totals["months"] += 1
+    return {"by_month": comparisons[-12:],
+            "by_year": [{**totals, "income": round(totals["income"], 2), "expenses": round(totals["expenses"], 2)}
+                        for totals in years.values()]}
+
+def analyze(frame: TransactionFrame, names: dict[int, str], budgets: list, start: date, end: date, today: date) -> dict:
+    """The whole analysis catalog over one frame; end is exclusive."""
+    months = frame.months
+    first = (start.year - 1970) * 12 + start.month - 1
+    last = ((end - timedelta(days=1)).year - 1970) * 12 + (end - timedelta(days=1)).month - 1
+    current = (today.year - 1970) * 12 + today.month - 1
+    monthly = monthly_analysis(frame, months, first, last - first + 1, max(0, min(last + 1, current) - first))
+    return {
+        "range": {"start": start.isoformat(), "end": (end - timedelta(days=1)).isoformat(), "transactions": len(frame)},
+        "categories": category_analysis(frame, names),
+        "monthly": monthly,
+        "budget_compliance": budget_analysis(frame, months, budgets, names),
+        "habits": habits_analysis(frame),
+        "outliers": outlier_analysis(frame, names),
+        "projection": projection_analysis(frame, months, today, monthly) if start <= today < end else None,
+        "year_over_year": year_over_year_analysis(monthly),
+    }
+
+class AnalyticsService:
+    """
+    analyze_transactions: one fetch of the user's transactions in a range, every analysis computed in memory.
+    Summaries are cached like query results, until the user's data changes.
+    """
+
+    def __init__(self, pool, storage: Storage, cache: QueryResultCache | None = None, default_months: int = 24):
+        self.pool = pool
+        self.storage = storage
+        self.cache = cache
+        self.default_months = default_months
+
+    def date_range(self, start_date: str | None, end_date: str | None, today: date) -> tuple[date, date]:
+        """Start, and exclusive end; by default the last default_months months until today."""
+        end = date.fromisoformat(end_date) + timedelta(days=1) if end_date else today + timedelta(days=1)
+        if start_date:
+            start = date.fromisoformat(start_date)
+        else:
+            months = today.year * 12 + today.month - 1 - self.default_months + 1
+            start = date(months // 12, months % 12 + 1, 1)
+        if start >= end:
+            raise ValueError("start_date must be before end_date")
+        return start, end
+
+    def analyze(self, user_id: int, start_date: str | None = None, end_date: str | None = None, today: date | None = None) -> str:
+        begin = time.perf_counter()
+        today = today or date.today()
+        try:
+            start, end = self.date_range(start_date, end_date, today)
+            with self.pool.connection() as conn:
+                load = lambda: self.run(conn, user_id, start, end, today)
+                if self.cache is None:
+                    return load()
+                row = conn.execute(DATA_VERSION_SQL, (user_id,)).fetchone()
+                # The projection depends on the day, the rest on the range
+                key = f"{TRANSACTIONS_SQL} -- analyze {start} {end} {today}"
+                return self.cache.get_or_load(user_id, key, row[0] if row else 0, load)
+        except Exception as e:
+            logger.warning(f"Analysis failed for user {user_id}: {e}")
+            return json.dumps({"error": str(e)})
+        finally:
+            logger.debug(f"analyze_transactions took {(time.perf_counter() - begin) * 1000:.1f} ms")
+
+    def run(self, conn, user_id: int, start: date, end: date, today: date) -> str:
+        rows = conn.execute(self.storage.translate(TRANSACTIONS_SQL), (user_id, start.isoformat(), end.isoformat())).fetchall()
+        names = dict(conn.execute(CATEGORIES_SQL, (user_id,)).fetchall())
+        budgets = [(int(category_id), int(year), int(month), amount) for category_id, year, month, amount in
+                   conn.execute(BUDGETS_SQL, (user_id, start.year, end.year)).fetchall()]
+        budgets = [budget for budget in budgets if start <= date(budget[1], budget[2], 1) < end]
+        summary = analyze(TransactionFrame.from_rows(rows), names, budgets, start, end, today)
+        if summary["outliers"]:
+            ids = [outlier["Id"] for outlier in summary["outliers"]]
+            sql = DESCRIPTIONS_SQL.format(ids=", ".join("?" * len(ids)))
+            descriptions = dict(conn.execute(sql, (user_id, *ids)).fetchall())
+            for outlier in summary["outliers"]:
+                outlier["description"] = descriptions.get(outlier["Id"])
+        return json.dumps(summary)
@@ -0,0 +1,104 @@
+"""
+Budget alerts raised as transactions are recorded.
+
+The month-to-date expenses of every (user, category) are already kept in MonthlySummary by the
+Transactions triggers, so after an insert the evaluator reads the new total of each category the
+call touched next to its Budget (and SpendingForecasts) row, one primary key lookup each, and works
+out the total before the insert from the amounts just added. An alert is raised when the total
+crosses a threshold of the budget (80%, 100%) or when the projection of the month crosses the
+budget: the nightly forecast of the remaining expenses when there is one, else the run rate.
+Alerts are written to BudgetAlerts in the writer's transaction, at most once per category, month
+and kind, and the app pushes the undelivered ones into the user's chat. Nothing is polled.
+
+Only the current month is evaluated, so importing old statements doesn't raise stale alerts.
+"""
+import calendar
+from datetime import date, datetime
+
+# Budget of a category and month, with its expenses to date and the nightly forecast
+BUDGET_STATE_SQL = """
+SELECT b.Amount, s.Total, f.Forecast, f.SpentToDate
+FROM Budget b
+LEFT JOIN MonthlySummary s ON s.UserId = b.UserId AND s.Year = b.Year AND s.Month = b.Month AND s.CategoryId = b.CategoryId AND s.Type = 'Expense'
+LEFT JOIN SpendingForecasts f ON f.UserId = b.UserId AND f.Year = b.Year AND f.Month = b.Month AND f.CategoryId = b.CategoryId
+WHERE b.UserId = ? AND b.CategoryId = ? AND b.Year = ? AND b.Month = ?
+"""
+# The check is locked until the writer commits, so concurrent writes don't raise the same alert twice
+INSERT_ALERT_SQL = {
+    "tsql": """
+INSERT INTO BudgetAlerts (UserId, Year, Month, CategoryId, Kind, Spent, Budget, Projected, CreatedAt)
+SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?
+WHERE NOT EXISTS (SELECT 1 FROM BudgetAlerts WITH (UPDLOCK, HOLDLOCK) WHERE UserId = ? AND Year = ? AND Month = ? AND CategoryId = ? AND Kind = ?)
+""",
+    "sqlite": """
+INSERT INTO BudgetAlerts (UserId, Year, Month, CategoryId, Kind, Spent, Budget, Projected, CreatedAt)
+SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?
+WHERE NOT EXISTS (SELECT 1 FROM BudgetAlerts WHERE UserId = ? AND Year = ? AND Month = ? AND CategoryId = ? AND Kind = ?)
+""",
+}
+
+PROJECTED = "projected"
+
+def add_expenses(totals: dict, rows: list[tuple]) -> dict:
+    """Add the expenses of rows of INSERT_TRANSACTION_SQL to totals per (UserId, CategoryId, Year, Month)."""
+    for type, _, category_id, user_id, when, amount, _, _ in rows:
+        if type == "Expense":
+            key = (user_id, category_id, when.year, when.month)
+            totals[key] = totals.get(key, 0) + amount
+    return totals
+
+class BudgetAlertEvaluator:
+    """
+    :param thresholds: Fractions of the budget whose crossing raises an alert.
+    :param projection_min_days: Days of the month needed before the run rate projects the month, when there is no forecast.
+    """
+
+    def __init__(self, dialect: str = "tsql", thresholds: tuple[float, ...] = (0.8, 1.0), projection_min_days: int = 7):
+        self.dialect = dialect
+        self.thresholds = sorted(thresholds)
+        self.projection_min_days = projection_min_days
+
+    def projection(self, spent: float, forecast, forecast_spent, today: date) -> float | None:
+        """Expected expenses of the whole current month."""
+        if forecast is not None:
+            # The forecast was computed with the expenses recorded until last night
+            return spent + max(float(forecast) - float(forecast_spent), 0.0)
+        if today.day < self.projection_min_days:
+            return None
+        return spent * calendar.monthrange(today.year, today.month)[1] / today.day
+
+    def crossings(self, budget: float, before: float, after: float, forecast, forecast_spent, today: date) -> list[tuple[str, float | None]]:
+        """(Kind, projection) of the alerts raised by the expenses going from before to after."""
+        alerts = [(f"{threshold:.0%}", None) for threshold in self.thresholds if before < threshold * budget <= after]
+        if after < budget:
+            projected = self.projection(after, forecast, forecast_spent, today)
+            previous = self.projection(before, forecast, forecast_spent, today)
+            if projected is not None and projected > budget and (previous is None or previous <= budget):
+                alerts.append((PROJECTED, round(projected, 2)))
+        return alerts
+
+    def evaluate(self, conn, added: dict, today: date | None = None) -> list[dict]:
+        """
+        Raise the alerts of the expenses just inserted on conn, totals per (UserId, CategoryId, Year, Month)
+        from add_expenses; runs in the writer's database transaction. Returns the new alerts.
+        """
+        today = today or date.today()
+        created_at = datetime.now().replace(microsecond=0).isoformat()
+        alerts = []
+        for (user_id, category_id, year, month), amount in added.items():
+            if (year, month) != (today.year, today.month):
+                continue
+            row = conn.execute(BUDGET_STATE_SQL, (user_id, category_id, year, month)).fetchone()
+            if row is None:
+                continue
+            budget, total, forecast, forecast_spent = row
+            budget, after = float(budget), float(total or 0)
+            if budget <= 0:
+                continue
+            before = after - float(amount)
+            for kind, projected in self.crossings(budget, before, after, forecast, forecast_spent, today):
+                key = (user_id, year, month, category_id, kind)
+                cursor = conn.execute(INSERT_ALERT_SQL[self.dialect], (*key, round(after, 2), budget, projected, created_at, *key))
+                if cursor.rowcount:
+                    alerts.append({"CategoryId": category_id, "Kind": kind, "Spent": round(after, 2), "Budget": budget, "Projected": projected})
+        return alerts
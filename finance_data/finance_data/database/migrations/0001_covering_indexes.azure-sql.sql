@@ -0,0 +1,29 @@
+-- Covering indexes for the AnalyzerAgent queries (every one filters on UserId and a Date range)
+-- and for the user-function lookups of accounts, categories and budgets
+
+CREATE INDEX IX_Transactions_UserId_Date ON Transactions (UserId, Date)
+    INCLUDE (Type, Amount, CategoryId, AccountId)
+GO
+
+CREATE INDEX IX_Transactions_UserId_CategoryId_Date ON Transactions (UserId, CategoryId, Date)
+    INCLUDE (Type, Amount)
+GO
+
+-- Foreign key checks when accounts or categories are deleted
+CREATE INDEX IX_Transactions_AccountId ON Transactions (AccountId)
+GO
+
+CREATE INDEX IX_Transactions_CategoryId ON Transactions (CategoryId)
+GO
+
+CREATE INDEX IX_Accounts_UserId ON Accounts (UserId)
+    INCLUDE (Name, Type)
+GO
+
+CREATE INDEX IX_Categories_UserId_Type ON Categories (UserId, Type)
+    INCLUDE (Name, Description)
+GO
+
+CREATE INDEX IX_Budget_UserId_Year_Month ON Budget (UserId, Year, Month)
+    INCLUDE (CategoryId, Amount)
+GO
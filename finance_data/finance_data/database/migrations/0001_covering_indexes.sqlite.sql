@@ -0,0 +1,11 @@
+-- Covering indexes for the AnalyzerAgent queries (every one filters on UserId and a Date range)
+-- and for the user-function lookups of accounts, categories and budgets.
+-- SQLite has no INCLUDE, so the covered columns are trailing key columns.
+
+CREATE INDEX IX_Transactions_UserId_Date ON Transactions (UserId, Date, Type, Amount, CategoryId, AccountId);
+CREATE INDEX IX_Transactions_UserId_CategoryId_Date ON Transactions (UserId, CategoryId, Date, Type, Amount);
+CREATE INDEX IX_Transactions_AccountId ON Transactions (AccountId);
+CREATE INDEX IX_Transactions_CategoryId ON Transactions (CategoryId);
+CREATE INDEX IX_Accounts_UserId ON Accounts (UserId, Name, Type);
+CREATE INDEX IX_Categories_UserId_Type ON Categories (UserId, Type, Name);
+CREATE INDEX IX_Budget_UserId_Year_Month ON Budget (UserId, Year, Month, CategoryId, Amount);
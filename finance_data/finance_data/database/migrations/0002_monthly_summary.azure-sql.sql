@@ -0,0 +1,94 @@
+-- Monthly totals per category and transaction type, kept in sync by a trigger on Transactions
+-- and backfilled from the existing transactions
+
+CREATE TABLE MonthlySummary (
+    UserId INT NOT NULL,
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Type NVARCHAR(50) NOT NULL,
+    Total DECIMAL(14, 2) NOT NULL,
+    TransactionCount INT NOT NULL,
+    MinAmount DECIMAL(10, 2) NOT NULL,
+    MaxAmount DECIMAL(10, 2) NOT NULL,
+    CONSTRAINT PK_MonthlySummary PRIMARY KEY (UserId, Year, Month, CategoryId, Type)
+)
+GO
+
+-- Keeps MonthlySummary in sync with Transactions: every statement applies the totals and counts of
+-- the rows it inserted, updated or deleted to their (UserId, Year, Month, CategoryId, Type) groups.
+-- The minimum and maximum can't be decremented, so they're recomputed only for the groups that lost one
+CREATE OR ALTER TRIGGER TR_Transactions_MonthlySummary ON Transactions
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @Deltas TABLE (
+        UserId INT NOT NULL,
+        Year INT NOT NULL,
+        Month INT NOT NULL,
+        CategoryId INT NOT NULL,
+        Type NVARCHAR(50) NOT NULL,
+        Total DECIMAL(14, 2) NOT NULL,
+        TransactionCount INT NOT NULL,
+        InsertedMin DECIMAL(10, 2) NULL,
+        InsertedMax DECIMAL(10, 2) NULL,
+        DeletedMin DECIMAL(10, 2) NULL,
+        DeletedMax DECIMAL(10, 2) NULL,
+        PRIMARY KEY (UserId, Year, Month, CategoryId, Type)
+    );
+
+    INSERT INTO @Deltas (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, InsertedMin, InsertedMax, DeletedMin, DeletedMax)
+    SELECT UserId, Year, Month, CategoryId, Type, SUM(Amount), SUM(Delta),
+           MIN(InsertedAmount), MAX(InsertedAmount), MIN(DeletedAmount), MAX(DeletedAmount)
+    FROM (
+        SELECT UserId, YEAR(Date) AS Year, MONTH(Date) AS Month, CategoryId, Type,
+               Amount, 1 AS Delta, Amount AS InsertedAmount, CAST(NULL AS DECIMAL(10, 2)) AS DeletedAmount
+        FROM inserted
+        UNION ALL
+        SELECT UserId, YEAR(Date), MONTH(Date), CategoryId, Type, -Amount, -1, NULL, Amount
+        FROM deleted
+    ) changes
+    GROUP BY UserId, Year, Month, CategoryId, Type;
+
+    MERGE MonthlySummary WITH (HOLDLOCK) AS s
+    USING @Deltas AS d
+    ON s.UserId = d.UserId AND s.Year = d.Year AND s.Month = d.Month AND s.CategoryId = d.CategoryId AND s.Type = d.Type
+    WHEN MATCHED AND s.TransactionCount + d.TransactionCount = 0 THEN
+        DELETE
+    WHEN MATCHED THEN UPDATE SET
+        Total = s.Total + d.Total,
+        TransactionCount = s.TransactionCount + d.TransactionCount,
+        MinAmount = CASE WHEN d.InsertedMin < s.MinAmount THEN d.InsertedMin ELSE s.MinAmount END,
+        MaxAmount = CASE WHEN d.InsertedMax > s.MaxAmount THEN d.InsertedMax ELSE s.MaxAmount END
+    WHEN NOT MATCHED BY TARGET AND d.TransactionCount > 0 THEN
+        INSERT (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+        VALUES (d.UserId, d.Year, d.Month, d.CategoryId, d.Type, d.Total, d.TransactionCount, d.InsertedMin, d.InsertedMax);
+
+    -- A deleted amount at or past the current extreme may have been that extreme
+    UPDATE s
+    SET MinAmount = x.MinAmount, MaxAmount = x.MaxAmount
+    FROM MonthlySummary s
+    JOIN @Deltas d ON d.UserId = s.UserId AND d.Year = s.Year AND d.Month = s.Month
+                  AND d.CategoryId = s.CategoryId AND d.Type = s.Type
+    CROSS APPLY (
+        SELECT MIN(t.Amount) AS MinAmount, MAX(t.Amount) AS MaxAmount
+        FROM Transactions t
+        WHERE t.UserId = s.UserId AND t.CategoryId = s.CategoryId AND t.Type = s.Type
+          AND t.Date >= DATEFROMPARTS(s.Year, s.Month, 1)
+          AND t.Date < DATEADD(month, 1, DATEFROMPARTS(s.Year, s.Month, 1))
+    ) x
+    WHERE d.DeletedMin <= s.MinAmount OR d.DeletedMax >= s.MaxAmount;
+END
+GO
+
+-- Backfill: recompute every group from Transactions. Creating the trigger locked the table, so no write
+-- lands between the backfill and the trigger
+DELETE FROM MonthlySummary;
+
+INSERT INTO MonthlySummary (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+SELECT UserId, YEAR(Date), MONTH(Date), CategoryId, Type, SUM(Amount), COUNT(*), MIN(Amount), MAX(Amount)
+FROM Transactions
+GROUP BY UserId, YEAR(Date), MONTH(Date), CategoryId, Type
+GO
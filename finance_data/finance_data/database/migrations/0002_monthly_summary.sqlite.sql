@@ -0,0 +1,70 @@
+-- Monthly totals per category and transaction type, kept in sync by triggers on Transactions
+-- and backfilled from the existing transactions
+
+CREATE TABLE MonthlySummary (
+    UserId INTEGER NOT NULL,
+    Year INTEGER NOT NULL,
+    Month INTEGER NOT NULL,
+    CategoryId INTEGER NOT NULL,
+    Type TEXT NOT NULL,
+    Total NUMERIC NOT NULL,
+    TransactionCount INTEGER NOT NULL,
+    MinAmount NUMERIC NOT NULL,
+    MaxAmount NUMERIC NOT NULL,
+    PRIMARY KEY (UserId, Year, Month, CategoryId, Type)
+) WITHOUT ROWID;
+
+-- Inserts add to the month of the transaction; deletes and updates recompute the months they touch,
+-- since the minimum and maximum can't be decremented
+CREATE TRIGGER TR_Transactions_Summary_Insert AFTER INSERT ON Transactions
+BEGIN
+    INSERT INTO MonthlySummary (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+    VALUES (NEW.UserId, CAST(strftime('%Y', NEW.Date) AS INTEGER), CAST(strftime('%m', NEW.Date) AS INTEGER),
+            NEW.CategoryId, NEW.Type, NEW.Amount, 1, NEW.Amount, NEW.Amount)
+    ON CONFLICT (UserId, Year, Month, CategoryId, Type) DO UPDATE SET
+        Total = ROUND(Total + excluded.Total, 2),
+        TransactionCount = TransactionCount + 1,
+        MinAmount = MIN(MinAmount, excluded.MinAmount),
+        MaxAmount = MAX(MaxAmount, excluded.MaxAmount);
+END;
+
+CREATE TRIGGER TR_Transactions_Summary_Delete AFTER DELETE ON Transactions
+BEGIN
+    DELETE FROM MonthlySummary
+    WHERE UserId = OLD.UserId AND Year = CAST(strftime('%Y', OLD.Date) AS INTEGER) AND Month = CAST(strftime('%m', OLD.Date) AS INTEGER)
+      AND CategoryId = OLD.CategoryId AND Type = OLD.Type;
+    INSERT INTO MonthlySummary (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+    SELECT UserId, CAST(strftime('%Y', OLD.Date) AS INTEGER), CAST(strftime('%m', OLD.Date) AS INTEGER), CategoryId, Type,
+           ROUND(SUM(Amount), 2), COUNT(*), MIN(Amount), MAX(Amount)
+    FROM Transactions
+    WHERE UserId = OLD.UserId AND CategoryId = OLD.CategoryId AND Type = OLD.Type
+      AND Date >= date(OLD.Date, 'start of month') AND Date < date(OLD.Date, 'start of month', '+1 month')
+    GROUP BY UserId, CategoryId, Type;
+END;
+
+CREATE TRIGGER TR_Transactions_Summary_Update AFTER UPDATE OF UserId, Date, Amount, CategoryId, Type ON Transactions
+BEGIN
+    DELETE FROM MonthlySummary
+    WHERE (UserId = OLD.UserId AND Year = CAST(strftime('%Y', OLD.Date) AS INTEGER) AND Month = CAST(strftime('%m', OLD.Date) AS INTEGER)
+           AND CategoryId = OLD.CategoryId AND Type = OLD.Type)
+       OR (UserId = NEW.UserId AND Year = CAST(strftime('%Y', NEW.Date) AS INTEGER) AND Month = CAST(strftime('%m', NEW.Date) AS INTEGER)
+           AND CategoryId = NEW.CategoryId AND Type = NEW.Type);
+    INSERT INTO MonthlySummary (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+    SELECT UserId, CAST(strftime('%Y', Date) AS INTEGER), CAST(strftime('%m', Date) AS INTEGER), CategoryId, Type,
+           ROUND(SUM(Amount), 2), COUNT(*), MIN(Amount), MAX(Amount)
+    FROM Transactions
+    WHERE (UserId = OLD.UserId AND CategoryId = OLD.CategoryId AND Type = OLD.Type
+           AND Date >= date(OLD.Date, 'start of month') AND Date < date(OLD.Date, 'start of month', '+1 month'))
+       OR (UserId = NEW.UserId AND CategoryId = NEW.CategoryId AND Type = NEW.Type
+           AND Date >= date(NEW.Date, 'start of month') AND Date < date(NEW.Date, 'start of month', '+1 month'))
+    GROUP BY UserId, CAST(strftime('%Y', Date) AS INTEGER), CAST(strftime('%m', Date) AS INTEGER), CategoryId, Type;
+END;
+
+-- Backfill: recompute every group from Transactions
+DELETE FROM MonthlySummary;
+
+INSERT INTO MonthlySummary (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+SELECT UserId, CAST(strftime('%Y', Date) AS INTEGER), CAST(strftime('%m', Date) AS INTEGER), CategoryId, Type,
+       ROUND(SUM(Amount), 2), COUNT(*), MIN(Amount), MAX(Amount)
+FROM Transactions
+GROUP BY UserId, CAST(strftime('%Y', Date) AS INTEGER), CAST(strftime('%m', Date) AS INTEGER), CategoryId, Type;
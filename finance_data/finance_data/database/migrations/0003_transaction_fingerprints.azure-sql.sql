@@ -0,0 +1,17 @@
+-- Fingerprints of recorded transactions, used to detect near-duplicates before insert.
+-- The descriptions are normalized in Python, so the existing transactions are fingerprinted with
+-- python -m finance_data.duplicates --backfill (from the finance_data folder) after this migration.
+
+CREATE TABLE TransactionFingerprints (
+    TransactionId INT PRIMARY KEY,
+    UserId INT NOT NULL,
+    AmountCents BIGINT NOT NULL,
+    DayNumber INT NOT NULL,
+    NormalizedDescription NVARCHAR(1000),
+    AttachmentHash CHAR(64),
+    CONSTRAINT FK_TransactionFingerprints_Transactions FOREIGN KEY (TransactionId) REFERENCES Transactions(Id) ON DELETE CASCADE
+)
+GO
+
+CREATE INDEX IX_TransactionFingerprints_Lookup ON TransactionFingerprints (UserId, AmountCents, DayNumber)
+GO
@@ -0,0 +1,15 @@
+-- Fingerprints of recorded transactions, used to detect near-duplicates before insert.
+-- The descriptions are normalized in Python, so the existing transactions are fingerprinted with
+-- python -m finance_data.duplicates --backfill (from the finance_data folder) after this migration.
+
+CREATE TABLE TransactionFingerprints (
+    TransactionId INTEGER PRIMARY KEY,
+    UserId INTEGER NOT NULL,
+    AmountCents INTEGER NOT NULL,
+    DayNumber INTEGER NOT NULL,
+    NormalizedDescription TEXT,
+    AttachmentHash TEXT,
+    CONSTRAINT FK_TransactionFingerprints_Transactions FOREIGN KEY (TransactionId) REFERENCES Transactions(Id) ON DELETE CASCADE
+);
+
+CREATE INDEX IX_TransactionFingerprints_Lookup ON TransactionFingerprints (UserId, AmountCents, DayNumber);
@@ -0,0 +1,64 @@
+-- Per-user data version, bumped by triggers on every write to the user's data.
+-- The SQL query result cache compares it to the version its entries were computed at.
+
+CREATE TABLE DataVersions (
+    UserId INT PRIMARY KEY,
+    Version BIGINT NOT NULL
+)
+GO
+
+CREATE OR ALTER TRIGGER TR_Transactions_DataVersion ON Transactions
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_Accounts_DataVersion ON Accounts
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_Categories_DataVersion ON Categories
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_Budget_DataVersion ON Budget
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
@@ -0,0 +1,87 @@
+-- Per-user data version, bumped by triggers on every write to the user's data.
+-- The SQL query result cache compares it to the version its entries were computed at.
+
+CREATE TABLE DataVersions (
+    UserId INTEGER PRIMARY KEY,
+    Version INTEGER NOT NULL
+);
+
+CREATE TRIGGER TR_Transactions_DataVersion_Insert AFTER INSERT ON Transactions
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Transactions_DataVersion_Update AFTER UPDATE ON Transactions
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Transactions_DataVersion_Delete AFTER DELETE ON Transactions
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Accounts_DataVersion_Insert AFTER INSERT ON Accounts
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Accounts_DataVersion_Update AFTER UPDATE ON Accounts
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Accounts_DataVersion_Delete AFTER DELETE ON Accounts
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Categories_DataVersion_Insert AFTER INSERT ON Categories
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Categories_DataVersion_Update AFTER UPDATE ON Categories
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Categories_DataVersion_Delete AFTER DELETE ON Categories
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Budget_DataVersion_Insert AFTER INSERT ON Budget
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Budget_DataVersion_Update AFTER UPDATE ON Budget
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_Budget_DataVersion_Delete AFTER DELETE ON Budget
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
@@ -0,0 +1,34 @@
+-- Expense forecasts per user, category and month, written by the nightly batch of forecasting.py
+-- next to the Budget rows of the same months, so the AnalyzerAgent answers projections with one lookup.
+-- Writes bump the user's data version like the other user tables, so cached query results are refreshed.
+
+CREATE TABLE SpendingForecasts (
+    UserId INT NOT NULL,
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Forecast DECIMAL(14, 2) NOT NULL,
+    Lower DECIMAL(14, 2) NOT NULL,
+    Upper DECIMAL(14, 2) NOT NULL,
+    SpentToDate DECIMAL(14, 2) NOT NULL,
+    Budget DECIMAL(10, 2) NULL,
+    ExceedProbability DECIMAL(5, 4) NULL,
+    Method NVARCHAR(20) NOT NULL,
+    ComputedAt DATETIME2 NOT NULL,
+    CONSTRAINT PK_SpendingForecasts PRIMARY KEY (UserId, Year, Month, CategoryId)
+)
+GO
+
+CREATE OR ALTER TRIGGER TR_SpendingForecasts_DataVersion ON SpendingForecasts
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
@@ -0,0 +1,31 @@
+-- Expense forecasts per user, category and month, written by the nightly batch of forecasting.py
+-- next to the Budget rows of the same months, so the AnalyzerAgent answers projections with one lookup.
+-- Writes bump the user's data version like the other user tables, so cached query results are refreshed.
+
+CREATE TABLE SpendingForecasts (
+    UserId INTEGER NOT NULL,
+    Year INTEGER NOT NULL,
+    Month INTEGER NOT NULL,
+    CategoryId INTEGER NOT NULL,
+    Forecast NUMERIC NOT NULL,
+    Lower NUMERIC NOT NULL,
+    Upper NUMERIC NOT NULL,
+    SpentToDate NUMERIC NOT NULL,
+    Budget NUMERIC,
+    ExceedProbability NUMERIC,
+    Method TEXT NOT NULL,
+    ComputedAt TEXT NOT NULL,
+    PRIMARY KEY (UserId, Year, Month, CategoryId)
+) WITHOUT ROWID;
+
+CREATE TRIGGER TR_SpendingForecasts_DataVersion_Insert AFTER INSERT ON SpendingForecasts
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_SpendingForecasts_DataVersion_Delete AFTER DELETE ON SpendingForecasts
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
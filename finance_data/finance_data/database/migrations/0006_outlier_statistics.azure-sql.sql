@@ -0,0 +1,61 @@
+-- Running statistics of the amounts per user, category and type, updated by outliers.py on every
+-- recorded transaction, and the transactions flagged as outliers against them at write time.
+-- Writes bump the user's data version like the other user tables, so cached query results are refreshed.
+
+CREATE TABLE CategoryStatistics (
+    UserId INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Type NVARCHAR(50) NOT NULL,
+    Count INT NOT NULL,
+    Mean FLOAT NOT NULL,
+    M2 FLOAT NOT NULL,
+    Median FLOAT NOT NULL,
+    Mad FLOAT NOT NULL,
+    CONSTRAINT PK_CategoryStatistics PRIMARY KEY (UserId, CategoryId, Type)
+)
+GO
+
+CREATE TABLE TransactionOutliers (
+    TransactionId INT PRIMARY KEY,
+    UserId INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Type NVARCHAR(50) NOT NULL,
+    Date DATETIME2 NOT NULL,
+    Amount DECIMAL(10, 2) NOT NULL,
+    UsualAmount DECIMAL(10, 2) NOT NULL,
+    ZScore FLOAT NOT NULL,
+    RobustScore FLOAT NOT NULL,
+    CONSTRAINT FK_TransactionOutliers_Transactions FOREIGN KEY (TransactionId) REFERENCES Transactions(Id) ON DELETE CASCADE
+)
+GO
+
+CREATE INDEX IX_TransactionOutliers_UserId_Date ON TransactionOutliers (UserId, Date) INCLUDE (CategoryId, Amount, UsualAmount, RobustScore)
+GO
+
+CREATE OR ALTER TRIGGER TR_CategoryStatistics_DataVersion ON CategoryStatistics
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_TransactionOutliers_DataVersion ON TransactionOutliers
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE DataVersions AS v
+    USING (SELECT UserId FROM inserted UNION SELECT UserId FROM deleted) AS changed
+    ON v.UserId = changed.UserId
+    WHEN MATCHED THEN UPDATE SET Version = v.Version + 1
+    WHEN NOT MATCHED THEN INSERT (UserId, Version) VALUES (changed.UserId, 1);
+END
+GO
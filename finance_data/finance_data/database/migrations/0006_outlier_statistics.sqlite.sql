@@ -0,0 +1,60 @@
+-- Running statistics of the amounts per user, category and type, updated by outliers.py on every
+-- recorded transaction, and the transactions flagged as outliers against them at write time.
+-- Writes bump the user's data version like the other user tables, so cached query results are refreshed.
+
+CREATE TABLE CategoryStatistics (
+    UserId INTEGER NOT NULL,
+    CategoryId INTEGER NOT NULL,
+    Type TEXT NOT NULL,
+    Count INTEGER NOT NULL,
+    Mean REAL NOT NULL,
+    M2 REAL NOT NULL,
+    Median REAL NOT NULL,
+    Mad REAL NOT NULL,
+    PRIMARY KEY (UserId, CategoryId, Type)
+) WITHOUT ROWID;
+
+CREATE TABLE TransactionOutliers (
+    TransactionId INTEGER PRIMARY KEY,
+    UserId INTEGER NOT NULL,
+    CategoryId INTEGER NOT NULL,
+    Type TEXT NOT NULL,
+    Date TEXT NOT NULL,
+    Amount NUMERIC NOT NULL,
+    UsualAmount NUMERIC NOT NULL,
+    ZScore REAL NOT NULL,
+    RobustScore REAL NOT NULL,
+    CONSTRAINT FK_TransactionOutliers_Transactions FOREIGN KEY (TransactionId) REFERENCES Transactions(Id) ON DELETE CASCADE
+);
+
+CREATE INDEX IX_TransactionOutliers_UserId_Date ON TransactionOutliers (UserId, Date, CategoryId, Amount);
+
+CREATE TRIGGER TR_CategoryStatistics_DataVersion_Insert AFTER INSERT ON CategoryStatistics
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_CategoryStatistics_DataVersion_Update AFTER UPDATE ON CategoryStatistics
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_CategoryStatistics_DataVersion_Delete AFTER DELETE ON CategoryStatistics
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_TransactionOutliers_DataVersion_Insert AFTER INSERT ON TransactionOutliers
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (NEW.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
+
+CREATE TRIGGER TR_TransactionOutliers_DataVersion_Delete AFTER DELETE ON TransactionOutliers
+BEGIN
+    INSERT INTO DataVersions (UserId, Version) VALUES (OLD.UserId, 1)
+    ON CONFLICT (UserId) DO UPDATE SET Version = Version + 1;
+END;
@@ -0,0 +1,22 @@
+-- Budget alerts raised by the TransactionsAgent when a recorded transaction takes the month-to-date
+-- expenses of a category across 80% or 100% of its budget, or its projection above the budget.
+-- The app pushes the undelivered ones into the user's chat; each alert is raised once per month.
+
+CREATE TABLE BudgetAlerts (
+    Id INT PRIMARY KEY IDENTITY(1,1),
+    UserId INT NOT NULL,
+    Year INT NOT NULL,
+    Month INT NOT NULL,
+    CategoryId INT NOT NULL,
+    Kind NVARCHAR(20) NOT NULL,
+    Spent DECIMAL(14, 2) NOT NULL,
+    Budget DECIMAL(10, 2) NOT NULL,
+    Projected DECIMAL(14, 2) NULL,
+    CreatedAt DATETIME2 NOT NULL,
+    DeliveredAt DATETIME2 NULL,
+    CONSTRAINT UQ_BudgetAlerts UNIQUE (UserId, Year, Month, CategoryId, Kind)
+)
+GO
+
+CREATE INDEX IX_BudgetAlerts_Pending ON BudgetAlerts (UserId, Id) INCLUDE (CategoryId, Kind, Spent, Budget, Projected) WHERE DeliveredAt IS NULL
+GO
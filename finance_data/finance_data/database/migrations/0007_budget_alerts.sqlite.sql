@@ -0,0 +1,20 @@
+-- Budget alerts raised by the TransactionsAgent when a recorded transaction takes the month-to-date
+-- expenses of a category across 80% or 100% of its budget, or its projection above the budget.
+-- The app pushes the undelivered ones into the user's chat; each alert is raised once per month.
+
+CREATE TABLE BudgetAlerts (
+    Id INTEGER PRIMARY KEY,
+    UserId INTEGER NOT NULL,
+    Year INTEGER NOT NULL,
+    Month INTEGER NOT NULL,
+    CategoryId INTEGER NOT NULL,
+    Kind TEXT NOT NULL,
+    Spent NUMERIC NOT NULL,
+    Budget NUMERIC NOT NULL,
+    Projected NUMERIC,
+    CreatedAt TEXT NOT NULL,
+    DeliveredAt TEXT,
+    CONSTRAINT UQ_BudgetAlerts UNIQUE (UserId, Year, Month, CategoryId, Kind)
+);
+
+CREATE INDEX IX_BudgetAlerts_Pending ON BudgetAlerts (UserId, Id) WHERE DeliveredAt IS NULL;
@@ -0,0 +1,63 @@
+-- Database schema for financial management system - SQLite version of azure-sql-schema.sql
+-- Used for local benchmarking and single-user deployments (DATABASE_BACKEND=sqlite).
+-- Dates are stored as ISO 8601 text ('YYYY-MM-DD HH:MM:SS'), amounts as NUMERIC.
+
+PRAGMA foreign_keys = ON;
+
+-- Users table
+CREATE TABLE IF NOT EXISTS Users (
+    Id INTEGER PRIMARY KEY,
+    Name TEXT NOT NULL,
+    Email TEXT NOT NULL UNIQUE
+);
+
+-- Categories table
+CREATE TABLE IF NOT EXISTS Categories (
+    Id INTEGER PRIMARY KEY,
+    Name TEXT NOT NULL,
+    Description TEXT,
+    Type TEXT,
+    UserId INTEGER NOT NULL,
+    CONSTRAINT FK_Categories_Users FOREIGN KEY (UserId) REFERENCES Users(Id)
+);
+
+-- Accounts table
+CREATE TABLE IF NOT EXISTS Accounts (
+    Id INTEGER PRIMARY KEY,
+    Name TEXT NOT NULL,
+    Description TEXT,
+    Type TEXT,
+    UserId INTEGER NOT NULL,
+    CONSTRAINT FK_Accounts_Users FOREIGN KEY (UserId) REFERENCES Users(Id)
+);
+
+-- Transactions table
+CREATE TABLE IF NOT EXISTS Transactions (
+    Id INTEGER PRIMARY KEY,
+    Type TEXT NOT NULL,
+    AccountId INTEGER NOT NULL,
+    CategoryId INTEGER NOT NULL,
+    UserId INTEGER NOT NULL,
+    Date TEXT NOT NULL,
+    Amount NUMERIC NOT NULL,
+    Description TEXT,
+    AttachmentUrl TEXT,
+    CONSTRAINT FK_Transactions_Accounts FOREIGN KEY (AccountId) REFERENCES Accounts(Id),
+    CONSTRAINT FK_Transactions_Categories FOREIGN KEY (CategoryId) REFERENCES Categories(Id),
+    CONSTRAINT FK_Transactions_Users FOREIGN KEY (UserId) REFERENCES Users(Id)
+);
+
+-- Budget table
+CREATE TABLE IF NOT EXISTS Budget (
+    Id INTEGER PRIMARY KEY,
+    CategoryId INTEGER NOT NULL,
+    Year INTEGER NOT NULL,
+    Month INTEGER NOT NULL,
+    Amount NUMERIC NOT NULL,
+    UserId INTEGER NOT NULL,
+    CONSTRAINT FK_Budget_Categories FOREIGN KEY (CategoryId) REFERENCES Categories(Id),
+    CONSTRAINT FK_Budget_Users FOREIGN KEY (UserId) REFERENCES Users(Id),
+    CONSTRAINT UQ_Budget UNIQUE (CategoryId, Year, Month, UserId)
+);
+
+-- Query indexes are created by the migrations in database/migrations
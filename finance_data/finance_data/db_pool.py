@@ -0,0 +1,233 @@
+import time
+import asyncio
+import logging
+import functools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+@dataclass
+class PoolMetrics:
+    created: int = 0
+    reused: int = 0
+    evicted: int = 0
+    failed_health_checks: int = 0
+    statements_reused: int = 0
+
+    def snapshot(self) -> dict:
+        return dict(self.__dict__)
+
+class PooledConnection:
+    """
+    A database connection owned by the pool.
+    Keeps one cursor per SQL text, so pyodbc re-executes an already prepared statement
+    instead of preparing it again on the server.
+    """
+
+    def __init__(self, raw, pool: "ConnectionPool"):
+        self.raw = raw
+        self.pool = pool
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self._cursors: OrderedDict[str, Any] = OrderedDict()
+
+    def execute(self, sql: str, params: tuple = ()):
+        cursor = self._cursors.get(sql)
+        if cursor is None:
+            cursor = self.raw.cursor()
+            self._cursors[sql] = cursor
+            if len(self._cursors) > self.pool.max_statements:
+                _, oldest = self._cursors.popitem(last=False)
+                oldest.close()
+        else:
+            self._cursors.move_to_end(sql)
+            self.pool.metrics.statements_reused += 1
+        cursor.execute(sql, params)
+        return cursor
+
+    def executemany(self, sql: str, rows: list[tuple]) -> None:
+        cursor = self.raw.cursor()
+        # pyodbc sends all the rows of a batch in one round trip instead of one per row
+        if hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = True
+        try:
+            cursor.executemany(sql, rows)
+        finally:
+            cursor.close()
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+    def close(self) -> None:
+        for cursor in self._cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors.clear()
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of database connections.
+
+    :param connect: Factory returning a new DB-API connection (pyodbc.connect, sqlite3.connect, ...).
+    :param max_size: Maximum number of open connections.
+    :param max_idle_seconds: Idle connections older than this are closed instead of reused.
+    :param health_check_interval: A connection idle for longer than this is checked with a ping query before reuse.
+    :param timeout: Seconds to wait for a free connection before raising PoolTimeoutError.
+    :param max_statements: Cached cursors (prepared statements) per connection.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 5,
+        max_idle_seconds: float = 300.0,
+        health_check_interval: float = 30.0,
+        timeout: float = 30.0,
+        max_statements: int = 32,
+        ping_sql: str = "SELECT 1",
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self.max_statements = max_statements
+        self.ping_sql = ping_sql
+        self.metrics = PoolMetrics()
+        self._idle: deque[PooledConnection] = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; it is rolled back on error and returned to the pool afterwards."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                # The connection is broken, don't give it back
+                conn.close()
+                conn = None
+            raise
+        finally:
+            self._release(conn)
+
+    def _acquire(self) -> PooledConnection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"No database connection available after {self.timeout} seconds")
+        try:
+            while True:
+                with self._lock:
+                    # Most recently used first, so rarely used connections age out
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    break
+                if self._usable(conn):
+                    self.metrics.reused += 1
+                    return conn
+                conn.close()
+            conn = PooledConnection(self.connect(), self)
+            self.metrics.created += 1
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _usable(self, conn: PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - conn.last_used > self.max_idle_seconds:
+            self.metrics.evicted += 1
+            return False
+        if now - conn.last_checked > self.health_check_interval:
+            try:
+                cursor = conn.raw.cursor()
+                cursor.execute(self.ping_sql).fetchall()
+                cursor.close()
+            except Exception as e:
+                logger.warning(f"Discarding database connection that failed its health check: {e}")
+                self.metrics.failed_health_checks += 1
+                return False
+            conn.last_checked = now
+        return True
+
+    def _release(self, conn: PooledConnection | None) -> None:
+        try:
+            if conn is not None:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    if not self._closed:
+                        self._idle.append(conn)
+                        conn = None
+                if conn is not None:
+                    conn.close()
+        finally:
+            self._slots.release()
+
+    def evict_idle(self) -> int:
+        """Close idle connections unused for longer than max_idle_seconds."""
+        cutoff = time.monotonic() - self.max_idle_seconds
+        with self._lock:
+            expired = [conn for conn in self._idle if conn.last_used < cutoff]
+            for conn in expired:
+                self._idle.remove(conn)
+        for conn in expired:
+            conn.close()
+        self.metrics.evicted += len(expired)
+        return len(expired)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            conn.close()
+
+class DatabaseExecutor:
+    """
+    Bounded thread pool that runs blocking database calls off the event loop.
+    Size it like the connection pool: a thread never waits for a connection held by another.
+    """
+
+    def __init__(self, max_workers: int = 5):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def wrap(self, func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+        """Async version of a blocking function, with the same name, signature and docstring for the tool definition."""
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.run(func, *args, **kwargs)
+
+        return wrapper
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
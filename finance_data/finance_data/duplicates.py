@@ -0,0 +1,197 @@
+"""
+Near-duplicate detection for recorded transactions.
+
+Every transaction recorded by the TransactionsAgent gets a fingerprint in TransactionFingerprints:
+amount in cents, day number, normalized description and attachment hash. A new transaction is
+looked up by (UserId, AmountCents, DayNumber +/- 1) with one index seek, then the candidates are
+compared on their attachment (receipt blobs are named by content hash) and description shingles.
+
+Statement imports skip the rows that duplicate a transaction recorded before the import started,
+and fingerprint the rows they insert batch by batch. The backfill fingerprints the transactions
+recorded before the index existed, in batches.
+
+Usage (from the finance_data folder):
+    python -m finance_data.duplicates --backfill [--path finance.db] [--batch-size 5000]
+"""
+import re
+import time
+import hashlib
+import argparse
+import urllib.parse
+from decimal import Decimal
+from datetime import date, datetime
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+
+from .storage import Storage, SqliteStorage, create_storage
+
+INSERT_FINGERPRINT_SQL = """
+INSERT INTO TransactionFingerprints (TransactionId, UserId, AmountCents, DayNumber, NormalizedDescription, AttachmentHash)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+FIND_CANDIDATES_SQL = """
+SELECT f.TransactionId, f.NormalizedDescription, f.AttachmentHash, t.Date, t.Amount, t.Description
+FROM TransactionFingerprints f
+JOIN Transactions t ON t.Id = f.TransactionId
+WHERE f.UserId = ? AND f.AmountCents = ? AND f.DayNumber BETWEEN ? AND ?
+"""
+
+# Fingerprints of the user's transactions inserted after a given Id, e.g. by a statement import
+NEW_TRANSACTIONS_SQL = """
+SELECT t.Id, t.Date, t.Amount, t.Description, t.AttachmentUrl
+FROM Transactions t
+LEFT JOIN TransactionFingerprints f ON f.TransactionId = t.Id
+WHERE t.Id > ? AND t.UserId = ? AND f.TransactionId IS NULL
+ORDER BY t.Id
+"""
+
+# T-SQL, translated for SQLite
+UNFINGERPRINTED_SQL = """
+SELECT TOP {batch_size} t.Id, t.UserId, t.Date, t.Amount, t.Description, t.AttachmentUrl
+FROM Transactions t
+LEFT JOIN TransactionFingerprints f ON f.TransactionId = t.Id
+WHERE f.TransactionId IS NULL AND t.Id > ?
+ORDER BY t.Id
+"""
+
+CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+def normalize_description(description: str | None) -> str:
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", (description or "").lower()).split())
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the character shingles of two normalized descriptions."""
+    first, second = shingles(a), shingles(b)
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+def amount_cents(amount) -> int:
+    return int((abs(Decimal(str(amount))) * 100).to_integral_value())
+
+def day_number(value) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.toordinal() if isinstance(value, date) else int(value)
+
+def attachment_hash(url: str | None) -> str | None:
+    """Content hash of the attachment: the blob name of uploaded receipts, otherwise a hash of the URL."""
+    if not url:
+        return None
+    stem = PurePosixPath(urllib.parse.urlparse(url).path).stem.lower()
+    if CONTENT_HASH.match(stem):
+        return stem
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+@dataclass
+class Fingerprint:
+    user_id: int
+    amount_cents: int
+    day_number: int
+    description: str
+    attachment_hash: str | None
+
+    @classmethod
+    def of(cls, user_id: int, date, amount, description: str | None, attachment_url: str | None) -> "Fingerprint":
+        return cls(user_id, amount_cents(amount), day_number(date), normalize_description(description), attachment_hash(attachment_url))
+
+    def row(self, transaction_id: int) -> tuple:
+        return (transaction_id, self.user_id, self.amount_cents, self.day_number, self.description, self.attachment_hash)
+
+@dataclass
+class BackfillReport:
+    fingerprinted: int = 0
+    seconds: float = 0.0
+
+class DuplicateDetector:
+    def __init__(self, window_days: int = 1, min_similarity: float = 0.5):
+        self.window_days = window_days
+        self.min_similarity = min_similarity
+
+    def match(self, fingerprint: Fingerprint, candidate_description: str, candidate_attachment: str | None) -> str | None:
+        """Reason why a candidate with the same amount and a close date is a duplicate, or None."""
+        if fingerprint.attachment_hash and candidate_attachment:
+            # Two different receipts are never duplicates, even with similar descriptions
+            return "same receipt" if fingerprint.attachment_hash == candidate_attachment else None
+        if fingerprint.description == candidate_description:
+            return "same description"
+        if similarity(fingerprint.description, candidate_description) >= self.min_similarity:
+            return "similar description"
+        return None
+
+    def find(self, conn, fingerprint: Fingerprint, max_id: int | None = None) -> list[dict]:
+        """Existing duplicates of the fingerprint; with max_id, only among the transactions up to that Id."""
+        cursor = conn.execute(FIND_CANDIDATES_SQL, (fingerprint.user_id, fingerprint.amount_cents,
+                                                    fingerprint.day_number - self.window_days,
+                                                    fingerprint.day_number + self.window_days))
+        duplicates = []
+        for transaction_id, description, attachment, date, amount, original_description in cursor.fetchall():
+            if max_id is not None and transaction_id > max_id:
+                continue
+            reason = self.match(fingerprint, description, attachment)
+            if reason:
+                duplicates.append({"Id": transaction_id, "Date": str(date), "Amount": float(amount),
+                                   "Description": original_description, "reason": reason})
+        return duplicates
+
+    def add(self, conn, fingerprints: list[tuple[int, Fingerprint]]) -> None:
+        conn.executemany(INSERT_FINGERPRINT_SQL, [fingerprint.row(transaction_id) for transaction_id, fingerprint in fingerprints])
+
+    def add_new(self, conn, user_id: int, after_id: int) -> int:
+        """Fingerprint the transactions of the user inserted after after_id without one; returns the last Id."""
+        rows = conn.execute(NEW_TRANSACTIONS_SQL, (after_id, user_id)).fetchall()
+        if rows:
+            conn.executemany(INSERT_FINGERPRINT_SQL, [Fingerprint.of(user_id, date, amount, description, url).row(transaction_id)
+                                                      for transaction_id, date, amount, description, url in rows])
+            after_id = rows[-1][0]
+        return after_id
+
+    def backfill(self, storage: Storage, batch_size: int = 5000) -> BackfillReport:
+        """Fingerprint every transaction that has none yet, one committed batch at a time."""
+        report = BackfillReport()
+        start = time.perf_counter()
+        sql = storage.translate(UNFINGERPRINTED_SQL.format(batch_size=int(batch_size)))
+        conn = storage.connect()
+        try:
+            cursor = conn.cursor()
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            last_id = 0
+            while rows := cursor.execute(sql, (last_id,)).fetchall():
+                batch = [Fingerprint.of(user_id, date, amount, description, url).row(transaction_id)
+                         for transaction_id, user_id, date, amount, description, url in rows]
+                cursor.executemany(INSERT_FINGERPRINT_SQL, batch)
+                conn.commit()
+                report.fingerprinted += len(batch)
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+        report.seconds = time.perf_counter() - start
+        return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backfill", action="store_true", help="Fingerprint the transactions that have no fingerprint yet")
+    parser.add_argument("--path", default=None, help="SQLite database file; DATABASE_BACKEND is used when omitted")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        return
+    if args.path:
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = create_storage()
+    report = DuplicateDetector().backfill(storage, batch_size=args.batch_size)
+    print(f"Fingerprinted {report.fingerprinted} transactions in {report.seconds:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Nightly spending forecasts for the predictive analysis of the AnalyzerAgent.
+
+The monthly expenses per category of every user (from MonthlySummary) over the last HISTORY_MONTHS
+complete months are fitted by least squares with a level, a linear trend and a yearly seasonal
+harmonic, depending on how much history the user has. Users with the same history length share the
+design matrix, so all the categories of all the users of a chunk are fitted with a few lstsq calls.
+The current month is nowcast from the spending to date plus the forecast for the days left, and
+compared to the budget. Chunks of users are fitted in a process pool and written to SpendingForecasts,
+keyed like Budget (UserId, Year, Month, CategoryId).
+
+Usage (from the finance_data folder), e.g. nightly from cron:
+    python -m finance_data.forecasting --run [--path finance.db] [--workers 4] [--months-ahead 3]
+"""
+import math
+import time
+import argparse
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .storage import Storage, SqliteStorage, create_storage
+
+HISTORY_MONTHS = 24
+# Terms of the model by months of history
+MIN_TREND_MONTHS = 6
+MIN_SEASONAL_MONTHS = 13
+# Half-width of the 80% interval in standard deviations
+Z_80 = 1.2816
+
+USERS_SQL = "SELECT Id FROM Users ORDER BY Id"
+HISTORY_SQL = """
+SELECT UserId, Year, Month, CategoryId, Total FROM MonthlySummary
+WHERE UserId BETWEEN ? AND ? AND Year >= ? AND Type = 'Expense'
+"""
+BUDGETS_SQL = "SELECT UserId, CategoryId, Year, Month, Amount FROM Budget WHERE UserId BETWEEN ? AND ? AND Year BETWEEN ? AND ?"
+DELETE_FORECASTS_SQL = "DELETE FROM SpendingForecasts WHERE UserId BETWEEN ? AND ?"
+INSERT_FORECAST_SQL = """
+INSERT INTO SpendingForecasts (UserId, Year, Month, CategoryId, Forecast, Lower, Upper, SpentToDate, Budget, ExceedProbability, Method, ComputedAt)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+normal_cdf = np.vectorize(lambda value: 0.5 * (1 + math.erf(value / math.sqrt(2))), otypes=[float])
+
+def month_index(value: date) -> int:
+    return value.year * 12 + value.month - 1
+
+def design(months: np.ndarray, first: int, history: int) -> tuple[np.ndarray, str]:
+    """Design matrix of the model for absolute month indexes, and its name."""
+    columns, method = [np.ones(len(months))], "mean"
+    if history >= MIN_TREND_MONTHS:
+        columns.append((months - first).astype(float))
+        method = "trend"
+    if history >= MIN_SEASONAL_MONTHS:
+        angle = 2 * np.pi * (months % 12) / 12
+        columns += [np.sin(angle), np.cos(angle)]
+        method = "seasonal"
+    return np.column_stack(columns), method
+
+def fit(history: np.ndarray, first: int, targets: np.ndarray) -> tuple[np.ndarray, np.ndarray, str]:
+    """
+    Fit every column of history (months x series, starting at month first) at once.
+    Returns the forecasts (targets x series), the residual standard deviation of each series and the model.
+    """
+    months = first + np.arange(history.shape[0])
+    x, method = design(months, first, history.shape[0])
+    coefficients, *_ = np.linalg.lstsq(x, history, rcond=None)
+    residuals = history - x @ coefficients
+    sigma = np.sqrt((residuals ** 2).sum(axis=0) / max(history.shape[0] - x.shape[1], 1))
+    # A short or flat history doesn't make the forecast exact
+    sigma = np.maximum(sigma, 0.1 * np.abs(history.mean(axis=0)))
+    forecasts = np.maximum(design(targets, first, history.shape[0])[0] @ coefficients, 0)
+    return forecasts, sigma, method
+
+def exceed_probability(expected: np.ndarray, sigma: np.ndarray, budget: np.ndarray, spent: np.ndarray) -> np.ndarray:
+    """Probability that the month ends above budget, with a normal forecast error; NaN without budget."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        probability = 1 - normal_cdf((budget - expected) / sigma)
+    probability = np.where(sigma > 0, probability, (expected > budget).astype(float))
+    probability = np.where(spent > budget, 1.0, probability)
+    return np.where(np.isnan(budget), np.nan, probability)
+
+@dataclass
+class ForecastTask:
+    storage: Storage
+    first_user: int
+    last_user: int
+    today: date
+    months_ahead: int
+
+@dataclass
+class ForecastReport:
+    users: int = 0
+    forecasts: int = 0
+    seconds: float = 0.0
+
+def forecast_chunk(task: ForecastTask) -> list[tuple]:
+    """Forecast rows for the users of one chunk (runs in a worker process)."""
+    current = month_index(task.today)
+    first_month = current - HISTORY_MONTHS
+    targets = current + np.arange(task.months_ahead + 1)
+    conn = task.storage.connect()
+    try:
+        cursor = conn.cursor()
+        history = cursor.execute(HISTORY_SQL, (task.first_user, task.last_user, first_month // 12)).fetchall()
+        budgets = cursor.execute(BUDGETS_SQL, (task.first_user, task.last_user, task.today.year, int(targets[-1]) // 12)).fetchall()
+    finally:
+        conn.close()
+
+    # (user, category) -> expenses of the window months, and of the current month so far
+    series, spent, first_active = {}, {}, {}
+    for user_id, year, month, category_id, total in history:
+        index = int(year) * 12 + int(month) - 1
+        if first_month <= index < current:
+            series.setdefault((user_id, category_id), np.zeros(HISTORY_MONTHS))[index - first_month] = float(total)
+            first_active[user_id] = min(first_active.get(user_id, current), index)
+        elif index == current:
+            spent[(user_id, category_id)] = float(total)
+    budget = {(user_id, category_id, int(year) * 12 + int(month) - 1): float(amount)
+              for user_id, category_id, year, month, amount in budgets}
+    for user_id, category_id, index in budget:
+        series.setdefault((user_id, category_id), np.zeros(HISTORY_MONTHS))
+    for user_id, category_id in spent:
+        series.setdefault((user_id, category_id), np.zeros(HISTORY_MONTHS))
+
+    # Series with the same history length are fitted together
+    groups: dict[int, list[tuple[int, int]]] = {}
+    for user_id, category_id in series:
+        groups.setdefault(current - first_active.get(user_id, current), []).append((user_id, category_id))
+
+    days_in_month = ((task.today.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)).day
+    remaining = 1 - task.today.day / days_in_month
+    computed_at = datetime.now().replace(microsecond=0).isoformat()
+    rows = []
+    for length, keys in groups.items():
+        to_date = np.array([spent.get(key, 0.0) for key in keys])
+        if length:
+            matrix = np.column_stack([series[key][HISTORY_MONTHS - length:] for key in keys])
+            forecasts, sigma, method = fit(matrix, current - length, targets)
+        else:
+            # Nothing but the current month: extrapolate its spending rate
+            forecasts = np.tile(to_date / (1 - remaining), (len(targets), 1))
+            sigma, method = 0.5 * forecasts[0], "run-rate"
+        for position, target in enumerate(targets):
+            target = int(target)
+            if position == 0:
+                expected = to_date + forecasts[0] * remaining
+                deviation = sigma * math.sqrt(remaining)
+                so_far = to_date
+            else:
+                expected, deviation, so_far = forecasts[position], sigma, np.zeros(len(keys))
+            budgets_of_month = np.array([budget.get((*key, target), np.nan) for key in keys])
+            probability = exceed_probability(expected, deviation, budgets_of_month, so_far)
+            lower = np.maximum(expected - Z_80 * deviation, so_far)
+            upper = expected + Z_80 * deviation
+            for i, (user_id, category_id) in enumerate(keys):
+                rows.append((user_id, target // 12, target % 12 + 1, category_id, round(float(expected[i]), 2),
+                             round(float(lower[i]), 2), round(float(upper[i]), 2), round(float(so_far[i]), 2),
+                             None if np.isnan(budgets_of_month[i]) else float(budgets_of_month[i]),
+                             None if np.isnan(probability[i]) else round(float(probability[i]), 4), method, computed_at))
+    return rows
+
+def chunks(user_ids: list[int], size: int) -> list[tuple[int, int]]:
+    return [(user_ids[i], user_ids[min(i + size, len(user_ids)) - 1]) for i in range(0, len(user_ids), size)]
+
+def run_forecasts(storage: Storage, workers: int | None = None, chunk_size: int = 500, months_ahead: int = 3,
+                  today: date | None = None) -> ForecastReport:
+    """Forecast every user, chunk by chunk in a process pool; each chunk replaces its users' forecasts in one transaction."""
+    report = ForecastReport()
+    start = time.perf_counter()
+    today = today or date.today()
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        if hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = True
+        user_ids = [row[0] for row in cursor.execute(USERS_SQL).fetchall()]
+        tasks = [ForecastTask(storage, first, last, today, months_ahead) for first, last in chunks(user_ids, chunk_size)]
+        executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+        try:
+            results = executor.map(forecast_chunk, tasks) if executor else map(forecast_chunk, tasks)
+            for task, rows in zip(tasks, results):
+                cursor.execute(DELETE_FORECASTS_SQL, (task.first_user, task.last_user))
+                if rows:
+                    cursor.executemany(INSERT_FORECAST_SQL, rows)
+                conn.commit()
+                report.forecasts += len(rows)
+        finally:
+            if executor:
+                executor.shutdown()
+        report.users = len(user_ids)
+    finally:
+        conn.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--run", action="store_true", help="Recompute the spending forecasts of every user")
+    parser.add_argument("--path", default=None, help="SQLite database file; DATABASE_BACKEND is used when omitted")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, one per CPU by default")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users fitted and written together")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Months forecast after the current one")
+    args = parser.parse_args()
+
+    if not args.run:
+        parser.print_help()
+        return
+    if args.path:
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = create_storage()
+    report = run_forecasts(storage, workers=args.workers, chunk_size=args.chunk_size, months_ahead=args.months_ahead)
+    print(f"Wrote {report.forecasts} forecasts for {report.users} users in {report.seconds:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Versioned schema migrations.
+
+Migrations are SQL files in finance_data/database/migrations named NNNN_description.<backend>.sql, one per
+backend (azure-sql batches are separated by GO). Each one runs in its own transaction and is
+recorded in the SchemaMigrations table, so every database is upgraded exactly once, in order.
+Storage.initialize() applies the pending ones after creating the base schema.
+
+Usage (from the finance_data folder):
+    python -m finance_data.migrations [--path finance.db] [--status] [--target 1]
+"""
+import re
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PATH = Path(__file__).resolve().parent / "database" / "migrations"
+
+# Storage dialect -> file suffix
+BACKENDS = {"tsql": "azure-sql", "sqlite": "sqlite"}
+
+CREATE_MIGRATIONS_TABLE_SQL = {
+    "tsql": """
+        IF OBJECT_ID('SchemaMigrations', 'U') IS NULL
+        CREATE TABLE SchemaMigrations (
+            Version INT PRIMARY KEY,
+            Name NVARCHAR(200) NOT NULL,
+            AppliedAt DATETIME2 NOT NULL
+        )""",
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS SchemaMigrations (
+            Version INTEGER PRIMARY KEY,
+            Name TEXT NOT NULL,
+            AppliedAt TEXT NOT NULL
+        )""",
+}
+
+FILE_NAME = re.compile(r"^(\d+)_(\w+)\.([\w-]+)\.sql$")
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    def statements(self, dialect: str) -> list[str]:
+        script = self.path.read_text(encoding="utf-8")
+        if dialect == "tsql":
+            batches = re.split(r"^\s*GO\s*$", script, flags=re.MULTILINE | re.IGNORECASE)
+            return [batch for batch in batches if strip_comments(batch)]
+        # Split on complete statements, so trigger bodies stay whole
+        statements, buffer = [], ""
+        for line in script.splitlines(keepends=True):
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                if strip_comments(buffer):
+                    statements.append(buffer)
+                buffer = ""
+        return statements
+
+def strip_comments(sql: str) -> str:
+    return "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--")).strip()
+
+def discover_migrations(dialect: str, path: Path = MIGRATIONS_PATH) -> list[Migration]:
+    migrations = []
+    for file in path.glob(f"*.{BACKENDS[dialect]}.sql"):
+        match = FILE_NAME.match(file.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), file))
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {path}")
+    return sorted(migrations, key=lambda migration: migration.version)
+
+def applied_versions(conn, dialect: str) -> set[int]:
+    cursor = conn.cursor()
+    cursor.execute(CREATE_MIGRATIONS_TABLE_SQL[dialect])
+    conn.commit()
+    cursor.execute("SELECT Version FROM SchemaMigrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(conn, dialect: str, target: int | None = None, path: Path = MIGRATIONS_PATH) -> list[Migration]:
+    """Apply the pending migrations up to target (all by default); returns the ones applied."""
+    applied = applied_versions(conn, dialect)
+    pending = [migration for migration in discover_migrations(dialect, path)
+               if migration.version not in applied and (target is None or migration.version <= target)]
+    cursor = conn.cursor()
+    for migration in pending:
+        try:
+            if dialect == "sqlite":
+                # DDL would otherwise run in autocommit mode
+                cursor.execute("BEGIN")
+            for statement in migration.statements(dialect):
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO SchemaMigrations (Version, Name, AppliedAt) VALUES (?, ?, ?)",
+                           (migration.version, migration.name, datetime.now().replace(microsecond=0).isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {migration.version:04d}_{migration.name} failed, rolled back")
+            raise
+        logger.info(f"Applied migration {migration.version:04d}_{migration.name}")
+    return pending
+
+def main() -> None:
+    from .storage import SqliteStorage, create_storage
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=None, help="SQLite database file; DATABASE_BACKEND is used when omitted")
+    parser.add_argument("--status", action="store_true", help="List the migrations and whether they are applied")
+    parser.add_argument("--target", type=int, default=None, help="Only apply migrations up to this version")
+    args = parser.parse_args()
+
+    storage = SqliteStorage(args.path) if args.path else create_storage()
+    conn = storage.connect()
+    try:
+        if args.status:
+            applied = applied_versions(conn, storage.dialect)
+            for migration in discover_migrations(storage.dialect):
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:04d}_{migration.name}: {state}")
+            return
+        migrations = apply_migrations(conn, storage.dialect, target=args.target)
+        print(f"Applied {len(migrations)} migrations" + "".join(f"\n  {m.version:04d}_{m.name}" for m in migrations))
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Rebuild the MonthlySummary aggregate table from Transactions.
+
+The table is kept in sync by triggers on Transactions, created and backfilled by the migration
+finance_data/database/migrations/0002_monthly_summary; rebuild it after loading data with the triggers
+disabled, or to repair it.
+
+Usage (from the finance_data folder):
+    python -m finance_data.monthly_summary --rebuild [--path finance.db] [--user-id 1]
+"""
+import time
+import argparse
+from dataclasses import dataclass
+
+from .storage import Storage, SqliteStorage, create_storage
+
+# T-SQL, translated for SQLite
+DELETE_SUMMARY_SQL = "DELETE FROM MonthlySummary WHERE (? IS NULL OR UserId = ?)"
+
+REBUILD_SUMMARY_SQL = """
+INSERT INTO MonthlySummary (UserId, Year, Month, CategoryId, Type, Total, TransactionCount, MinAmount, MaxAmount)
+SELECT UserId, YEAR(Date), MONTH(Date), CategoryId, Type, SUM(Amount), COUNT(*), MIN(Amount), MAX(Amount)
+FROM Transactions
+WHERE (? IS NULL OR UserId = ?)
+GROUP BY UserId, YEAR(Date), MONTH(Date), CategoryId, Type
+"""
+
+@dataclass
+class RebuildReport:
+    rows: int = 0
+    seconds: float = 0.0
+
+def rebuild_monthly_summary(storage: Storage, user_id: int | None = None) -> RebuildReport:
+    """Recompute the summary of one user, or of every user, in a single transaction."""
+    report = RebuildReport()
+    start = time.perf_counter()
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(storage.translate(DELETE_SUMMARY_SQL), (user_id, user_id))
+        sql = storage.translate(REBUILD_SUMMARY_SQL)
+        if storage.dialect == "sqlite":
+            # SUM of NUMERIC values is a float in SQLite
+            sql = sql.replace("SUM(Amount)", "ROUND(SUM(Amount), 2)")
+        cursor.execute(sql, (user_id, user_id))
+        report.rows = cursor.rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="Recompute MonthlySummary from Transactions")
+    parser.add_argument("--path", default=None, help="SQLite database file; DATABASE_BACKEND is used when omitted")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild the summary of this user")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+    if args.path:
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = create_storage()
+    report = rebuild_monthly_summary(storage, user_id=args.user_id)
+    print(f"Rebuilt {report.rows} MonthlySummary rows in {report.seconds:.1f} s")
+
+if __name__ == "__main__":
+    main()
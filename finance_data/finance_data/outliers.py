@@ -0,0 +1,203 @@
+"""
+Streaming outlier detection for recorded transactions.
+
+Running statistics of the amounts of every (user, category, type) live in CategoryStatistics and are
+updated in O(1) per recorded transaction: count, mean and M2 with Welford's algorithm, and a median
+and median absolute deviation (MAD) estimated by stochastic approximation, where each new amount moves
+them one step towards it, with a step scaled by the spread and shrinking as the count grows.
+A new transaction is scored against the statistics before it and flagged in TransactionOutliers when
+both its z-score and its robust score (distance from the median in MADs) are above the thresholds,
+so outlier reports are a lookup on (UserId, Date) instead of a scan of the history.
+
+Recorded and imported transactions update the statistics, but edits and deletes don't: the statistics
+drift from the transactions until the backfill recomputes them, with the flags, from the transactions in
+date order. Run it once after creating the tables, and periodically (e.g. nightly) where transactions
+are edited or deleted.
+
+Usage (from the finance_data folder):
+    python -m finance_data.outliers --backfill [--path finance.db] [--chunk-size 500]
+"""
+import math
+import time
+import argparse
+from dataclasses import dataclass
+
+from .storage import Storage, SqliteStorage, create_storage
+
+# The row is locked until the writer commits, so concurrent writes of the same category don't lose updates
+SELECT_STATISTICS_SQL = {
+    "tsql": "SELECT Count, Mean, M2, Median, Mad FROM CategoryStatistics WITH (UPDLOCK, HOLDLOCK) WHERE UserId = ? AND CategoryId = ? AND Type = ?",
+    "sqlite": "SELECT Count, Mean, M2, Median, Mad FROM CategoryStatistics WHERE UserId = ? AND CategoryId = ? AND Type = ?",
+}
+UPDATE_STATISTICS_SQL = "UPDATE CategoryStatistics SET Count = ?, Mean = ?, M2 = ?, Median = ?, Mad = ? WHERE UserId = ? AND CategoryId = ? AND Type = ?"
+INSERT_STATISTICS_SQL = "INSERT INTO CategoryStatistics (Count, Mean, M2, Median, Mad, UserId, CategoryId, Type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_OUTLIER_SQL = """
+INSERT INTO TransactionOutliers (TransactionId, UserId, CategoryId, Type, Date, Amount, UsualAmount, ZScore, RobustScore)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+NEW_TRANSACTIONS_SQL = """
+SELECT Id, Type, AccountId, CategoryId, UserId, Date, Amount, Description, AttachmentUrl FROM Transactions
+WHERE Id > ? AND UserId = ?
+ORDER BY Id
+"""
+
+BACKFILL_USERS_SQL = "SELECT Id FROM Users ORDER BY Id"
+BACKFILL_TRANSACTIONS_SQL = """
+SELECT Id, UserId, CategoryId, Type, Date, Amount FROM Transactions
+WHERE UserId BETWEEN ? AND ?
+ORDER BY UserId, CategoryId, Date, Id
+"""
+DELETE_STATISTICS_SQL = "DELETE FROM CategoryStatistics WHERE UserId BETWEEN ? AND ?"
+DELETE_OUTLIERS_SQL = "DELETE FROM TransactionOutliers WHERE UserId BETWEEN ? AND ?"
+
+# MAD of a normal distribution, in standard deviations
+MAD_SCALE = 1.4826
+
+@dataclass
+class RunningStatistics:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    median: float = 0.0
+    mad: float = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def scores(self, amount: float) -> tuple[float, float]:
+        """z-score and robust score of an amount against the statistics so far."""
+        std = self.std
+        z = (amount - self.mean) / std if std else 0.0
+        robust = (amount - self.median) / (MAD_SCALE * self.mad) if self.mad else 0.0
+        return z, robust
+
+    def update(self, amount: float) -> None:
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        if self.count == 1:
+            self.median = amount
+            return
+        step = (self.mad * MAD_SCALE or self.std) / math.sqrt(self.count)
+        self.median += math.copysign(min(step, abs(amount - self.median)), amount - self.median)
+        deviation = abs(amount - self.median)
+        self.mad += math.copysign(min(step / 2, abs(deviation - self.mad)), deviation - self.mad)
+
+    def row(self) -> tuple:
+        return (self.count, self.mean, self.m2, self.median, self.mad)
+
+@dataclass
+class BackfillReport:
+    transactions: int = 0
+    outliers: int = 0
+    seconds: float = 0.0
+
+class OutlierDetector:
+    """
+    :param min_count: Transactions of the category needed before flagging, so the statistics are meaningful.
+    :param z_threshold: Minimum z-score of an outlier.
+    :param robust_threshold: Minimum distance from the median in MADs; keeps skewed categories from being flagged too often.
+    """
+
+    def __init__(self, dialect: str = "tsql", min_count: int = 8, z_threshold: float = 4.0, robust_threshold: float = 5.0):
+        self.dialect = dialect
+        self.min_count = min_count
+        self.z_threshold = z_threshold
+        self.robust_threshold = robust_threshold
+
+    def check(self, statistics: RunningStatistics, amount: float) -> tuple[bool, float, float]:
+        z, robust = statistics.scores(amount)
+        flagged = statistics.count >= self.min_count and z >= self.z_threshold and robust >= self.robust_threshold
+        return flagged, z, robust
+
+    def observe(self, conn, transactions: list[tuple[int, tuple]]) -> list[dict]:
+        """
+        Score and flag newly inserted transactions, (Id, row of INSERT_TRANSACTION_SQL) pairs, then add them
+        to the statistics; runs in the writer's database transaction. Returns the outliers.
+        """
+        loaded: dict[tuple, tuple[RunningStatistics, bool]] = {}
+        outliers, rows = [], []
+        for transaction_id, (type, _, category_id, user_id, date, amount, description, _) in transactions:
+            key = (user_id, category_id, type)
+            if key not in loaded:
+                row = conn.execute(SELECT_STATISTICS_SQL[self.dialect], key).fetchone()
+                loaded[key] = (RunningStatistics(*row), True) if row else (RunningStatistics(), False)
+            statistics = loaded[key][0]
+            amount = float(amount)
+            flagged, z, robust = self.check(statistics, amount)
+            if flagged:
+                rows.append((transaction_id, user_id, category_id, type, date, amount, round(statistics.median, 2), z, robust))
+                outliers.append({"Id": transaction_id, "Description": description, "Amount": amount,
+                                 "UsualAmount": round(statistics.median, 2), "RobustScore": round(robust, 1)})
+            statistics.update(amount)
+        for key, (statistics, exists) in loaded.items():
+            conn.execute(UPDATE_STATISTICS_SQL if exists else INSERT_STATISTICS_SQL, (*statistics.row(), *key))
+        if rows:
+            conn.executemany(INSERT_OUTLIER_SQL, rows)
+        return outliers
+
+    def observe_new(self, conn, user_id: int, after_id: int) -> tuple[int, list[dict]]:
+        """Observe the transactions of the user inserted after after_id; returns the last Id and the outliers."""
+        rows = conn.execute(NEW_TRANSACTIONS_SQL, (after_id, user_id)).fetchall()
+        if not rows:
+            return after_id, []
+        return rows[-1][0], self.observe(conn, [(row[0], tuple(row[1:])) for row in rows])
+
+    def backfill(self, storage: Storage, chunk_size: int = 500) -> BackfillReport:
+        """Recompute the statistics and flags of every user from their transactions, one committed chunk of users at a time."""
+        report = BackfillReport()
+        start = time.perf_counter()
+        conn = storage.connect()
+        try:
+            cursor = conn.cursor()
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            user_ids = [row[0] for row in cursor.execute(BACKFILL_USERS_SQL).fetchall()]
+            for index in range(0, len(user_ids), chunk_size):
+                first, last = user_ids[index], user_ids[min(index + chunk_size, len(user_ids)) - 1]
+                statistics: dict[tuple, RunningStatistics] = {}
+                outliers = []
+                for transaction_id, user_id, category_id, type, date, amount in cursor.execute(BACKFILL_TRANSACTIONS_SQL, (first, last)).fetchall():
+                    current = statistics.setdefault((user_id, category_id, type), RunningStatistics())
+                    amount = float(amount)
+                    flagged, z, robust = self.check(current, amount)
+                    if flagged:
+                        outliers.append((transaction_id, user_id, category_id, type, date, amount, round(current.median, 2), z, robust))
+                    current.update(amount)
+                    report.transactions += 1
+                cursor.execute(DELETE_OUTLIERS_SQL, (first, last))
+                cursor.execute(DELETE_STATISTICS_SQL, (first, last))
+                if statistics:
+                    cursor.executemany(INSERT_STATISTICS_SQL, [(*current.row(), *key) for key, current in statistics.items()])
+                if outliers:
+                    cursor.executemany(INSERT_OUTLIER_SQL, outliers)
+                conn.commit()
+                report.outliers += len(outliers)
+        finally:
+            conn.close()
+        report.seconds = time.perf_counter() - start
+        return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backfill", action="store_true", help="Recompute the category statistics and outlier flags from the transactions")
+    parser.add_argument("--path", default=None, help="SQLite database file; DATABASE_BACKEND is used when omitted")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users recomputed per transaction")
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        return
+    if args.path:
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = create_storage()
+    report = OutlierDetector(storage.dialect).backfill(storage, chunk_size=args.chunk_size)
+    print(f"Flagged {report.outliers} outliers among {report.transactions} transactions in {report.seconds:.1f} s")
+
+if __name__ == "__main__":
+    main()
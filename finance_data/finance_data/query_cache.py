@@ -0,0 +1,224 @@
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Bumped by the triggers of finance_data/database/migrations/0004_data_versions on every write to the user's data
+DATA_VERSION_SQL = "SELECT Version FROM DataVersions WHERE UserId = ?"
+
+TOKEN = re.compile(r"""
+    (?P<string>[Nn]?'(?:[^']|'')*')
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<bracket>\[[^\]]*\])
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<word>[A-Za-z_@#][\w@#$]*)
+  | (?P<operator><>|!=|<=|>=|\S)
+  | (?P<space>\s+)
+""", re.VERBOSE | re.DOTALL)
+
+# Words that end a table reference, so they are never taken for its alias
+CLAUSE_WORDS = {
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "ON", "GROUP", "ORDER",
+    "HAVING", "UNION", "EXCEPT", "INTERSECT", "WITH", "OFFSET", "FETCH", "FOR", "OPTION", "AND", "OR",
+}
+WHERE_END_WORDS = {"GROUP", "ORDER", "HAVING", "UNION", "EXCEPT", "INTERSECT", "OFFSET", "FETCH", "OPTION"}
+
+def tokenize(sql: str) -> list[str]:
+    tokens = []
+    for match in TOKEN.finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("space", "comment"):
+            continue
+        if kind == "string":
+            # N'...' and '...' compare the same for the queries the agents write
+            tokens.append(text[1:] if text[0] in "Nn" else text)
+        elif kind == "bracket":
+            tokens.append(text[1:-1].upper())
+        else:
+            # Identifiers and keywords are case-insensitive in Azure SQL and SQLite
+            tokens.append(text.upper())
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return tokens
+
+def normalize_aliases(tokens: list[str]) -> list[str]:
+    """Name every table reference T1, T2... by order of appearance, with or without AS."""
+    aliases, result = {}, []
+    declared = []
+    i = 0
+    while i < len(tokens):
+        result.append(tokens[i])
+        if tokens[i] in ("FROM", "JOIN") and i + 1 < len(tokens) and re.match(r"^[A-Z_#]", tokens[i + 1]):
+            # Table name, possibly schema-qualified
+            j = i + 1
+            table = tokens[j]
+            while j + 2 < len(tokens) and tokens[j + 1] == ".":
+                table += "." + tokens[j + 2]
+                j += 2
+            canonical = f"T{len(declared) + 1}"
+            result.extend([table, canonical])
+            j += 1
+            if j < len(tokens) and tokens[j] == "AS":
+                j += 1
+            if j < len(tokens) and re.match(r"^[A-Z_#]", tokens[j]) and tokens[j] not in CLAUSE_WORDS:
+                alias = tokens[j]
+                j += 1
+            else:
+                alias = table.split(".")[-1]
+            declared.append(alias)
+            aliases[alias] = canonical
+            i = j
+            continue
+        i += 1
+    if len(declared) != len(set(declared)):
+        # The same alias in several scopes; renaming could confuse them
+        return tokens
+    return [aliases.get(token, token) if index + 1 < len(result) and result[index + 1] == "." and (index == 0 or result[index - 1] != ".")
+            else token for index, token in enumerate(result)]
+
+def sort_conjunctions(tokens: list[str]) -> list[str]:
+    """Sort the AND terms of top-level WHERE clauses, so the order of the filters doesn't matter."""
+    result, i = [], 0
+    while i < len(tokens):
+        result.append(tokens[i])
+        if tokens[i] != "WHERE":
+            i += 1
+            continue
+        start, depth, j = i + 1, 0, i + 1
+        while j < len(tokens):
+            if tokens[j] == "(":
+                depth += 1
+            elif tokens[j] == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0 and tokens[j] in WHERE_END_WORDS:
+                break
+            j += 1
+        clause = tokens[start:j]
+        top_level = [token for token, level in zip(clause, nesting(clause)) if level == 0]
+        if {"OR", "BETWEEN", "NOT", "CASE"} & set(top_level):
+            result.extend(clause)
+        else:
+            terms, term = [], []
+            for token, level in zip(clause, nesting(clause)):
+                if token == "AND" and level == 0:
+                    terms.append(term)
+                    term = []
+                else:
+                    term.append(token)
+            terms.append(term)
+            for index, term in enumerate(sorted(terms, key=" ".join)):
+                if index:
+                    result.append("AND")
+                result.extend(term)
+        i = j
+    return result
+
+def nesting(tokens: list[str]) -> list[int]:
+    levels, depth = [], 0
+    for token in tokens:
+        if token == ")":
+            depth -= 1
+        levels.append(depth)
+        if token == "(":
+            depth += 1
+    return levels
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Canonical text of a query: comments and whitespace removed, keywords and identifiers
+    upper-cased, table aliases renamed by position and WHERE filters sorted. String literals are kept.
+    """
+    return " ".join(sort_conjunctions(normalize_aliases(tokenize(sql))))
+
+@dataclass
+class QueryCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    evictions: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {**self.__dict__, "hit_ratio": round(self.hit_ratio, 3)}
+
+class QueryResultCache:
+    """
+    LRU cache of SQL query results (serialized payloads), keyed by user and canonical query.
+    Entries are only served at the data version of the user they were computed at, and the
+    least recently used ones are evicted when the payloads exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.metrics = QueryCacheMetrics()
+        self._entries: OrderedDict[tuple, tuple[int, str]] = OrderedDict()
+        self._user_versions: dict[int, int] = {}
+        self._user_keys: dict[int, set] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id: int, sql: str) -> tuple[int, str]:
+        return user_id, hashlib.sha256(canonicalize_sql(sql).encode("utf-8")).hexdigest()
+
+    def get_or_load(self, user_id: int, sql: str, version: int, load: Callable[[], str]) -> str:
+        key = self.key(user_id, sql)
+        with self._lock:
+            if self._user_versions.get(user_id, version) != version:
+                # The user's data changed, none of their entries can be served anymore
+                self.metrics.stale += len(self._user_keys.get(user_id, ()))
+                self._drop_user(user_id)
+            self._user_versions[user_id] = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.metrics.hits += 1
+                return entry[1]
+            self.metrics.misses += 1
+
+        payload = load()
+        size = len(payload.encode("utf-8"))
+        if size > self.max_entry_bytes:
+            return payload
+        with self._lock:
+            # Don't store a result computed while the data changed
+            if self._user_versions.get(user_id) != version:
+                return payload
+            self._remove(key)
+            self._entries[key] = (version, payload)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self.metrics.bytes += size
+            while self.metrics.bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.metrics.evictions += 1
+        return payload
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.metrics.bytes -= len(entry[1].encode("utf-8"))
+            self._user_keys.get(key[0], set()).discard(key)
+
+    def _drop_user(self, user_id: int) -> None:
+        for key in list(self._user_keys.pop(user_id, ())):
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_versions.clear()
+            self._user_keys.clear()
+            self.metrics.bytes = 0
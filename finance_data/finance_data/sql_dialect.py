@@ -0,0 +1,255 @@
+"""
+Translates the T-SQL generated for Azure SQL (by the analyzer and the other agents) to SQLite.
+
+Covers the constructs those queries use: TOP / OFFSET-FETCH, date functions (GETDATE, YEAR,
+MONTH, DATEPART, DATENAME, DATEADD, DATEDIFF, EOMONTH, DATEFROMPARTS, FORMAT), CAST/CONVERT
+types, ISNULL, LEN, CHARINDEX, STRING_AGG, N'' literals, [bracketed] names and table hints.
+String literals are never rewritten.
+"""
+import re
+from typing import Callable
+
+STRING_LITERAL = re.compile(r"(?<![\w'])N?'(?:[^']|'')*'")
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+# DATEPART abbreviations -> canonical part
+DATE_PARTS = {
+    "year": "year", "yy": "year", "yyyy": "year",
+    "quarter": "quarter", "qq": "quarter", "q": "quarter",
+    "month": "month", "mm": "month", "m": "month",
+    "dayofyear": "dayofyear", "dy": "dayofyear", "y": "dayofyear",
+    "day": "day", "dd": "day", "d": "day",
+    "week": "week", "wk": "week", "ww": "week",
+    "weekday": "weekday", "dw": "weekday", "w": "weekday",
+    "hour": "hour", "hh": "hour",
+    "minute": "minute", "mi": "minute", "n": "minute",
+    "second": "second", "ss": "second", "s": "second",
+}
+
+STRFTIME_PARTS = {"year": "%Y", "month": "%m", "day": "%d", "dayofyear": "%j", "week": "%W",
+                  "hour": "%H", "minute": "%M", "second": "%S"}
+
+# .NET format patterns used with FORMAT(date, '...') -> strftime
+FORMAT_PATTERNS = [("yyyy", "%Y"), ("yy", "%y"), ("MM", "%m"), ("dd", "%d"), ("HH", "%H"), ("mm", "%M"), ("ss", "%S")]
+
+SQL_TYPES = [
+    (re.compile(r"^(date)$", re.I), None),
+    (re.compile(r"^(datetime2?|smalldatetime|datetimeoffset)(\s*\(\s*\d+\s*\))?$", re.I), None),
+    (re.compile(r"^(decimal|numeric|money|smallmoney|float|real)(\s*\(.*\))?$", re.I), "REAL"),
+    (re.compile(r"^(int|bigint|smallint|tinyint|bit)$", re.I), "INTEGER"),
+    (re.compile(r"^(n?varchar|n?char|n?text)(\s*\(.*\))?$", re.I), "TEXT"),
+]
+
+def string_spans(sql: str) -> list[tuple[int, int]]:
+    return [match.span() for match in STRING_LITERAL.finditer(sql)]
+
+def in_spans(position: int, spans: list[tuple[int, int]]) -> tuple[int, int] | None:
+    return next((span for span in spans if span[0] <= position < span[1]), None)
+
+def map_code(sql: str, rewrite: Callable[[str], str]) -> str:
+    """Apply rewrite to the parts of sql outside string literals."""
+    parts, position = [], 0
+    for start, end in string_spans(sql):
+        parts.append(rewrite(sql[position:start]))
+        literal = sql[start:end]
+        parts.append(literal[1:] if literal[0] in "Nn" else literal)
+        position = end
+    parts.append(rewrite(sql[position:]))
+    return "".join(parts)
+
+def read_arguments(sql: str, start: int) -> tuple[list[str], int]:
+    """Split the arguments of the call whose "(" ends at start; returns them and the index after ")"."""
+    depth, arguments, current, i = 0, [], start, start
+    while i < len(sql):
+        char = sql[i]
+        if char == "'":
+            i = sql.index("'", i + 1) + 1
+            # '' is an escaped quote inside the literal
+            while i < len(sql) and sql[i] == "'":
+                i = sql.index("'", i + 1) + 1
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                arguments.append(sql[current:i].strip())
+                return [argument for argument in arguments if argument or len(arguments) > 1], i + 1
+            depth -= 1
+        elif char == "," and depth == 0:
+            arguments.append(sql[current:i].strip())
+            current = i + 1
+        i += 1
+    raise ValueError("Unbalanced parentheses in SQL query")
+
+def date_part(argument: str) -> str:
+    part = DATE_PARTS.get(argument.strip().strip("'\"").lower())
+    if part is None:
+        raise ValueError(f"Unsupported date part: {argument}")
+    return part
+
+def strftime_integer(part: str, value: str) -> str:
+    if part == "quarter":
+        return f"((CAST(strftime('%m', {value}) AS INTEGER) + 2) / 3)"
+    if part == "weekday":
+        # T-SQL numbers the days from Sunday = 1 (DATEFIRST 7)
+        return f"(CAST(strftime('%w', {value}) AS INTEGER) + 1)"
+    return f"CAST(strftime('{STRFTIME_PARTS[part]}', {value}) AS INTEGER)"
+
+def case_names(pattern: str, value: str, names: list[str], offset: int) -> str:
+    whens = " ".join(f"WHEN {i + offset} THEN '{name}'" for i, name in enumerate(names))
+    return f"(CASE CAST(strftime('{pattern}', {value}) AS INTEGER) {whens} END)"
+
+def datename(arguments: list[str]) -> str:
+    part, value = date_part(arguments[0]), arguments[1]
+    if part == "month":
+        return case_names("%m", value, MONTH_NAMES, 1)
+    if part == "weekday":
+        return case_names("%w", value, WEEKDAY_NAMES, 0)
+    return f"CAST({strftime_integer(part, value)} AS TEXT)"
+
+def dateadd(arguments: list[str]) -> str:
+    part, number, value = date_part(arguments[0]), arguments[1], arguments[2]
+    units = {"year": ("years", 1), "quarter": ("months", 3), "month": ("months", 1), "week": ("days", 7),
+             "day": ("days", 1), "dayofyear": ("days", 1), "weekday": ("days", 1),
+             "hour": ("hours", 1), "minute": ("minutes", 1), "second": ("seconds", 1)}
+    unit, factor = units[part]
+    amount = f"({number})" if factor == 1 else f"({number}) * {factor}"
+    return f"datetime({value}, printf('%+d {unit}', {amount}))"
+
+def datediff(arguments: list[str]) -> str:
+    part, start, end = date_part(arguments[0]), arguments[1], arguments[2]
+    year = lambda value: f"CAST(strftime('%Y', {value}) AS INTEGER)"
+    month = lambda value: f"CAST(strftime('%m', {value}) AS INTEGER)"
+    # Like T-SQL, count the boundaries crossed rather than the elapsed time
+    if part == "year":
+        return f"({year(end)} - {year(start)})"
+    if part == "quarter":
+        return f"(({year(end)} - {year(start)}) * 4 + ({month(end)} + 2) / 3 - ({month(start)} + 2) / 3)"
+    if part == "month":
+        return f"(({year(end)} - {year(start)}) * 12 + {month(end)} - {month(start)})"
+    if part == "week":
+        return f"(CAST(julianday(date({end}, 'weekday 0')) - julianday(date({start}, 'weekday 0')) AS INTEGER) / 7)"
+    if part in ("day", "dayofyear", "weekday"):
+        return f"CAST(julianday(date({end})) - julianday(date({start})) AS INTEGER)"
+    multiplier = {"hour": 24, "minute": 1440, "second": 86400}[part]
+    return f"CAST(ROUND((julianday({end}) - julianday({start})) * {multiplier}) AS INTEGER)"
+
+def eomonth(arguments: list[str]) -> str:
+    months = f"({arguments[1]}) + 1" if len(arguments) > 1 else "1"
+    return f"date({arguments[0]}, 'start of month', printf('%+d months', {months}), '-1 day')"
+
+def format_function(arguments: list[str]) -> str:
+    value, pattern = arguments[0], arguments[1].strip().lstrip("Nn").strip("'")
+    numeric = re.fullmatch(r"[NnFfCc](\d*)", pattern)
+    if numeric:
+        return f"printf('%.{numeric.group(1) or 2}f', {value})"
+    for dotnet, strftime in FORMAT_PATTERNS:
+        pattern = pattern.replace(dotnet, strftime)
+    return f"strftime('{pattern}', {value})"
+
+def cast(argument: str) -> str:
+    match = re.match(r"^(.*)\s+AS\s+([\w\s(),]+)$", argument, re.I | re.S)
+    if match is None:
+        raise ValueError(f"Unsupported CAST: {argument}")
+    return cast_to(match.group(1).strip(), match.group(2).strip())
+
+def cast_to(value: str, sql_type: str) -> str:
+    for pattern, target in SQL_TYPES:
+        if pattern.match(sql_type):
+            if target is None:
+                return f"date({value})" if sql_type.lower() == "date" else f"datetime({value})"
+            return f"CAST({value} AS {target})"
+    return f"CAST({value} AS {sql_type})"
+
+FUNCTIONS: dict[str, Callable[[list[str]], str]] = {
+    "getdate": lambda arguments: "datetime('now', 'localtime')",
+    "sysdatetime": lambda arguments: "datetime('now', 'localtime')",
+    "getutcdate": lambda arguments: "datetime('now')",
+    "sysutcdatetime": lambda arguments: "datetime('now')",
+    "year": lambda arguments: strftime_integer("year", arguments[0]),
+    "month": lambda arguments: strftime_integer("month", arguments[0]),
+    "day": lambda arguments: strftime_integer("day", arguments[0]),
+    "datepart": lambda arguments: strftime_integer(date_part(arguments[0]), arguments[1]),
+    "datename": datename,
+    "dateadd": dateadd,
+    "datediff": datediff,
+    "eomonth": eomonth,
+    "datefromparts": lambda arguments: f"printf('%04d-%02d-%02d', {arguments[0]}, {arguments[1]}, {arguments[2]})",
+    "format": format_function,
+    "cast": lambda arguments: cast(arguments[0]),
+    "convert": lambda arguments: cast_to(arguments[1], arguments[0]),
+    "isnull": lambda arguments: f"IFNULL({arguments[0]}, {arguments[1]})",
+    "len": lambda arguments: f"LENGTH({arguments[0]})",
+    "charindex": lambda arguments: f"INSTR({arguments[1]}, {arguments[0]})",
+    "string_agg": lambda arguments: f"group_concat({arguments[0]}, {arguments[1]})",
+}
+FUNCTION_CALL = re.compile(r"\b(" + "|".join(FUNCTIONS) + r")\s*\(", re.I)
+
+def rewrite_functions(sql: str) -> str:
+    parts, position = [], 0
+    spans = string_spans(sql)
+    while match := FUNCTION_CALL.search(sql, position):
+        span = in_spans(match.start(), spans)
+        if span is not None:
+            parts.append(sql[position:span[1]])
+            position = span[1]
+            continue
+        arguments, end = read_arguments(sql, match.end())
+        arguments = [rewrite_functions(argument) for argument in arguments]
+        parts.append(sql[position:match.start()])
+        parts.append(FUNCTIONS[match.group(1).lower()](arguments))
+        position = end
+    parts.append(sql[position:])
+    return "".join(parts)
+
+TOP = re.compile(r"\bSELECT(\s+DISTINCT)?\s+TOP\s*(?:\(\s*(\d+)\s*\)|(\d+))(?!\s*PERCENT)", re.I)
+
+def rewrite_top(sql: str) -> str:
+    """SELECT TOP n ... -> SELECT ... LIMIT n, at the end of the (sub)query that holds the TOP."""
+    position = 0
+    while match := TOP.search(sql, position):
+        span = in_spans(match.start(), string_spans(sql))
+        if span is not None:
+            position = span[1]
+            continue
+        end = query_end(sql, match.end())
+        limit = f" LIMIT {match.group(2) or match.group(3)}"
+        sql = sql[:match.start()] + "SELECT" + (match.group(1) or "") + sql[match.end():end].rstrip() + limit + sql[end:]
+    return sql
+
+def query_end(sql: str, start: int) -> int:
+    """Index of the ")" closing the subquery that contains start, or of the end of the statement."""
+    depth, i = 0, start
+    while i < len(sql):
+        char = sql[i]
+        if char == "'":
+            i = sql.index("'", i + 1) + 1
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                return i
+            depth -= 1
+        elif char == ";" and depth == 0:
+            return i
+        i += 1
+    return len(sql)
+
+def rewrite_code(code: str) -> str:
+    code = re.sub(r"\[([^\]]+)\]", r'"\1"', code)
+    code = re.sub(r"\bWITH\s*\(\s*NOLOCK\s*\)", "", code, flags=re.I)
+    code = re.sub(
+        r"\bOFFSET\s+(\S+)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\S+)\s+ROWS?\s+ONLY\b",
+        r"LIMIT \2 OFFSET \1", code, flags=re.I,
+    )
+    return code
+
+def translate_tsql_to_sqlite(sql: str) -> str:
+    sql = sql.strip()
+    sql = rewrite_top(sql)
+    sql = rewrite_functions(sql)
+    return map_code(sql, rewrite_code)
@@ -0,0 +1,365 @@
+"""
+Guard for the SQL the agents generate, applied before fetch_data_using_sql_query runs it.
+
+- Only single SELECT statements over the finance tables are accepted.
+- Every table is replaced by a derived table filtered on the user, so no query can read the data
+  of another user or scan the whole table, whatever predicates it has. A finance table named
+  anywhere the parser cannot place it rejects the query.
+- A common table expression only stands for the unqualified references after its body, and may
+  not be named like a finance table.
+- The outermost SELECT gets a TOP row limit.
+- Predicates that apply functions to Date are rewritten into ranges the (UserId, Date) index can seek.
+- The cost of the query is estimated from the user's row counts; cartesian products are rejected
+  before they reach the database.
+"""
+import re
+import logging
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from .query_cache import TOKEN, CLAUSE_WORDS
+from .sql_dialect import string_spans, in_spans
+
+logger = logging.getLogger(__name__)
+
+# Tables the agents may read, with the column that holds the owner
+USER_TABLES = {
+    "USERS": "Id",
+    "ACCOUNTS": "UserId",
+    "CATEGORIES": "UserId",
+    "TRANSACTIONS": "UserId",
+    "BUDGET": "UserId",
+    "MONTHLYSUMMARY": "UserId",
+    "SPENDINGFORECASTS": "UserId",
+    "CATEGORYSTATISTICS": "UserId",
+    "TRANSACTIONOUTLIERS": "UserId",
+}
+# Table names that are also columns of the finance tables
+TABLE_COLUMNS = {"BUDGET"}
+TABLE_NAMES = {name.upper(): name for name in ("Users", "Accounts", "Categories", "Transactions", "Budget", "MonthlySummary", "SpendingForecasts",
+                                                  "CategoryStatistics", "TransactionOutliers")}
+
+FORBIDDEN_WORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "DROP", "ALTER", "CREATE", "TRUNCATE", "EXEC", "EXECUTE",
+    "GRANT", "REVOKE", "DENY", "INTO", "OPENROWSET", "OPENQUERY", "OPENDATASOURCE", "BULK", "SHUTDOWN",
+    "WAITFOR", "DBCC", "ATTACH", "DETACH", "PRAGMA", "BACKUP", "RESTORE", "KILL",
+}
+
+# One Date column reference, optionally qualified: t.Date, [t].[Date], Date
+DATE_COLUMN = r"(?:\[?\w+\]?\s*\.\s*)?\[?Date\]?"
+
+DATE_REWRITES = [
+    # YEAR(Date) = 2025 AND MONTH(Date) = 3
+    ("year_month", re.compile(rf"\bYEAR\s*\(\s*(?P<col>{DATE_COLUMN})\s*\)\s*=\s*(?P<year>\d{{4}})\s+AND\s+MONTH\s*\(\s*(?P<col2>{DATE_COLUMN})\s*\)\s*=\s*(?P<month>\d{{1,2}})\b", re.I)),
+    # MONTH(Date) = 3 AND YEAR(Date) = 2025
+    ("year_month", re.compile(rf"\bMONTH\s*\(\s*(?P<col>{DATE_COLUMN})\s*\)\s*=\s*(?P<month>\d{{1,2}})\s+AND\s+YEAR\s*\(\s*(?P<col2>{DATE_COLUMN})\s*\)\s*=\s*(?P<year>\d{{4}})\b", re.I)),
+    # YEAR(Date) = 2025
+    ("year", re.compile(rf"\bYEAR\s*\(\s*(?P<col>{DATE_COLUMN})\s*\)\s*=\s*(?P<year>\d{{4}})\b", re.I)),
+    # FORMAT(Date, 'yyyy-MM') = '2025-03'
+    ("format_month", re.compile(rf"\bFORMAT\s*\(\s*(?P<col>{DATE_COLUMN})\s*,\s*N?'yyyy-MM'\s*\)\s*=\s*N?'(?P<year>\d{{4}})-(?P<month>\d{{2}})'", re.I)),
+    # CAST(Date AS DATE) = '2025-03-14', CONVERT(DATE, Date) = '2025-03-14'
+    ("day", re.compile(rf"\b(?:CAST\s*\(\s*(?P<col>{DATE_COLUMN})\s+AS\s+DATE\s*\)|CONVERT\s*\(\s*DATE\s*,\s*(?P<col2>{DATE_COLUMN})\s*\))\s*=\s*N?'(?P<day>\d{{4}}-\d{{2}}-\d{{2}})'", re.I)),
+    # DATEDIFF(day, Date, GETDATE()) <= 30
+    ("datediff", re.compile(rf"\bDATEDIFF\s*\(\s*(?P<unit>day|dd|d|month|mm|m)\s*,\s*(?P<col>{DATE_COLUMN})\s*,\s*GETDATE\s*\(\s*\)\s*\)\s*(?P<op><=|<)\s*(?P<amount>\d+)\b", re.I)),
+]
+
+NON_SARGABLE = re.compile(
+    r"\b(?:YEAR|MONTH|DAY|DATEPART|DATENAME|FORMAT|CAST|CONVERT|DATEDIFF|EOMONTH)\s*\("
+    r"(?:[^()]|\([^()]*\))*?\bDate\b(?:[^()]|\([^()]*\))*\)\s*(?:=|<|>|!|BETWEEN\b|IN\b)", re.I)
+
+class QueryRejectedError(ValueError):
+    """The query is not allowed to reach the database."""
+
+@dataclass
+class Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+    @property
+    def upper(self) -> str:
+        return self.text[1:-1].upper() if self.kind == "bracket" else self.text.upper()
+
+@dataclass
+class TableReference:
+    name: str
+    alias: str | None
+    start: int
+    end: int
+    cartesian: bool = False
+    qualified: bool = False
+
+@dataclass
+class GuardedQuery:
+    sql: str
+    cost: int
+    rewrites: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+@dataclass
+class GuardMetrics:
+    checked: int = 0
+    rewritten: int = 0
+    rejected: int = 0
+
+def tokenize(sql: str) -> list[Token]:
+    return [Token(match.lastgroup, match.group(), match.start(), match.end())
+            for match in TOKEN.finditer(sql) if match.lastgroup not in ("space", "comment")]
+
+def date_range(year: int, month: int | None = None, day: str | None = None) -> tuple[str, str]:
+    if day:
+        start = date.fromisoformat(day)
+        return start.isoformat(), (start + timedelta(days=1)).isoformat()
+    if month:
+        start = date(year, month, 1)
+        return start.isoformat(), (start + timedelta(days=calendar.monthrange(year, month)[1])).isoformat()
+    return date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat()
+
+def rewrite_date_predicates(sql: str) -> tuple[str, list[str]]:
+    """Turn functions applied to Date in predicates into ranges on the bare column."""
+    rewrites = []
+    for name, pattern in DATE_REWRITES:
+        spans = string_spans(sql)
+        parts, position = [], 0
+        for match in pattern.finditer(sql):
+            if in_spans(match.start(), spans):
+                continue
+            column = (match.group("col") or match.group("col2")).replace(" ", "")
+            if name == "datediff":
+                unit = "day" if match.group("unit").lower() in ("day", "dd", "d") else "month"
+                amount = int(match.group("amount")) - (1 if match.group("op") == "<" else 0)
+                today = "CAST(GETDATE() AS DATE)" if unit == "day" else "DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1)"
+                replacement = f"{column} >= DATEADD({unit}, -{amount}, {today})"
+            else:
+                if name == "year_month" and match.group("col").replace(" ", "").upper() != match.group("col2").replace(" ", "").upper():
+                    continue
+                groups = match.groupdict()
+                start, end = date_range(int(groups["year"]) if groups.get("year") else 0,
+                                        int(groups["month"]) if groups.get("month") else None, groups.get("day"))
+                replacement = f"({column} >= '{start}' AND {column} < '{end}')"
+            parts.append(sql[position:match.start()])
+            parts.append(replacement)
+            position = match.end()
+            rewrites.append(f"{match.group(0)} -> {replacement}")
+        parts.append(sql[position:])
+        sql = "".join(parts)
+    return sql, rewrites
+
+# Words that end the FROM clause of the SELECT they belong to
+FROM_END_WORDS = {"WHERE", "GROUP", "ORDER", "HAVING", "UNION", "EXCEPT", "INTERSECT", "OFFSET", "FETCH", "FOR", "OPTION", "SELECT"}
+
+def cte_definitions(tokens: list[Token]) -> dict[str, int]:
+    """Names of the WITH clause, with the index of the parenthesis that closes each body."""
+    definitions, depth, name = {}, 0, None
+    for index, token in enumerate(tokens):
+        if token.text == "(":
+            depth += 1
+        elif token.text == ")":
+            depth -= 1
+            if depth == 0 and name is not None:
+                definitions.setdefault(name, index)
+                name = None
+        elif depth == 0 and index + 2 < len(tokens) and tokens[index + 1].upper == "AS" and tokens[index + 2].text == "(" and \
+                index > 0 and tokens[index - 1].upper in ("WITH", ","):
+            name = token.upper
+    return definitions
+
+def is_cte_reference(reference: TableReference, ctes: dict[str, int]) -> bool:
+    # Schema-qualified names and names used before or inside the CTE's own body are tables
+    return not reference.qualified and reference.name in ctes and reference.start > ctes[reference.name]
+
+def table_references(tokens: list[Token]) -> list[TableReference]:
+    """
+    Tables of the FROM clauses at every nesting level. Each level of parentheses keeps its own FROM
+    state, so the commas of a FROM list are told apart from those of select lists and function
+    arguments, also after derived tables and JOIN ... ON conditions.
+    """
+    references = []
+    # Per parenthesis depth: inside a FROM clause, and the FROM, JOIN, APPLY or comma a table may follow
+    in_from, introducers = [False], [None]
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        introducer, introducers[-1] = introducers[-1], None
+        if token.text == "(":
+            # Derived tables and subqueries are scanned at their own depth; a parenthesized join is still a FROM clause
+            nested = introducer is not None and index + 1 < len(tokens) and tokens[index + 1].upper not in ("SELECT", "WITH", "VALUES")
+            in_from.append(nested)
+            introducers.append(index if nested else None)
+        elif token.text == ")":
+            if len(in_from) > 1:
+                in_from.pop()
+                introducers.pop()
+        elif token.upper == "FROM":
+            in_from[-1], introducers[-1] = True, index
+        elif token.upper in FROM_END_WORDS:
+            in_from[-1] = False
+        elif in_from[-1] and token.upper in ("JOIN", "APPLY", ","):
+            introducers[-1] = index
+        elif introducer is not None and token.kind in ("word", "bracket"):
+            start = position = index
+            name = tokens[position].upper
+            while position + 2 < len(tokens) and tokens[position + 1].text == "." and tokens[position + 2].kind in ("word", "bracket"):
+                position += 2
+                name = tokens[position].upper
+            position += 1
+            alias = None
+            if position < len(tokens) and tokens[position].upper == "AS":
+                position += 1
+            if position < len(tokens) and tokens[position].kind in ("word", "bracket") \
+                    and tokens[position].upper not in CLAUSE_WORDS and tokens[position].upper not in FROM_END_WORDS:
+                alias = tokens[position].text
+                position += 1
+            # Table hints like WITH (NOLOCK) belong to the table and are dropped with it
+            if position + 1 < len(tokens) and tokens[position].upper == "WITH" and tokens[position + 1].text == "(":
+                while position < len(tokens) and tokens[position].text != ")":
+                    position += 1
+                position += 1
+            joined_by = tokens[introducer].upper
+            cartesian = joined_by == "," or (joined_by == "JOIN" and (
+                tokens[introducer - 1].upper == "CROSS" or position >= len(tokens) or tokens[position].upper != "ON"))
+            references.append(TableReference(name, alias, start, position, cartesian, qualified=start + 1 < len(tokens) and tokens[start + 1].text == "."))
+            index = position
+            continue
+        index += 1
+    return references
+
+def unscoped_tables(tokens: list[Token], references: list[TableReference]) -> set[str]:
+    """Finance table names left outside the references, which would be read without the UserId filter."""
+    covered = {index for reference in references for index in range(reference.start, reference.end)}
+    unscoped = set()
+    for index, token in enumerate(tokens):
+        if token.kind not in ("word", "bracket") or token.upper not in USER_TABLES or index in covered:
+            continue
+        # Column qualifiers (Transactions.Amount) and column aliases (AS Budget)
+        if (index + 1 < len(tokens) and tokens[index + 1].text == ".") or (index > 0 and tokens[index - 1].upper == "AS"):
+            continue
+        # Every bare name after FROM, JOIN, APPLY or a FROM comma is a reference, so an uncovered Budget is the column
+        if token.upper in TABLE_COLUMNS and (index == 0 or tokens[index - 1].text != '"'):
+            continue
+        unscoped.add(TABLE_NAMES[token.upper])
+    return unscoped
+
+class SqlGuard:
+    def __init__(self, max_rows: int = 1000, max_cost: int = 2_000_000, timeout_seconds: float = 10):
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.timeout_seconds = timeout_seconds
+        self.metrics = GuardMetrics()
+
+    def check(self, user_id: int, sql: str, table_rows: dict[str, int] | None = None) -> GuardedQuery:
+        """Validate and rewrite a query for user_id; raises QueryRejectedError."""
+        self.metrics.checked += 1
+        try:
+            guarded = self._check(int(user_id), sql, table_rows or {})
+        except QueryRejectedError as e:
+            self.metrics.rejected += 1
+            logger.warning(f"SQL guard rejected query of user {user_id}: {e} | {' '.join(sql.split())}")
+            raise
+        if guarded.rewrites:
+            self.metrics.rewritten += 1
+        logger.info(f"SQL guard user={user_id} cost={guarded.cost:,} rewrites={len(guarded.rewrites)} "
+                    f"warnings={guarded.warnings} | {' '.join(guarded.sql.split())}")
+        return guarded
+
+    def _check(self, user_id: int, sql: str, table_rows: dict[str, int]) -> GuardedQuery:
+        tokens = tokenize(sql)
+        while tokens and tokens[-1].text == ";":
+            tokens.pop()
+        if not tokens or tokens[0].upper not in ("SELECT", "WITH"):
+            raise QueryRejectedError("Only SELECT queries are allowed.")
+        if any(token.text == ";" for token in tokens):
+            raise QueryRejectedError("Only one statement per query is allowed.")
+        forbidden = sorted({token.upper for token in tokens if token.kind == "word" and token.upper in FORBIDDEN_WORDS})
+        if forbidden:
+            raise QueryRejectedError(f"Forbidden keywords: {', '.join(forbidden)}.")
+        for index, token in enumerate(tokens[:-2]):
+            if token.upper == "USERID" and tokens[index + 1].text == "=" and tokens[index + 2].kind == "number" \
+                    and int(float(tokens[index + 2].text)) != user_id:
+                raise QueryRejectedError(f"The query reads the data of another user (UserId = {tokens[index + 2].text}).")
+
+        sql, rewrites = rewrite_date_predicates(sql[:tokens[-1].end])
+        warnings = [f"Non-sargable predicate on Date: {' '.join(match.group(0).split())}"
+                    for match in NON_SARGABLE.finditer(sql) if not in_spans(match.start(), string_spans(sql))]
+        tokens = tokenize(sql)
+        ctes = cte_definitions(tokens)
+        shadowing = sorted(TABLE_NAMES[name] for name in ctes if name in USER_TABLES)
+        if shadowing:
+            raise QueryRejectedError(f"Common table expressions can't be named like a table: {', '.join(shadowing)}.")
+        references = [reference for reference in table_references(tokens) if not is_cte_reference(reference, ctes)]
+        unknown = sorted({reference.name for reference in references if reference.name not in USER_TABLES})
+        if unknown:
+            raise QueryRejectedError(f"Unknown tables: {', '.join(unknown)}. Only {', '.join(USER_TABLES)} can be queried.")
+        # Fail closed: a table the parser could not place would be read without the user filter
+        unscoped = unscoped_tables(tokens, references)
+        if unscoped:
+            raise QueryRejectedError(f"Could not scope {', '.join(sorted(unscoped))} to the user; reference tables only in FROM and JOIN clauses.")
+        if any(token.text == "*" and index > 0 and tokens[index - 1].upper == "SELECT" for index, token in enumerate(tokens)):
+            warnings.append("SELECT * returns every column; select only the columns needed")
+
+        cost = self.estimate_cost(references, table_rows)
+        if cost > self.max_cost:
+            raise QueryRejectedError(f"Estimated cost {cost:,} rows exceeds {self.max_cost:,}"
+                                     + (" (cartesian join, add an ON condition)" if any(r.cartesian for r in references) else "") + ".")
+
+        # (start, end, replacement) on character positions, applied from the end
+        edits = []
+        for reference in references:
+            column = USER_TABLES[reference.name]
+            table = TABLE_NAMES[reference.name]
+            alias = reference.alias or table
+            edits.append((tokens[reference.start].start, tokens[reference.end - 1].end,
+                          f"(SELECT * FROM {table} WHERE {column} = {user_id}) AS {alias}"))
+        if references:
+            rewrites.append(f"Scoped {len(references)} table references to UserId = {user_id}")
+        limit = self.row_limit_edit(tokens)
+        if limit:
+            edits.append(limit[:3])
+            rewrites.append(limit[3])
+        for start, end, replacement in sorted(edits, reverse=True):
+            sql = sql[:start] + replacement + sql[end:]
+        return GuardedQuery(sql=sql, cost=cost, rewrites=rewrites, warnings=warnings)
+
+    def row_limit_edit(self, tokens: list[Token]) -> tuple[int, int, str, str] | None:
+        """TOP limit for the outermost SELECT: inserted, lowered, or None if it already fits."""
+        depth, main = 0, None
+        for index, token in enumerate(tokens):
+            if token.text == "(":
+                depth += 1
+            elif token.text == ")":
+                depth -= 1
+            elif depth == 0:
+                if token.upper in ("UNION", "EXCEPT", "INTERSECT", "OFFSET"):
+                    # Left to the row cap of the service
+                    return None
+                if token.upper == "SELECT" and main is None:
+                    main = index
+        if main is None:
+            return None
+        position = main + 1
+        if position < len(tokens) and tokens[position].upper in ("DISTINCT", "ALL"):
+            position += 1
+        if position < len(tokens) and tokens[position].upper == "TOP":
+            value = tokens[position + 1] if tokens[position + 1].text != "(" else tokens[position + 2]
+            if value.kind == "number" and int(float(value.text)) > self.max_rows:
+                return value.start, value.end, str(self.max_rows), f"TOP {value.text} -> TOP {self.max_rows}"
+            return None
+        at = tokens[position - 1].end
+        return at, at, f" TOP ({self.max_rows})", f"Added TOP ({self.max_rows})"
+
+    @staticmethod
+    def estimate_cost(references: list[TableReference], table_rows: dict[str, int]) -> int:
+        """Rows read: joined tables add up, every cartesian join multiplies."""
+        components = []
+        for reference in references:
+            rows = max(1, table_rows.get(reference.name, 100))
+            if reference.cartesian or not components:
+                components.append(rows)
+            else:
+                components[-1] += rows
+        cost = 1
+        for rows in components:
+            cost *= rows
+        return cost if references else 1
@@ -0,0 +1,106 @@
+import json
+import time
+import logging
+from contextlib import contextmanager
+from decimal import Decimal
+from datetime import date, datetime
+
+from .storage import Storage
+from .query_cache import QueryResultCache, DATA_VERSION_SQL
+from .sql_guard import SqlGuard, QueryRejectedError
+
+logger = logging.getLogger(__name__)
+
+# Row counts of the user's tables for the cost estimate of the SQL guard, from the summary table
+TABLE_ROWS_SQL = """
+SELECT (SELECT ISNULL(SUM(TransactionCount), 0) FROM MonthlySummary WHERE UserId = ?),
+       (SELECT COUNT(*) FROM MonthlySummary WHERE UserId = ?),
+       (SELECT COUNT(*) FROM Budget WHERE UserId = ?)
+"""
+
+def to_json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+@contextmanager
+def statement_timeout(raw, seconds: float | None):
+    """Abort the statements run on the raw connection after seconds (pyodbc query timeout, SQLite progress handler)."""
+    if not seconds:
+        yield
+        return
+    if hasattr(raw, "set_progress_handler"):
+        deadline = time.monotonic() + seconds
+        # A non-zero return interrupts the statement with sqlite3.OperationalError: interrupted
+        raw.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    else:
+        # Applies to the cursors created while it is set
+        previous = raw.timeout
+        raw.timeout = max(1, round(seconds))
+        try:
+            yield
+        finally:
+            raw.timeout = previous
+
+class SqlQueryService:
+    """
+    In-process fetch_data_using_sql_query: runs the agents' T-SQL through the connection pool
+    (translated for SQLite) and serves repeated queries from the result cache.
+    With a guard, queries are validated, scoped to the user and limited before they run.
+    Results have the shape of the Logic App response: {"ResultSets": {"Table1": [rows]}}.
+    """
+
+    def __init__(self, pool, storage: Storage, cache: QueryResultCache | None = None, guard: SqlGuard | None = None):
+        self.pool = pool
+        self.storage = storage
+        self.cache = cache
+        self.guard = guard
+
+    def fetch(self, user_id: int, query: str) -> str:
+        start = time.perf_counter()
+        try:
+            with self.pool.connection() as conn:
+                if self.guard is not None:
+                    query = self.guard.check(user_id, query, self.table_rows(conn, user_id)).sql
+                if self.cache is None:
+                    return self.run(conn, query)
+                row = conn.execute(DATA_VERSION_SQL, (user_id,)).fetchone()
+                version = row[0] if row else 0
+                return self.cache.get_or_load(user_id, query, version, lambda: self.run(conn, query))
+        except QueryRejectedError as e:
+            return json.dumps({"error": f"Query rejected: {e}"})
+        except Exception as e:
+            # Errors are returned to the agent so it can fix the query, and never cached
+            logger.warning(f"Query failed for user {user_id}: {e}")
+            return json.dumps({"error": str(e)})
+        finally:
+            logger.debug(f"fetch_data_using_sql_query took {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def table_rows(self, conn, user_id: int) -> dict[str, int]:
+        transactions, summary, budget = conn.execute(self.storage.translate(TABLE_ROWS_SQL), (user_id,) * 3).fetchone()
+        return {"TRANSACTIONS": int(transactions), "MONTHLYSUMMARY": summary, "BUDGET": budget}
+
+    def run(self, conn, query: str) -> str:
+        if self.guard is None:
+            cursor = conn.execute(self.storage.translate(query))
+            columns = [column[0] for column in cursor.description or []]
+            rows = cursor.fetchall()
+        else:
+            # A new cursor, so the timeout applies; generated queries are rarely repeated verbatim
+            with statement_timeout(conn.raw, self.guard.timeout_seconds):
+                cursor = conn.raw.cursor()
+                try:
+                    cursor.execute(self.storage.translate(query))
+                    columns = [column[0] for column in cursor.description or []]
+                    # The TOP limit isn't injected in UNION queries
+                    rows = cursor.fetchmany(self.guard.max_rows)
+                finally:
+                    cursor.close()
+        rows = [dict(zip(columns, row)) for row in rows]
+        return json.dumps({"ResultSets": {"Table1": rows}}, default=to_json_value)
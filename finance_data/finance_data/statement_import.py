@@ -0,0 +1,501 @@
+"""
+Bulk import of bank statements (CSV, OFX, QIF) into the Transactions table.
+
+Statements are parsed lazily, one row at a time, mapped to the user's AccountId/CategoryId and
+inserted with executemany in batches of batch_size rows (fast_executemany on pyodbc). Rows are
+committed every commit_every rows, so memory stays bounded by one batch and a failure only
+rolls back the current chunk. The date format is detected once per file from all its dates, in a
+first pass over the file; files whose dates read both day-first and month-first are rejected.
+"""
+import re
+import csv
+import time
+import logging
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+
+from .budget_alerts import BudgetAlertEvaluator, add_expenses
+from .duplicates import DuplicateDetector, Fingerprint
+from .outliers import OutlierDetector
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_FORMATS = ("csv", "ofx", "qif")
+
+INSERT_TRANSACTION_SQL = (
+    "INSERT INTO Transactions (Type, AccountId, CategoryId, UserId, Date, Amount, Description, AttachmentUrl) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Candidate formats of the dates of a statement; one is chosen per file by detect_date_format
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y%m%d", "%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%m-%d-%Y")
+# Formats fromisoformat (implemented in C, much faster than strptime) reads, with the length of their dates
+ISO_FORMATS = {"%Y-%m-%d": 10, "%Y-%m-%dT%H:%M:%S": 19}
+
+# Header names used by common bank exports
+CSV_COLUMNS = {
+    "date": {"date", "transaction date", "posted date", "posting date", "booking date", "value date"},
+    "description": {"description", "memo", "payee", "name", "details", "narrative", "merchant"},
+    "amount": {"amount", "value", "transaction amount"},
+    "debit": {"debit", "withdrawal", "withdrawals", "money out", "paid out"},
+    "credit": {"credit", "deposit", "deposits", "money in", "paid in"},
+    "category": {"category"},
+    "account": {"account", "account name"},
+}
+
+class StatementFormatError(ValueError):
+    """Raised when a statement can't be read in the requested format."""
+
+@dataclass
+class StatementRow:
+    date: datetime
+    amount: Decimal
+    description: str
+    category: str | None = None
+    account: str | None = None
+
+def parse_date(value: str, date_format: str | None = None) -> datetime:
+    value = value.strip()
+    if date_format is None or len(value) == ISO_FORMATS.get(date_format):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    for candidate in (date_format,) if date_format else DATE_FORMATS:
+        try:
+            return datetime.strptime(value, candidate)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value!r}")
+
+def parse_amount(value: str) -> Decimal:
+    text = value.strip().replace(" ", "")
+    negative = text.startswith("(") and text.endswith(")")
+    text = re.sub(r"[^\d.,\-+]", "", text)
+    # "1.234,56" uses the comma as the decimal separator
+    if "," in text and (text.rfind(",") > text.rfind(".")) and len(text) - text.rfind(",") == 3:
+        text = text.replace(".", "").replace(",", ".")
+    else:
+        text = text.replace(",", "")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Unrecognized amount: {value!r}")
+    return -abs(amount) if negative else amount
+
+def detect_date_format(values: Iterable[str]) -> str | None:
+    """
+    The format of DATE_FORMATS that reads the most dates of a statement, None without dates.
+    Raises StatementFormatError when no format reads them, or when the formats that read the most
+    disagree on a date (01/02/2025 with no day above 12 in the file is January 2nd or February 1st).
+    """
+    distinct = {value.strip() for value in values if value.strip()}
+    if not distinct:
+        return None
+    counts = dict.fromkeys(DATE_FORMATS, 0)
+    parsed = {date_format: {} for date_format in DATE_FORMATS}
+    for value in distinct:
+        for date_format in DATE_FORMATS:
+            try:
+                when = datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+            # %Y also reads the 2-digit years of %y
+            if when.year >= 1900:
+                counts[date_format] += 1
+                parsed[date_format][value] = when
+    best = max(counts.values())
+    if best == 0:
+        raise StatementFormatError(f"Unrecognized dates, e.g. {next(iter(distinct))!r}. Use one of: {', '.join(DATE_FORMATS)}")
+    candidates = [date_format for date_format in DATE_FORMATS if counts[date_format] == best]
+    for other in candidates[1:]:
+        if any(parsed[other].get(value, when) != when for value, when in parsed[candidates[0]].items()):
+            raise StatementFormatError(f"Ambiguous dates: they read as {candidates[0]} and {other}. "
+                                       "Pass the date format of the statement, e.g. %d/%m/%Y.")
+    return candidates[0]
+
+def csv_columns(header: list[str]) -> dict[str, int]:
+    columns = {}
+    for index, name in enumerate(header):
+        for column, aliases in CSV_COLUMNS.items():
+            if name.strip().lower() in aliases:
+                columns.setdefault(column, index)
+    if "date" not in columns or not ("amount" in columns or "debit" in columns or "credit" in columns):
+        raise StatementFormatError(f"CSV header needs a date and an amount (or debit/credit) column: {header}")
+    return columns
+
+def parse_csv(lines: Iterable[str], date_format: str | None = None) -> Iterator["StatementRow | ValueError"]:
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = csv_columns(header)
+
+    def cell(record: list[str], column: str) -> str:
+        index = columns.get(column)
+        return record[index].strip() if index is not None and index < len(record) else ""
+
+    for record in reader:
+        if not any(value.strip() for value in record):
+            continue
+        try:
+            if cell(record, "amount"):
+                amount = parse_amount(cell(record, "amount"))
+            else:
+                debit, credit = cell(record, "debit"), cell(record, "credit")
+                amount = parse_amount(credit) if credit else -abs(parse_amount(debit or "0"))
+            yield StatementRow(
+                date=parse_date(cell(record, "date"), date_format),
+                amount=amount,
+                description=cell(record, "description"),
+                category=cell(record, "category") or None,
+                account=cell(record, "account") or None,
+            )
+        except ValueError as e:
+            yield e
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+def parse_ofx(lines: Iterable[str], date_format: str | None = None) -> Iterator["StatementRow | ValueError"]:
+    # Handles both OFX 1.x (SGML, unclosed tags) and OFX 2.x (XML), one <STMTTRN> block at a time
+    transaction = None
+    for line in lines:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and transaction is not None:
+                    yield row_or_error(ofx_row, transaction)
+                    transaction = None
+                elif not closing:
+                    transaction = {}
+            elif transaction is not None and not closing and value.strip():
+                transaction[tag] = value.strip()
+
+def ofx_row(transaction: dict) -> StatementRow:
+    if "DTPOSTED" not in transaction or "TRNAMT" not in transaction:
+        raise StatementFormatError(f"OFX transaction without DTPOSTED or TRNAMT: {transaction}")
+    name, memo = transaction.get("NAME", ""), transaction.get("MEMO", "")
+    return StatementRow(
+        # 20250115120000[-5:EST] -> 20250115
+        date=datetime.strptime(transaction["DTPOSTED"][:8], "%Y%m%d"),
+        amount=parse_amount(transaction["TRNAMT"]),
+        description=" - ".join(part for part in (name, memo if memo != name else "") if part),
+    )
+
+def parse_qif(lines: Iterable[str], date_format: str | None = None) -> Iterator["StatementRow | ValueError"]:
+    record: dict[str, str] = {}
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield row_or_error(qif_row, record, date_format)
+            record = {}
+        else:
+            record.setdefault(code, value)
+    if record:
+        yield row_or_error(qif_row, record, date_format)
+
+def qif_row(record: dict, date_format: str | None = None) -> StatementRow:
+    if "D" not in record or ("T" not in record and "U" not in record):
+        raise StatementFormatError(f"QIF record without date or amount: {record}")
+    date = qif_date(record["D"])
+    payee, memo = record.get("P", ""), record.get("M", "")
+    # "Groceries:Food" -> "Groceries", transfers are written as [Account]
+    category = record.get("L", "")
+    return StatementRow(
+        date=parse_date(date, date_format),
+        amount=parse_amount(record.get("T") or record["U"]),
+        description=" - ".join(part for part in (payee, memo) if part),
+        category=category.split(":")[0] if category and not category.startswith("[") else None,
+    )
+
+def qif_date(value: str) -> str:
+    # Quicken writes 1/15'25 for 2025
+    value = value.replace(" ", "")
+    if "'" in value:
+        day, _, year = value.partition("'")
+        value = f"{day}/{2000 + int(year) if year.isdigit() and len(year) <= 2 else year}"
+    return value
+
+def row_or_error(parse, *args) -> "StatementRow | ValueError":
+    try:
+        return parse(*args)
+    except ValueError as e:
+        return e
+
+PARSERS = {"csv": parse_csv, "ofx": parse_ofx, "qif": parse_qif}
+
+def detect_format(file_name: str) -> str:
+    extension = Path(file_name).suffix.lower().lstrip(".")
+    if extension == "qfx":
+        extension = "ofx"
+    if extension not in STATEMENT_FORMATS:
+        raise StatementFormatError(f"Unsupported statement file: {file_name}. Use one of: {', '.join(STATEMENT_FORMATS)}")
+    return extension
+
+def statement_url(file_url: str, account_url: str | None, container_name: str | None, local_path: str | None = None) -> str:
+    """
+    The URL of an uploaded statement, if it is a blob of the app's storage container: https on the
+    configured account and container, or a file:// URL under local_path with the local storage backend.
+    Raises StatementFormatError for any other URL, so the tool can't be used to fetch arbitrary resources.
+    """
+    url = urllib.parse.urlparse(file_url)
+    if url.scheme == "https" and account_url and container_name:
+        account = urllib.parse.urlparse(account_url)
+        container, _, blob_name = url.path.lstrip("/").partition("/")
+        if url.netloc.lower() == account.netloc.lower() and container == container_name and blob_name \
+                and ".." not in blob_name.split("/") and not url.params and not url.fragment:
+            return file_url
+    elif url.scheme == "file" and local_path and not url.netloc:
+        path = Path(urllib.request.url2pathname(url.path)).resolve()
+        if path.is_relative_to(Path(local_path).resolve()):
+            return file_url
+    raise StatementFormatError("The statement must be a file uploaded in the conversation.")
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Statements are downloaded from the storage account only, never from where it redirects."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        raise StatementFormatError(f"The statement download was redirected to {newurl}.")
+
+download_opener = urllib.request.build_opener(NoRedirectHandler)
+
+def statement_dates(lines: Iterable[str], format: str) -> Iterator[str]:
+    """The raw dates of a CSV or QIF statement, read to detect their format; OFX dates are always YYYYMMDD."""
+    if format == "csv":
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        index = csv_columns(header)["date"]
+        yield from (record[index] for record in reader if index < len(record))
+    elif format == "qif":
+        yield from (qif_date(line[1:].strip()) for line in lines if line.startswith("D"))
+
+def parse_statement(file: TextIO, format: str, date_format: str | None = None) -> Iterator["StatementRow | ValueError"]:
+    """
+    Lazily parse a statement. A malformed record is yielded as the ValueError describing it,
+    so one bad line doesn't stop the import; a file that can't be read at all raises StatementFormatError.
+    """
+    return PARSERS[format](file, date_format)
+
+class RowMapper:
+    """
+    Maps statement rows to Transactions rows for one user.
+    Categories are matched by the statement category, then by a category name found in the
+    description, then by the fallback category of the transaction type.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        account_id: int,
+        accounts: dict[str, int],
+        categories: dict[str, tuple[int, str | None]],
+        attachment_url: str | None = None,
+    ):
+        self.user_id = user_id
+        self.account_id = account_id
+        self.accounts = {name.lower(): id for name, id in accounts.items()}
+        self.categories = {name.lower(): (id, (type or "").lower()) for name, (id, type) in categories.items()}
+        self.attachment_url = attachment_url
+        # Longest names first, so "Car insurance" wins over "Car"
+        self._keywords = [
+            (re.compile(rf"\b{re.escape(name)}\b", re.IGNORECASE), id, type)
+            for name, (id, type) in sorted(self.categories.items(), key=lambda item: -len(item[0]))
+        ]
+        self._fallbacks = {
+            type: next((id for name, (id, category_type) in self.categories.items()
+                        if name in ("uncategorized", "other", "others") and category_type in (type, "")), None)
+            for type in ("income", "expense")
+        }
+
+    def category_for(self, row: StatementRow, type: str) -> int | None:
+        if row.category and row.category.lower() in self.categories:
+            return self.categories[row.category.lower()][0]
+        for pattern, id, category_type in self._keywords:
+            if category_type in (type, "") and pattern.search(row.description):
+                return id
+        return self._fallbacks[type]
+
+    def map(self, row: StatementRow) -> tuple | None:
+        type = "Income" if row.amount > 0 else "Expense"
+        category_id = self.category_for(row, type.lower())
+        if category_id is None:
+            return None
+        account_id = self.accounts.get((row.account or "").lower(), self.account_id)
+        return (type, account_id, category_id, self.user_id, row.date, abs(row.amount), row.description[:1000], self.attachment_url)
+
+# Highest Id of the user's transactions, the ones a statement import checks for duplicates
+LAST_TRANSACTION_ID_SQL = "SELECT COALESCE(MAX(Id), 0) FROM Transactions WHERE UserId = ?"
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    rows_imported: int = 0
+    rows_skipped: int = 0
+    duplicates: int = 0
+    outliers: int = 0
+    batches: int = 0
+    commits: int = 0
+    alerts: int = 0
+    seconds: float = 0.0
+    failed: bool = False
+    # Only the first max_errors messages are kept, error_count counts them all
+    errors: list[str] = field(default_factory=list)
+    error_count: int = 0
+    max_errors: int = 10
+
+    def add_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(message)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_imported / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "rows_read": self.rows_read,
+            "rows_imported": self.rows_imported,
+            "rows_skipped": self.rows_skipped,
+            "duplicates_skipped": self.duplicates,
+            "outliers": self.outliers,
+            "batches": self.batches,
+            "commits": self.commits,
+            "budget_alerts": self.alerts,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "failed": self.failed,
+            "errors": self.errors,
+            "error_count": self.error_count,
+        }
+
+class StatementImporter:
+    """
+    Imports statement files for one user through a ConnectionPool.
+    With an alert evaluator, the budgets crossed by each chunk are checked before it is committed.
+    With a duplicate detector, rows matching a transaction recorded before the import are skipped,
+    so importing the same statement twice doesn't duplicate it, and the imported rows are fingerprinted.
+    Rows of the statement itself are never duplicates of each other: two coffees on the same day are two rows.
+    With an outlier detector, each batch is added to the category statistics and its unusual amounts are flagged.
+    """
+
+    def __init__(self, pool, batch_size: int = 1000, commit_every: int = 10000,
+                 alerts: BudgetAlertEvaluator | None = None, duplicates: DuplicateDetector | None = None,
+                 outliers: OutlierDetector | None = None):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.commit_every = max(commit_every, batch_size)
+        self.alerts = alerts
+        self.duplicates = duplicates
+        self.outliers = outliers
+
+    def load_mapper(self, user_id: int, account_id: int, attachment_url: str | None = None) -> RowMapper:
+        with self.pool.connection() as conn:
+            accounts = conn.execute("SELECT Id, Name FROM Accounts WHERE UserId = ?", (user_id,)).fetchall()
+            categories = conn.execute("SELECT Id, Name, Type FROM Categories WHERE UserId = ?", (user_id,)).fetchall()
+        if account_id not in {row[0] for row in accounts}:
+            raise ValueError(f"Account {account_id} does not belong to user {user_id}")
+        return RowMapper(
+            user_id=user_id,
+            account_id=account_id,
+            accounts={row[1]: row[0] for row in accounts},
+            categories={row[1]: (row[0], row[2]) for row in categories},
+            attachment_url=attachment_url,
+        )
+
+    def mapped_rows(self, rows: Iterable["StatementRow | ValueError"], mapper: RowMapper, report: ImportReport) -> Iterator[tuple]:
+        for row in rows:
+            report.rows_read += 1
+            if isinstance(row, ValueError):
+                report.rows_skipped += 1
+                report.add_error(str(row))
+                continue
+            values = mapper.map(row)
+            if values is None:
+                report.rows_skipped += 1
+                report.add_error(f"No category for {row.description!r} on {row.date:%Y-%m-%d}")
+                continue
+            yield values
+
+    def import_rows(self, rows: Iterable[StatementRow], mapper: RowMapper) -> ImportReport:
+        report = ImportReport()
+        start = time.perf_counter()
+        values = self.mapped_rows(rows, mapper, report)
+        try:
+            with self.pool.connection() as conn:
+                uncommitted, expenses = 0, {}
+                if self.duplicates is not None or self.outliers is not None:
+                    known_id = fingerprinted_id = observed_id = conn.execute(LAST_TRANSACTION_ID_SQL, (mapper.user_id,)).fetchone()[0]
+                while batch := list(islice(values, self.batch_size)):
+                    if self.duplicates is not None:
+                        batch = self.new_rows(conn, batch, known_id, report)
+                        if not batch:
+                            continue
+                    conn.executemany(INSERT_TRANSACTION_SQL, batch)
+                    if self.duplicates is not None:
+                        fingerprinted_id = self.duplicates.add_new(conn, mapper.user_id, fingerprinted_id)
+                    if self.outliers is not None:
+                        observed_id, outliers = self.outliers.observe_new(conn, mapper.user_id, observed_id)
+                        report.outliers += len(outliers)
+                    report.batches += 1
+                    uncommitted += len(batch)
+                    if self.alerts is not None:
+                        add_expenses(expenses, batch)
+                    if uncommitted >= self.commit_every:
+                        report.alerts += self.raise_alerts(conn, expenses)
+                        conn.commit()
+                        report.commits += 1
+                        report.rows_imported += uncommitted
+                        uncommitted, expenses = 0, {}
+                report.alerts += self.raise_alerts(conn, expenses)
+                conn.commit()
+                report.commits += 1
+                report.rows_imported += uncommitted
+        except Exception as e:
+            # Committed chunks stay imported, the pool rolled back the current one
+            logger.error(f"Statement import stopped after {report.rows_imported} rows: {e}")
+            report.failed = True
+            report.add_error(f"Import stopped after {report.rows_imported} imported rows: {e}")
+        report.seconds = time.perf_counter() - start
+        logger.info(f"Imported {report.rows_imported} transactions ({report.rows_per_second:.0f} rows/s), skipped {report.rows_skipped}")
+        return report
+
+    def new_rows(self, conn, batch: list[tuple], known_id: int, report: ImportReport) -> list[tuple]:
+        """The rows of batch that don't duplicate a transaction of the user up to known_id."""
+        rows = []
+        for row in batch:
+            fingerprint = Fingerprint.of(row[3], row[4], row[5], row[6], row[7])
+            if self.duplicates.find(conn, fingerprint, max_id=known_id):
+                report.duplicates += 1
+            else:
+                rows.append(row)
+        return rows
+
+    def raise_alerts(self, conn, expenses: dict) -> int:
+        return len(self.alerts.evaluate(conn, expenses)) if self.alerts is not None and expenses else 0
+
+    def import_file(
+        self, path: str | Path, user_id: int, account_id: int,
+        format: str | None = None, date_format: str | None = None, attachment_url: str | None = None,
+    ) -> ImportReport:
+        format = format or detect_format(str(path))
+        mapper = self.load_mapper(user_id, account_id, attachment_url)
+        # newline="" lets the csv module handle quoted line breaks; the BOM of Excel exports is dropped
+        with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as file:
+            if date_format is None:
+                # One format for the whole file, so 01/02 can't be read day-first on one row and month-first on the next
+                date_format = detect_date_format(statement_dates(file, format))
+                file.seek(0)
+            return self.import_rows(parse_statement(file, format, date_format), mapper)
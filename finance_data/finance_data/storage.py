@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from datetime import date, datetime
+from pathlib import Path
+
+from .sql_dialect import translate_tsql_to_sqlite
+from .migrations import apply_migrations
+
+# Schemas and migrations ship with the package
+DATABASE_PATH = Path(__file__).resolve().parent / "database"
+
+# SQLite stores dates as ISO 8601 text, so they compare and sort like DATETIME2
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" ", timespec="seconds"))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+
+class Storage(ABC):
+    """Database backend of the data layer: how to connect and which SQL dialect it speaks."""
+
+    dialect: str = ""
+
+    @abstractmethod
+    def connect(self):
+        ...
+
+    def translate(self, sql: str) -> str:
+        """Translate a T-SQL query written for Azure SQL to this backend's dialect."""
+        return sql
+
+    @abstractmethod
+    def initialize(self, migrate: bool = True) -> None:
+        """Create the base schema if it does not exist, then apply the pending migrations."""
+
+class AzureSqlStorage(Storage):
+    dialect = "tsql"
+
+    def __init__(self, connection_string: str):
+        self.connection_string = connection_string
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def initialize(self, migrate: bool = True) -> None:
+        script = (DATABASE_PATH / "azure-sql-schema.sql").read_text(encoding="utf-8")
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            for statement in script.split(";"):
+                if statement.strip() and "CREATE" in statement.upper():
+                    cursor.execute(statement)
+            conn.commit()
+            if migrate:
+                apply_migrations(conn, self.dialect)
+        finally:
+            conn.close()
+
+class SqliteStorage(Storage):
+    """
+    Embedded SQLite database in WAL mode: readers don't block the writer, so the agents can
+    query while a statement import or the data generator is writing.
+    With initialize_on_connect, the database file is created and migrated by the first connection.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str | Path, schema_file: str | Path | None = None, cache_size_mb: int = 64,
+                 initialize_on_connect: bool = False):
+        self.path = str(path)
+        self.schema_file = Path(schema_file) if schema_file else DATABASE_PATH / "sqlite-schema.sql"
+        self.cache_size_mb = cache_size_mb
+        self.initialize_on_connect = initialize_on_connect
+        self.initialize_lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        if self.initialize_on_connect:
+            with self.initialize_lock:
+                if self.initialize_on_connect:
+                    self.initialize()
+                    self.initialize_on_connect = False
+        return self.open()
+
+    def __getstate__(self):
+        # Pickled for the forecasting worker processes, which get a lock of their own
+        state = dict(self.__dict__)
+        del state["initialize_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, initialize_lock=threading.Lock())
+
+    def open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # NORMAL is durable in WAL mode except for the last transactions on power loss
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_mb * 1024}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def translate(self, sql: str) -> str:
+        return translate_tsql_to_sqlite(sql)
+
+    def initialize(self, migrate: bool = True) -> None:
+        conn = self.open()
+        try:
+            conn.executescript(self.schema_file.read_text(encoding="utf-8"))
+            conn.commit()
+            if migrate:
+                apply_migrations(conn, self.dialect)
+        finally:
+            conn.close()
+
+def create_storage() -> Storage:
+    """Backend selected by DATABASE_BACKEND: azure-sql (default) or sqlite. Nothing connects until the first connect()."""
+    backend = os.getenv("DATABASE_BACKEND", "azure-sql").lower()
+    if backend == "sqlite":
+        return SqliteStorage(os.getenv("SQLITE_DATABASE_PATH", "finance.db"), initialize_on_connect=True)
+    if backend == "azure-sql":
+        return AzureSqlStorage(os.getenv("AZURE_SQL_CONNECTION_STRING"))
+    raise ValueError(f"Unsupported DATABASE_BACKEND: {backend}. Use azure-sql or sqlite.")
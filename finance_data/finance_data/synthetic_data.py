@@ -0,0 +1,176 @@
+"""
+Fill a database with synthetic users, accounts, categories, budgets and transactions.
+
+Transactions are generated lazily and inserted in batches, so millions of rows can be loaded
+with bounded memory to measure query and ingest performance on one machine.
+
+Usage (from the finance_data folder):
+    python -m finance_data.synthetic_data --path finance.db --users 1000 --transactions 5000000 [--months 24]
+"""
+import os
+import time
+import random
+import argparse
+from itertools import islice
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from .storage import Storage, SqliteStorage, create_storage
+from .statement_import import INSERT_TRANSACTION_SQL
+
+ACCOUNTS = [("Cash", "Cash"), ("Checking", "Bank"), ("Credit card", "Credit card"), ("Savings", "Bank")]
+
+# Name, relative frequency, median amount
+EXPENSE_CATEGORIES = [
+    ("Groceries", 30, 45.0), ("Restaurants", 15, 28.0), ("Transport", 15, 18.0), ("Entertainment", 8, 25.0),
+    ("Shopping", 10, 60.0), ("Health", 4, 55.0), ("Utilities", 3, 90.0), ("Rent", 1, 1200.0),
+    ("Insurance", 1, 150.0), ("Travel", 2, 350.0),
+]
+INCOME_CATEGORIES = [("Salary", 0, 3200.0), ("Freelance", 3, 400.0), ("Dividends", 1, 80.0)]
+
+DESCRIPTIONS = {
+    "Groceries": ["Supermarket", "Farmers market", "Grocery store"],
+    "Restaurants": ["Lunch", "Dinner out", "Coffee shop", "Pizza delivery"],
+    "Transport": ["Fuel", "Bus ticket", "Taxi", "Parking"],
+    "Entertainment": ["Cinema", "Concert", "Streaming subscription"],
+    "Shopping": ["Clothes", "Electronics", "Home goods"],
+    "Health": ["Pharmacy", "Doctor visit", "Gym membership"],
+    "Utilities": ["Electricity bill", "Water bill", "Internet"],
+    "Rent": ["Monthly rent"],
+    "Insurance": ["Car insurance", "Health insurance"],
+    "Travel": ["Flight", "Hotel"],
+    "Salary": ["Monthly salary"],
+    "Freelance": ["Freelance project"],
+    "Dividends": ["Dividend payment"],
+}
+
+@dataclass
+class GenerationReport:
+    users: int = 0
+    transactions: int = 0
+    budgets: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.transactions / self.seconds if self.seconds else 0.0
+
+class SyntheticDataGenerator:
+    def __init__(self, storage: Storage, months: int = 24, batch_size: int = 10000, commit_every: int = 200000, seed: int = 0):
+        self.storage = storage
+        self.months = months
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.random = random.Random(seed)
+        self.end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = self.end - timedelta(days=30 * months)
+
+    def create_user(self, cursor, index: int) -> tuple[int, dict, dict]:
+        """Insert a user with its accounts and categories; returns its ID, account IDs and category IDs."""
+        cursor.execute("INSERT INTO Users (Name, Email) VALUES (?, ?)", (f"User {index}", f"user{index}.{self.random.getrandbits(32):08x}@example.com"))
+        user_id = self.last_id(cursor, "Users")
+        accounts = {}
+        for name, type in ACCOUNTS:
+            cursor.execute("INSERT INTO Accounts (Name, Description, Type, UserId) VALUES (?, ?, ?, ?)", (name, None, type, user_id))
+            accounts[name] = self.last_id(cursor, "Accounts")
+        categories = {}
+        for type, definitions in (("Expense", EXPENSE_CATEGORIES), ("Income", INCOME_CATEGORIES)):
+            for name, _, _ in definitions:
+                cursor.execute("INSERT INTO Categories (Name, Description, Type, UserId) VALUES (?, ?, ?, ?)", (name, None, type, user_id))
+                categories[name] = self.last_id(cursor, "Categories")
+        return user_id, accounts, categories
+
+    def last_id(self, cursor, table: str) -> int:
+        if self.storage.dialect == "sqlite":
+            return cursor.lastrowid
+        cursor.execute(f"SELECT IDENT_CURRENT('{table}')")
+        return int(cursor.fetchone()[0])
+
+    def budgets(self, user_id: int, categories: dict) -> Iterator[tuple]:
+        month = self.start.replace(day=1)
+        while month <= self.end:
+            for name, frequency, median in EXPENSE_CATEGORIES:
+                # Roughly the expected monthly spending, rounded to 10
+                amount = round(frequency * median * 1.1 / 10) * 10 or median
+                yield (categories[name], month.year, month.month, amount, user_id)
+            month = (month + timedelta(days=32)).replace(day=1)
+
+    def transactions(self, user_id: int, accounts: dict, categories: dict, count: int) -> Iterator[tuple]:
+        rng = self.random
+        span_seconds = int((self.end - self.start).total_seconds())
+        # One salary per month, the rest are random expenses and occasional income
+        for month in range(min(self.months, count)):
+            date = self.start + timedelta(days=30 * month + rng.randint(0, 4), hours=9)
+            amount = round(rng.gauss(3200, 150), 2)
+            yield ("Income", accounts["Checking"], categories["Salary"], user_id, date, amount, "Monthly salary", None)
+
+        names = [name for name, _, _ in EXPENSE_CATEGORIES + INCOME_CATEGORIES[1:]]
+        weights = [frequency for _, frequency, _ in EXPENSE_CATEGORIES + INCOME_CATEGORIES[1:]]
+        medians = {name: median for name, _, median in EXPENSE_CATEGORIES + INCOME_CATEGORIES}
+        income = {name for name, _, _ in INCOME_CATEGORIES}
+        expense_accounts = [accounts["Cash"], accounts["Checking"], accounts["Credit card"]]
+        for name in rng.choices(names, weights, k=max(0, count - self.months)):
+            date = self.start + timedelta(seconds=rng.randrange(span_seconds))
+            # Log-normal amounts, with a few much larger outliers
+            amount = round(medians[name] * rng.lognormvariate(0, 0.5) * (8 if rng.random() < 0.002 else 1), 2)
+            type = "Income" if name in income else "Expense"
+            account = accounts["Checking"] if type == "Income" else rng.choice(expense_accounts)
+            yield (type, account, categories[name], user_id, date, amount, rng.choice(DESCRIPTIONS[name]), None)
+
+    def generate(self, users: int, transactions: int) -> GenerationReport:
+        report = GenerationReport()
+        start = time.perf_counter()
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            uncommitted = 0
+            for index in range(users):
+                user_id, accounts, categories = self.create_user(cursor, index)
+                budgets = list(self.budgets(user_id, categories))
+                cursor.executemany("INSERT INTO Budget (CategoryId, Year, Month, Amount, UserId) VALUES (?, ?, ?, ?, ?)", budgets)
+                report.budgets += len(budgets)
+                report.users += 1
+
+                count = transactions // users + (1 if index < transactions % users else 0)
+                rows = self.transactions(user_id, accounts, categories, count)
+                while batch := list(islice(rows, self.batch_size)):
+                    cursor.executemany(INSERT_TRANSACTION_SQL, batch)
+                    report.transactions += len(batch)
+                    uncommitted += len(batch)
+                    if uncommitted >= self.commit_every:
+                        conn.commit()
+                        uncommitted = 0
+            conn.commit()
+        finally:
+            conn.close()
+        report.seconds = time.perf_counter() - start
+        return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=None, help="SQLite database file; DATABASE_BACKEND is used when omitted")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.path:
+        storage = SqliteStorage(args.path)
+        storage.initialize()
+    else:
+        storage = create_storage()
+
+    generator = SyntheticDataGenerator(storage, months=args.months, batch_size=args.batch_size, seed=args.seed)
+    report = generator.generate(users=args.users, transactions=args.transactions)
+    print(f"Generated {report.users} users, {report.budgets} budgets and {report.transactions} transactions "
+          f"in {report.seconds:.1f} s ({report.rows_per_second:,.0f} rows/s)")
+    if args.path:
+        print(f"Database size: {os.path.getsize(args.path) / 1024 / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
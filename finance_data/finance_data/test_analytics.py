@@ -0,0 +1,45 @@
+import json
+from datetime import date
+
+import numpy as np
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.analytics import AnalyticsService, TransactionFrame, analyze
+
+def day(value: str) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+def test_analysis_of_a_small_frame():
+    # Id, day, amount, category, type code (0 expense, 1 income)
+    rows = [(1, day("2025-01-06"), 100, 10, 0), (2, day("2025-01-10"), 50, 11, 0), (3, day("2025-01-31"), 1000, 20, 1),
+            (4, day("2025-02-03"), 300, 10, 0), (5, day("2025-02-28"), 900, 20, 1)]
+    names = {10: "Groceries", 11: "Transport", 20: "Salary"}
+    summary = analyze(TransactionFrame.from_rows(rows), names, [(10, 2025, 2, 250), (11, 2025, 1, 80)],
+                      date(2025, 1, 1), date(2025, 3, 1), date(2025, 3, 5))
+
+    expenses = summary["categories"]["expenses"]
+    assert expenses["total"] == 450 and expenses["by_category"][0] == {"category": "Groceries", "total": 400, "count": 2, "share": 0.8889}
+    assert [month["net"] for month in summary["monthly"]["months"]] == [850, 600]
+    assert summary["budget_compliance"]["over_budget"] == [{"category": "Groceries", "month": "2025-02", "budget": 250, "spent": 300, "over_by": 50}]
+    # 2025-01-06 and 2025-02-03 were Mondays, 2025-01-10 a Friday
+    weekdays = {entry["day"]: entry["total"] for entry in summary["habits"]["by_weekday"]}
+    assert weekdays["Monday"] == 400 and weekdays["Friday"] == 50 and summary["habits"]["highest_spending_day"] == "Monday"
+    assert summary["projection"] is None
+
+def test_summary_matches_sql_aggregates(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    SyntheticDataGenerator(storage, months=12, batch_size=1000).generate(users=2, transactions=4000)
+    service = AnalyticsService(ConnectionPool(storage.connect), storage)
+    summary = json.loads(service.analyze(1, "2000-01-01"))
+
+    conn = storage.connect()
+    count, expenses = conn.execute("SELECT COUNT(*), SUM(CASE WHEN Type = 'Expense' THEN Amount ELSE 0 END) FROM Transactions WHERE UserId = 1").fetchone()
+    assert summary["range"]["transactions"] == count
+    assert abs(summary["categories"]["expenses"]["total"] - expenses) < 0.01
+    monthly = dict(conn.execute("SELECT strftime('%Y-%m', Date), SUM(Amount) FROM Transactions WHERE UserId = 1 AND Type = 'Expense' GROUP BY 1").fetchall())
+    assert all(abs(month["expenses"] - monthly.get(month["month"], 0)) < 0.01 for month in summary["monthly"]["months"])
+    assert all(outlier["description"] for outlier in summary["outliers"])
+    assert "error" in json.loads(service.analyze(1, "2025-02-01", "2025-01-01"))
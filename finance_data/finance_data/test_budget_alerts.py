@@ -0,0 +1,35 @@
+from datetime import date
+
+from finance_data.budget_alerts import BudgetAlertEvaluator
+from finance_data.test_transaction_writer import make_writer, receipt_item
+
+def test_thresholds_raise_one_alert_each(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    today = date.today()
+    conn = storage.connect()
+    conn.execute("INSERT INTO Budget (CategoryId, Year, Month, Amount, UserId) VALUES (1, ?, ?, 100, 1)", (today.year, today.month))
+    conn.commit()
+    # Without forecast nor run rate, only the thresholds
+    writer.alerts = BudgetAlertEvaluator("sqlite", projection_min_days=32)
+    now = today.isoformat()
+
+    writer.record(1, [receipt_item(Date=now, Amount=50)])
+    writer.record(1, [receipt_item(Date=now, Amount=35, Description="Dinner")])
+    writer.record(1, [receipt_item(Date=now, Amount=20, Description="Lunch"), receipt_item(Date=now, Amount=5, Description="Soda")])
+    writer.record(1, [receipt_item(Date=now, Amount=10, Description="Coffee")])
+    # Other months don't raise alerts
+    writer.record(1, [receipt_item(Date="2020-01-15", Amount=500, Description="Old")])
+
+    alerts = conn.execute("SELECT Kind, Spent, Budget, DeliveredAt FROM BudgetAlerts ORDER BY Id").fetchall()
+    assert alerts == [("80%", 85, 100, None), ("100%", 110, 100, None)]
+    assert writer.metrics.alerts == 2
+
+def test_projection_crosses_the_budget_once():
+    evaluator = BudgetAlertEvaluator("sqlite")
+    today = date(2025, 4, 10)
+    # 40 spent in 10 of 30 days projects 120
+    assert evaluator.crossings(100, 30, 40, None, None, today) == [("projected", 120.0)]
+    assert evaluator.crossings(100, 40, 45, None, None, today) == []
+    # The nightly forecast expected 30 more after the 20 spent until yesterday
+    assert evaluator.crossings(100, 60, 75, 50, 20, today) == [("projected", 105.0)]
+    assert evaluator.crossings(100, 30, 40, None, None, date(2025, 4, 3)) == []
@@ -0,0 +1,114 @@
+import time
+import asyncio
+import inspect
+import sqlite3
+import threading
+import pytest
+
+from finance_data.db_pool import ConnectionPool, DatabaseExecutor, PoolTimeoutError
+
+def make_pool(**kwargs):
+    connects = []
+
+    def connect():
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        connects.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), connects
+
+def test_connection_is_reused():
+    pool, connects = make_pool()
+    for _ in range(5):
+        with pool.connection() as conn:
+            assert conn.execute("SELECT 1").fetchall() == [(1,)]
+    assert len(connects) == 1
+    assert pool.metrics.reused == 4
+    assert pool.metrics.statements_reused == 4
+
+def test_pool_is_bounded():
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+    # The slot is free again
+    with pool.connection():
+        pass
+
+def test_concurrent_checkouts_never_exceed_max_size():
+    pool, connects = make_pool(max_size=3)
+    in_use, peak = [0], [0]
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(20):
+            with pool.connection() as conn:
+                with lock:
+                    in_use[0] += 1
+                    peak[0] = max(peak[0], in_use[0])
+                conn.execute("SELECT 1").fetchall()
+                with lock:
+                    in_use[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 3
+    assert len(connects) <= 3
+
+def test_failed_health_check_replaces_connection():
+    pool, connects = make_pool(health_check_interval=0)
+    with pool.connection():
+        pass
+    connects[0].close()
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchall() == [(1,)]
+    assert len(connects) == 2
+    assert pool.metrics.failed_health_checks == 1
+
+def test_idle_connections_are_evicted():
+    pool, connects = make_pool(max_idle_seconds=0)
+    with pool.connection():
+        pass
+    assert pool.evict_idle() == 1
+    with pool.connection():
+        pass
+    assert len(connects) == 2
+
+def test_error_rolls_back_and_returns_connection():
+    pool, connects = make_pool()
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO t VALUES (?)", (1,))
+            raise ValueError("boom")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchall() == [(0,)]
+    assert len(connects) == 1
+
+def test_database_executor_overlaps_blocking_calls():
+    executor = DatabaseExecutor(max_workers=4)
+
+    def slow_lookup(user_id: int) -> str:
+        """Looks up something slowly."""
+        time.sleep(0.1)
+        return str(user_id)
+
+    lookup = executor.wrap(slow_lookup)
+    assert lookup.__name__ == "slow_lookup" and lookup.__doc__ == slow_lookup.__doc__
+    assert list(inspect.signature(lookup).parameters) == ["user_id"]
+
+    async def run():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(lookup(i) for i in range(4)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    executor.shutdown()
+    assert results == ["0", "1", "2", "3"]
+    assert elapsed < 0.3
@@ -0,0 +1,42 @@
+from datetime import date
+
+import numpy as np
+
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.forecasting import fit, run_forecasts
+
+def test_fit_recovers_trend_and_season():
+    months = np.arange(24)
+    trend = 100 + 5 * months
+    seasonal = trend + 30 * np.sin(2 * np.pi * (months % 12) / 12)
+    forecasts, sigma, method = fit(np.column_stack([trend, seasonal]).astype(float), 0, np.array([24, 27]))
+    assert method == "seasonal"
+    assert np.allclose(forecasts[:, 0], [220, 235]) and np.allclose(forecasts[:, 1], [220, 235 + 30])
+
+    forecasts, _, method = fit(np.array([[50.0], [70.0]]), 0, np.array([2]))
+    assert method == "mean" and np.isclose(forecasts[0, 0], 60)
+
+def test_nightly_batch_writes_forecasts_next_to_budgets(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    SyntheticDataGenerator(storage, months=18, batch_size=1000).generate(users=3, transactions=6000)
+    today = date.today()
+    conn = storage.connect()
+    groceries = conn.execute("SELECT Id FROM Categories WHERE UserId = 1 AND Name = 'Groceries'").fetchone()[0]
+    conn.execute("UPDATE Budget SET Amount = 1 WHERE UserId = 1 AND CategoryId = ? AND Year = ? AND Month = ?",
+                 (groceries, today.year, today.month))
+    conn.commit()
+
+    report = run_forecasts(storage, workers=2, chunk_size=2, months_ahead=2, today=today)
+    assert report.users == 3 and report.forecasts == conn.execute("SELECT COUNT(*) FROM SpendingForecasts").fetchone()[0]
+    rows = conn.execute("""SELECT f.Month, f.Forecast, f.Lower, f.Upper, f.SpentToDate, f.Budget, f.ExceedProbability
+                           FROM SpendingForecasts f WHERE f.UserId = 1 AND f.CategoryId = ? ORDER BY f.Year, f.Month""", (groceries,)).fetchall()
+    assert len(rows) == 3 and rows[0][0] == today.month
+    month, forecast, lower, upper, spent, budget, probability = rows[0]
+    assert lower <= forecast <= upper and forecast >= spent and budget == 1
+    assert probability == 1 if spent > 1 else probability > 0.5
+
+    # Rerunning replaces the forecasts
+    run_forecasts(storage, workers=1, months_ahead=2, today=today)
+    assert conn.execute("SELECT COUNT(*) FROM SpendingForecasts").fetchone()[0] == report.forecasts
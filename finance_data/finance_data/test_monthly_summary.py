@@ -0,0 +1,56 @@
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.monthly_summary import rebuild_monthly_summary
+from finance_data.migrations import apply_migrations
+
+SUMMARY_SQL = "SELECT * FROM MonthlySummary ORDER BY UserId, Year, Month, CategoryId, Type"
+
+def test_triggers_keep_summary_equal_to_rebuild(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    SyntheticDataGenerator(storage, months=3, batch_size=100).generate(users=2, transactions=600)
+
+    conn = storage.connect()
+    conn.execute("UPDATE Transactions SET Amount = Amount * 3 WHERE Id % 7 = 0")
+    conn.execute("UPDATE Transactions SET Date = datetime(Date, '-1 month'), CategoryId = CategoryId + 1 WHERE Id % 11 = 0 AND CategoryId < 10")
+    conn.execute("DELETE FROM Transactions WHERE Id % 5 = 0")
+    conn.commit()
+    maintained = conn.execute(SUMMARY_SQL).fetchall()
+
+    report = rebuild_monthly_summary(storage)
+    assert report.rows == len(maintained)
+    assert conn.execute(SUMMARY_SQL).fetchall() == maintained
+    count, total = conn.execute("SELECT SUM(TransactionCount), ROUND(SUM(Total), 2) FROM MonthlySummary").fetchone()
+    assert (count, total) == conn.execute("SELECT COUNT(*), ROUND(SUM(Amount), 2) FROM Transactions").fetchone()
+
+def test_rebuild_one_user(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    SyntheticDataGenerator(storage, months=2, batch_size=100).generate(users=2, transactions=200)
+    conn = storage.connect()
+    conn.execute("DELETE FROM MonthlySummary")
+    conn.commit()
+
+    rebuild_monthly_summary(storage, user_id=2)
+    assert conn.execute("SELECT DISTINCT UserId FROM MonthlySummary").fetchall() == [(2,)]
+
+def test_migration_backfills_the_existing_transactions(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize(migrate=False)
+    conn = storage.connect()
+    apply_migrations(conn, "sqlite", target=1)
+    conn.executescript("""
+        INSERT INTO Users (Id, Name, Email) VALUES (1, 'Ana', 'ana@example.com');
+        INSERT INTO Accounts (Id, Name, Type, UserId) VALUES (1, 'Cash', 'Cash', 1);
+        INSERT INTO Categories (Id, Name, Type, UserId) VALUES (1, 'Restaurants', 'Expense', 1), (2, 'Salary', 'Income', 1);
+        INSERT INTO Transactions (Type, AccountId, CategoryId, UserId, Date, Amount, Description)
+        VALUES ('Expense', 1, 1, 1, '2025-03-02', 10.5, 'Lunch'), ('Expense', 1, 1, 1, '2025-03-20', 4, 'Coffee'),
+               ('Income', 1, 2, 1, '2025-04-01', 1000, 'Salary');
+    """)
+    conn.commit()
+
+    apply_migrations(conn, "sqlite")
+    assert conn.execute(SUMMARY_SQL).fetchall() == [(1, 2025, 3, 1, "Expense", 14.5, 2, 4, 10.5), (1, 2025, 4, 2, "Income", 1000, 1, 1000, 1000)]
+    # Kept in sync from then on by the triggers
+    conn.execute("INSERT INTO Transactions (Type, AccountId, CategoryId, UserId, Date, Amount) VALUES ('Expense', 1, 1, 1, '2025-03-25', 20)")
+    assert conn.execute("SELECT Total, TransactionCount FROM MonthlySummary WHERE Month = 3").fetchone() == (34.5, 3)
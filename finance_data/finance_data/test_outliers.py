@@ -0,0 +1,60 @@
+import random
+import statistics
+
+from finance_data.outliers import OutlierDetector, RunningStatistics
+from finance_data.statement_import import StatementImporter
+from finance_data.test_transaction_writer import make_writer, receipt_item
+
+def test_running_statistics_track_the_amounts():
+    rng = random.Random(7)
+    amounts = [rng.lognormvariate(3.8, 0.5) for _ in range(5000)]
+    current = RunningStatistics()
+    for amount in amounts:
+        current.update(amount)
+
+    assert current.count == 5000
+    assert abs(current.mean - statistics.fmean(amounts)) < 1e-6
+    assert abs(current.std - statistics.stdev(amounts)) < 1e-6
+    median = statistics.median(amounts)
+    mad = statistics.median(abs(amount - median) for amount in amounts)
+    assert abs(current.median - median) / median < 0.1
+    assert abs(current.mad - mad) / mad < 0.15
+
+def test_unusual_amount_is_flagged_when_recorded(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    writer.outliers, writer.dialect = OutlierDetector("sqlite"), "sqlite"
+    for day, amount in enumerate([11, 13, 12.5, 9.8, 14, 12, 10.5, 13.5, 12.2, 11.8], start=1):
+        result = writer.record(1, [receipt_item(Date=f"2025-04-{day:02d}", Amount=amount)])
+        assert "outliers" not in result
+
+    result = writer.record(1, [receipt_item(Date="2025-04-20", Amount=125, Description="Burger party"),
+                               receipt_item(Date="2025-04-20", Amount=12.9)])
+    assert result["Result"] == "Success"
+    assert [outlier["Description"] for outlier in result["outliers"]] == ["Burger party"]
+    assert 11 < result["outliers"][0]["UsualAmount"] < 13
+
+    conn = storage.connect()
+    assert conn.execute("SELECT Count FROM CategoryStatistics WHERE UserId = 1 AND CategoryId = 1").fetchone()[0] == 12
+    flagged = conn.execute("SELECT t.Description FROM TransactionOutliers o JOIN Transactions t ON t.Id = o.TransactionId").fetchall()
+    assert flagged == [("Burger party",)]
+
+    # The backfill rebuilds the same statistics and flags from the history
+    conn.execute("DELETE FROM TransactionOutliers")
+    conn.commit()
+    report = OutlierDetector("sqlite").backfill(storage)
+    assert report.transactions == 12 and report.outliers == 1
+    assert conn.execute("SELECT COUNT(*) FROM TransactionOutliers").fetchone()[0] == 1
+
+def test_statement_import_updates_the_statistics_per_batch(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    amounts = [11, 13, 12.5, 9.8, 14, 12, 10.5, 13.5, 12.2, 11.8, 125]
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Description,Amount\n" + "".join(f"2025-04-{day:02d},Restaurants,-{amount}\n"
+                                                         for day, amount in enumerate(amounts, start=1)), encoding="utf-8")
+    importer = StatementImporter(writer.pool, batch_size=4, outliers=OutlierDetector("sqlite"))
+
+    report = importer.import_file(path, user_id=1, account_id=1)
+    assert report.rows_imported == 11 and report.outliers == 1
+    conn = storage.connect()
+    assert conn.execute("SELECT Count FROM CategoryStatistics WHERE UserId = 1 AND CategoryId = 1").fetchone()[0] == 11
+    assert conn.execute("SELECT Amount FROM TransactionOutliers").fetchall() == [(125,)]
@@ -0,0 +1,47 @@
+import json
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.query_cache import QueryResultCache, canonicalize_sql
+from finance_data.sql_query import SqlQueryService
+
+def test_equivalent_queries_share_a_canonical_form():
+    query = """SELECT t.Amount, c.Name FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId
+               WHERE t.UserId = 1 AND t.Type = N'Expense' -- last month
+               ORDER BY t.Amount;"""
+    same = "select tr.amount,cat.name from [Transactions] as tr join Categories AS cat on cat.Id=tr.CategoryId where tr.Type='Expense' and tr.UserId=1 order by tr.Amount"
+    assert canonicalize_sql(query) == canonicalize_sql(same)
+
+    # Literals, OR groups and column aliases still make a difference
+    assert canonicalize_sql("SELECT Id FROM Transactions WHERE Description = 'Taxi'") != canonicalize_sql("SELECT Id FROM Transactions WHERE Description = 'taxi'")
+    assert canonicalize_sql("SELECT Id FROM Transactions WHERE (A = 1 OR B = 2) AND C = 3") != canonicalize_sql("SELECT Id FROM Transactions WHERE (A = 1 OR C = 3) AND B = 2")
+    assert canonicalize_sql("SELECT SUM(Amount) AS Total FROM Transactions") != canonicalize_sql("SELECT SUM(Amount) AS Spent FROM Transactions")
+
+def test_lru_eviction_by_bytes():
+    cache = QueryResultCache(max_bytes=25, max_entry_bytes=20)
+    for name in ("a", "b", "c"):
+        cache.get_or_load(1, f"SELECT '{name}'", 0, lambda: "x" * 10)
+    assert cache.metrics.evictions == 1 and cache.metrics.bytes == 20
+    cache.get_or_load(1, "SELECT 'b'", 0, lambda: "miss")
+    assert cache.metrics.hits == 1
+    assert cache.get_or_load(1, "SELECT 'big'", 0, lambda: "y" * 30) == "y" * 30
+    assert cache.metrics.bytes == 20
+
+def test_writes_bump_the_data_version(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    SyntheticDataGenerator(storage, months=2, batch_size=100).generate(users=2, transactions=100)
+    service = SqlQueryService(ConnectionPool(storage.connect), storage, cache=QueryResultCache())
+    query = "SELECT COUNT(*) AS Count FROM Transactions WHERE UserId = 1"
+
+    assert json.loads(service.fetch(1, query))["ResultSets"]["Table1"] == [{"Count": 50}]
+    service.fetch(1, "select count(*) as Count from Transactions where UserId = 1;")
+    assert service.cache.metrics.hits == 1
+
+    conn = storage.connect()
+    conn.execute("DELETE FROM Transactions WHERE Id = (SELECT MAX(Id) FROM Transactions WHERE UserId = 1)")
+    conn.commit()
+    assert json.loads(service.fetch(1, query))["ResultSets"]["Table1"] == [{"Count": 49}]
+    assert service.cache.metrics.stale == 1
+    assert "error" in json.loads(service.fetch(1, "SELECT Nope FROM Transactions"))
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.sql_guard import SqlGuard, QueryRejectedError
+from finance_data.sql_query import SqlQueryService
+
+def test_queries_are_scoped_limited_and_made_sargable():
+    guard = SqlGuard(max_rows=100)
+    guarded = guard.check(1, """SELECT c.Name, SUM(t.Amount) AS Total FROM Transactions t WITH (NOLOCK)
+                                JOIN Categories AS c ON c.Id = t.CategoryId
+                                WHERE YEAR(t.Date) = 2025 AND MONTH(t.Date) = 2 AND t.Description <> 'YEAR(t.Date) = 2024'
+                                GROUP BY c.Name""")
+    assert "FROM (SELECT * FROM Transactions WHERE UserId = 1) AS t" in guarded.sql
+    assert "JOIN (SELECT * FROM Categories WHERE UserId = 1) AS c ON" in guarded.sql
+    assert "(t.Date >= '2025-02-01' AND t.Date < '2025-03-01')" in guarded.sql
+    assert "'YEAR(t.Date) = 2024'" in guarded.sql and "NOLOCK" not in guarded.sql
+    assert guarded.sql.startswith("SELECT TOP (100) c.Name")
+
+    assert guard.check(1, "SELECT TOP 5000 Id FROM Transactions").sql.startswith("SELECT TOP 100 Id")
+    assert guard.check(1, "SELECT DISTINCT TOP (10) Type FROM Transactions").sql.startswith("SELECT DISTINCT TOP (10) Type")
+    assert guard.check(1, "SELECT Id FROM Transactions WHERE DATEPART(week, Date) = 3").warnings
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM Transactions",
+    "SELECT Id FROM Transactions; DROP TABLE Users",
+    "SELECT Id INTO Copy FROM Transactions",
+    "SELECT Id FROM Transactions WHERE UserId = 2",
+    "SELECT name FROM sys.tables",
+    "SELECT a.Id FROM Transactions a, Transactions b, Transactions c",
+    "SELECT name FROM (sys.tables)",
+    'SELECT * FROM "Transactions"',
+    "WITH A AS (SELECT * FROM dbo.Transactions), Transactions AS (SELECT 1 AS Id) SELECT * FROM A",
+    "WITH A AS (SELECT * FROM main.Transactions), Transactions AS (SELECT 1 AS Id) SELECT * FROM A",
+    "WITH A AS (SELECT * FROM B), B AS (SELECT Id FROM Transactions) SELECT * FROM A",
+    "WITH A AS (SELECT Id FROM Transactions) SELECT * FROM dbo.A",
+])
+def test_unsafe_queries_are_rejected(query):
+    guard = SqlGuard(max_cost=1_000_000)
+    with pytest.raises(QueryRejectedError):
+        guard.check(1, query, {"TRANSACTIONS": 1000})
+    assert guard.metrics.rejected == 1
+
+@pytest.mark.parametrize("query, tables", [
+    ("SELECT * FROM (SELECT 1 AS x) d, Transactions", ["Transactions"]),
+    ("SELECT * FROM Accounts a JOIN Categories c ON c.UserId = a.UserId, Transactions", ["Accounts", "Categories", "Transactions"]),
+    ("SELECT * FROM (Transactions t JOIN Accounts a ON a.Id = t.AccountId)", ["Transactions", "Accounts"]),
+    ("SELECT Id, COALESCE(Amount, 0) FROM Transactions WHERE AccountId IN (SELECT Id FROM Accounts, Budget) ORDER BY Id, Date", ["Transactions", "Accounts", "Budget"]),
+    ("WITH m AS (SELECT AccountId, SUM(Amount) AS Total FROM Transactions GROUP BY AccountId), t AS (SELECT * FROM m) "
+     "SELECT a.Name, t.Total FROM t JOIN Accounts a ON a.Id = t.AccountId", ["Transactions", "Accounts"]),
+])
+def test_every_table_of_the_from_clauses_is_scoped(query, tables):
+    sql = SqlGuard().check(1, query, {"TRANSACTIONS": 10, "ACCOUNTS": 10, "BUDGET": 10}).sql
+    for table in tables:
+        assert f"(SELECT * FROM {table} WHERE UserId = 1)" in sql
+    assert sql.count("WHERE UserId = 1") == len(tables)
+    # The Budget column of SpendingForecasts is not a table
+    assert "Budget FROM (SELECT * FROM SpendingForecasts" in SqlGuard().check(1, "SELECT f.Budget, Budget FROM SpendingForecasts f").sql
+
+def test_guarded_queries_run_on_sqlite(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    SyntheticDataGenerator(storage, months=2, batch_size=100).generate(users=2, transactions=200)
+    service = SqlQueryService(ConnectionPool(storage.connect), storage, guard=SqlGuard(max_rows=10))
+
+    rows = json.loads(service.fetch(1, "SELECT Id, UserId FROM Transactions WHERE DATEDIFF(day, Date, GETDATE()) <= 100000"))["ResultSets"]["Table1"]
+    assert len(rows) == 10 and {row["UserId"] for row in rows} == {1}
+    count = json.loads(service.fetch(1, "SELECT COUNT(*) AS Count FROM Transactions t JOIN Accounts a ON a.Id = t.AccountId"))
+    assert count["ResultSets"]["Table1"] == [{"Count": 100}]
+    assert json.loads(service.fetch(1, "UPDATE Transactions SET Amount = 0"))["error"].startswith("Query rejected")
+
+    # The user filter of the derived table still seeks the (UserId, Date) index
+    guarded = service.guard.check(1, "SELECT SUM(Amount) FROM Transactions WHERE YEAR(Date) = 2025")
+    conn = storage.connect()
+    plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + storage.translate(guarded.sql)))
+    assert "IX_Transactions_UserId_Date (UserId=? AND Date>? AND Date<?)" in plan
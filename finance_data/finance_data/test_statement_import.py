@@ -0,0 +1,151 @@
+import io
+import sqlite3
+import pytest
+from decimal import Decimal
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.duplicates import DuplicateDetector
+from finance_data.storage import SqliteStorage
+from finance_data.statement_import import StatementImporter, StatementFormatError, detect_date_format, parse_csv, parse_ofx, parse_qif, parse_amount, statement_url
+
+sqlite3.register_adapter(Decimal, str)
+
+CSV = """Date,Description,Amount
+2025-01-03,SUPERMARKET GROCERIES,-54.20
+2025-01-05,ACME PAYROLL Salary,"2,500.00"
+not a date,BROKEN,-1
+2025-01-07,Coffee shop,(3.50)
+"""
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250110120000[-5:EST]<TRNAMT>-12.99<FITID>1<NAME>STREAMING<MEMO>Monthly plan
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250115<TRNAMT>100.00<FITID>2<NAME>REFUND</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+QIF = """!Type:Bank
+D1/15'25
+T-1,234.56
+PRent January
+LHousing:Rent
+^
+D01/20/2025
+U15.00
+PGift
+^
+"""
+
+def make_pool():
+    def connect():
+        return sqlite3.connect("file:statements?mode=memory&cache=shared", uri=True, check_same_thread=False)
+
+    keep_alive = connect()
+    keep_alive.executescript("""
+        DROP TABLE IF EXISTS Accounts; DROP TABLE IF EXISTS Categories; DROP TABLE IF EXISTS Transactions;
+        CREATE TABLE Accounts (Id INTEGER PRIMARY KEY, Name TEXT, UserId INTEGER);
+        CREATE TABLE Categories (Id INTEGER PRIMARY KEY, Name TEXT, Type TEXT, UserId INTEGER);
+        CREATE TABLE Transactions (Id INTEGER PRIMARY KEY, Type TEXT, AccountId INTEGER, CategoryId INTEGER,
+            UserId INTEGER, Date TEXT, Amount REAL, Description TEXT, AttachmentUrl TEXT);
+        INSERT INTO Accounts VALUES (1, 'Checking', 7);
+        INSERT INTO Categories VALUES (1, 'Groceries', 'Expense', 7), (2, 'Salary', 'Income', 7),
+            (3, 'Uncategorized', 'Expense', 7), (4, 'Housing', 'Expense', 7), (5, 'Other', 'Income', 7);
+    """)
+    return ConnectionPool(connect), keep_alive
+
+def test_parse_amount_formats():
+    assert parse_amount("1,234.56") == Decimal("1234.56")
+    assert parse_amount("1.234,56") == Decimal("1234.56")
+    assert parse_amount("(3.50)") == Decimal("-3.50")
+    assert parse_amount("$ -12") == Decimal("-12")
+
+def test_parsers_yield_rows_and_errors():
+    csv_rows = list(parse_csv(io.StringIO(CSV)))
+    assert len(csv_rows) == 4 and isinstance(csv_rows[2], ValueError)
+    assert csv_rows[1].amount == Decimal("2500.00")
+
+    ofx_rows = list(parse_ofx(io.StringIO(OFX)))
+    assert [row.amount for row in ofx_rows] == [Decimal("-12.99"), Decimal("100.00")]
+    assert ofx_rows[0].description == "STREAMING - Monthly plan"
+
+    qif_rows = list(parse_qif(io.StringIO(QIF)))
+    assert qif_rows[0].category == "Housing" and qif_rows[0].date.year == 2025
+    assert qif_rows[1].amount == Decimal("15.00")
+
+def test_import_maps_categories_and_commits_in_chunks(tmp_path):
+    pool, keep_alive = make_pool()
+    path = tmp_path / "statement.csv"
+    path.write_text(CSV, encoding="utf-8")
+
+    report = StatementImporter(pool, batch_size=1, commit_every=2).import_file(path, user_id=7, account_id=1)
+
+    assert (report.rows_read, report.rows_imported, report.rows_skipped) == (4, 3, 1)
+    assert report.batches == 3 and report.commits == 2
+    rows = keep_alive.execute("SELECT Type, CategoryId, Amount FROM Transactions ORDER BY Id").fetchall()
+    assert rows == [("Expense", 1, 54.2), ("Income", 2, 2500.0), ("Expense", 3, 3.5)]
+
+def test_the_date_format_is_detected_once_per_file(tmp_path):
+    assert detect_date_format(["01/02/2025", "25/02/2025", "oops", "03/03/2025"]) == "%d/%m/%Y"
+    assert detect_date_format(["01/02/2025", "02/25/2025"]) == "%m/%d/%Y"
+    assert detect_date_format(["2025-01-03", "2025-01-03"]) == "%Y-%m-%d" and detect_date_format([]) is None
+    with pytest.raises(StatementFormatError, match="Unrecognized"):
+        detect_date_format(["yesterday"])
+
+    # 01/02/2025 and 03/04/2025 read both ways, nothing in the file tells which
+    pool, keep_alive = make_pool()
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Description,Amount\n01/02/2025,Groceries,-5\n03/04/2025,Groceries,-6\n", encoding="utf-8")
+    with pytest.raises(StatementFormatError, match="Ambiguous"):
+        StatementImporter(pool).import_file(path, user_id=7, account_id=1)
+    report = StatementImporter(pool).import_file(path, user_id=7, account_id=1, date_format="%d/%m/%Y")
+    assert report.rows_imported == 2
+    assert keep_alive.execute("SELECT MIN(Date) FROM Transactions").fetchone()[0].startswith("2025-02-01")
+
+def test_import_rejects_account_of_another_user(tmp_path):
+    pool, _ = make_pool()
+    path = tmp_path / "statement.qif"
+    path.write_text(QIF, encoding="utf-8")
+    with pytest.raises(ValueError, match="does not belong"):
+        StatementImporter(pool).import_file(path, user_id=8, account_id=1)
+
+@pytest.mark.parametrize("url", [
+    "https://attacker.example/statements/statement.csv",
+    "https://account.blob.core.windows.net/other/statement.csv",
+    "https://account.blob.core.windows.net.attacker.example/uploads/statement.csv",
+    "http://account.blob.core.windows.net/uploads/statement.csv",
+    "https://account.blob.core.windows.net/uploads/../other/statement.csv",
+    "http://169.254.169.254/metadata/instance",
+    "file:///etc/passwd",
+])
+def test_statements_are_only_downloaded_from_the_upload_container(url, tmp_path):
+    account = "https://account.blob.core.windows.net"
+    assert statement_url(f"{account}/uploads/a1/statement.csv", account, "uploads") == f"{account}/uploads/a1/statement.csv"
+    local = (tmp_path / "statement.csv").as_uri()
+    assert statement_url(local, account, "uploads", str(tmp_path)) == local
+    with pytest.raises(StatementFormatError):
+        statement_url(url, account, "uploads", str(tmp_path))
+
+def test_importing_a_statement_twice_skips_the_duplicates(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    conn = storage.connect()
+    conn.executescript("""
+        INSERT INTO Users (Id, Name, Email) VALUES (7, 'Ana', 'ana@example.com');
+        INSERT INTO Accounts (Id, Name, Type, UserId) VALUES (1, 'Checking', 'Bank', 7);
+        INSERT INTO Categories (Id, Name, Type, UserId) VALUES (1, 'Groceries', 'Expense', 7), (2, 'Uncategorized', 'Expense', 7);
+    """)
+    conn.commit()
+    path = tmp_path / "statement.csv"
+    # Two identical coffees on the same day are two transactions of the statement
+    path.write_text("Date,Description,Amount\n2025-01-03,Groceries,-54.20\n2025-01-04,Coffee,-3.50\n2025-01-04,Coffee,-3.50\n"
+                    + "".join(f"2025-02-{day:02d},bad row,oops\n" for day in range(1, 16)), encoding="utf-8")
+    importer = StatementImporter(ConnectionPool(storage.connect), batch_size=2, duplicates=DuplicateDetector())
+
+    first = importer.import_file(path, user_id=7, account_id=1)
+    assert (first.rows_imported, first.duplicates) == (3, 0)
+    assert first.error_count == 15 and len(first.to_dict()["errors"]) == 10
+    second = importer.import_file(path, user_id=7, account_id=1)
+    assert (second.rows_imported, second.duplicates) == (0, 3)
+    assert conn.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM TransactionFingerprints").fetchone()[0] == 3
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from finance_data.storage import SqliteStorage, Storage, create_storage
+from finance_data.synthetic_data import SyntheticDataGenerator
+from finance_data.sql_dialect import translate_tsql_to_sqlite
+from finance_data.migrations import apply_migrations, applied_versions, discover_migrations
+
+ANALYZER_QUERIES = [
+    """SELECT TOP 5 c.Name, SUM(t.Amount) AS Total FROM Transactions t JOIN Categories c ON c.Id = t.CategoryId
+       WHERE t.UserId = 1 AND t.Type = N'Expense' AND t.Date >= DATEADD(month, -3, GETDATE())
+       GROUP BY c.Name ORDER BY Total DESC""",
+    """SELECT DATENAME(weekday, Date) AS DayOfWeek, COUNT(*) AS Count FROM Transactions
+       WHERE UserId = 1 GROUP BY DATENAME(weekday, Date) ORDER BY Count DESC""",
+    """SELECT FORMAT(Date, 'yyyy-MM') AS Month,
+       SUM(CASE WHEN Type = 'Income' THEN Amount ELSE 0 END) - SUM(CASE WHEN Type = 'Expense' THEN Amount ELSE 0 END) AS Net
+       FROM [Transactions] WITH (NOLOCK) WHERE UserId = 1 GROUP BY FORMAT(Date, 'yyyy-MM')
+       ORDER BY Month OFFSET 0 ROWS FETCH NEXT 12 ROWS ONLY""",
+    """SELECT c.Name, b.Amount AS Budget, ISNULL(SUM(t.Amount), 0) AS Spent FROM Budget b
+       JOIN Categories c ON c.Id = b.CategoryId
+       LEFT JOIN Transactions t ON t.CategoryId = b.CategoryId AND YEAR(t.Date) = b.Year AND MONTH(t.Date) = b.Month
+       WHERE b.UserId = 1 AND b.Year = YEAR(GETDATE()) AND b.Month = MONTH(GETDATE()) GROUP BY c.Name, b.Amount""",
+    """SELECT * FROM (SELECT TOP (3) Id, CAST(Amount AS DECIMAL(10,2)) AS Amount FROM Transactions
+       WHERE UserId = 1 AND CAST(Date AS DATE) <= EOMONTH(GETDATE()) ORDER BY Amount DESC) x""",
+]
+
+def test_sqlite_storage_uses_wal(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    conn = storage.connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "IX_Transactions_UserId_Date" in indexes
+
+def test_create_storage_defers_the_database_to_the_first_connection(tmp_path, monkeypatch):
+    path = tmp_path / "finance.db"
+    monkeypatch.setenv("DATABASE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_DATABASE_PATH", str(path))
+    storage = create_storage()
+    assert not path.exists()
+    conn = storage.connect()
+    assert conn.execute("SELECT COUNT(*) FROM SchemaMigrations").fetchone()[0] > 0
+    with pytest.raises(TypeError):
+        Storage()
+
+def test_migrations_apply_once_in_order(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize(migrate=False)
+    conn = storage.connect()
+    indexes = lambda: {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "IX_Transactions_UserId_CategoryId_Date" not in indexes()
+
+    applied = apply_migrations(conn, "sqlite")
+    assert [migration.version for migration in applied] == [migration.version for migration in discover_migrations("sqlite")]
+    assert {"IX_Transactions_UserId_Date", "IX_Transactions_UserId_CategoryId_Date", "IX_Accounts_UserId"} <= indexes()
+    assert apply_migrations(conn, "sqlite") == []
+    assert applied_versions(conn, "sqlite") == {migration.version for migration in applied}
+    # Every backend has the same migrations
+    assert [m.version for m in discover_migrations("tsql")] == [m.version for m in applied]
+
+def test_every_migration_target_accepts_writes(tmp_path):
+    # Each migration only depends on earlier ones, so the database works at any --target
+    for migration in discover_migrations("sqlite"):
+        storage = SqliteStorage(tmp_path / f"finance-{migration.version}.db")
+        storage.initialize(migrate=False)
+        conn = storage.connect()
+        apply_migrations(conn, "sqlite", target=migration.version)
+        conn.executescript("""
+            INSERT INTO Users (Id, Name, Email) VALUES (1, 'Ana', 'ana@example.com');
+            INSERT INTO Accounts (Id, Name, Type, UserId) VALUES (1, 'Cash', 'Cash', 1);
+            INSERT INTO Categories (Id, Name, Type, UserId) VALUES (1, 'Restaurants', 'Expense', 1);
+            INSERT INTO Budget (UserId, CategoryId, Year, Month, Amount) VALUES (1, 1, 2025, 3, 100);
+            INSERT INTO Transactions (Type, AccountId, CategoryId, UserId, Date, Amount, Description)
+            VALUES ('Expense', 1, 1, 1, '2025-03-02', 120, 'Dinner');
+            UPDATE Transactions SET Amount = 90;
+            DELETE FROM Transactions;
+        """)
+        conn.commit()
+
+def test_generator_and_translated_analyzer_queries(tmp_path):
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    report = SyntheticDataGenerator(storage, months=6, batch_size=100).generate(users=3, transactions=1500)
+    assert report.users == 3 and report.transactions == 1500
+
+    conn = storage.connect()
+    assert conn.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 1500
+    for query in ANALYZER_QUERIES:
+        rows = conn.execute(storage.translate(query)).fetchall()
+        assert rows, query
+    assert len(conn.execute(storage.translate(ANALYZER_QUERIES[0])).fetchall()) == 5
+
+def test_translation_keeps_string_literals():
+    sql = translate_tsql_to_sqlite("SELECT TOP 1 Id FROM Transactions WHERE Description = 'GETDATE() [x] TOP 5'")
+    assert sql == "SELECT Id FROM Transactions WHERE Description = 'GETDATE() [x] TOP 5' LIMIT 1"
+
+def test_date_functions_match_tsql_semantics():
+    conn = sqlite3.connect(":memory:")
+    value = lambda sql: conn.execute("SELECT " + translate_tsql_to_sqlite(sql)).fetchone()[0]
+    assert value("DATEPART(weekday, '2025-06-01')") == 1  # Sunday
+    assert value("DATEDIFF(month, '2024-12-31', '2025-01-01')") == 1
+    assert value("DATEDIFF(day, '2025-01-01 23:00:00', '2025-01-02 01:00:00')") == 1
+    assert value("EOMONTH('2024-02-10')") == "2024-02-29"
+    assert value("DATEADD(day, -1, '2025-03-01')") == "2025-02-28 00:00:00"
+    assert value("DATENAME(month, '2025-03-15')") == "March"
+    assert value("DATEFROMPARTS(2025, 4, 1)") == "2025-04-01"
@@ -0,0 +1,93 @@
+import sqlite3
+
+from finance_data.db_pool import ConnectionPool
+from finance_data.storage import SqliteStorage
+from finance_data.transaction_writer import TransactionWriter
+from finance_data.duplicates import DuplicateDetector, Fingerprint
+
+def make_writer(tmp_path) -> tuple[TransactionWriter, SqliteStorage]:
+    storage = SqliteStorage(tmp_path / "finance.db")
+    storage.initialize()
+    conn = storage.connect()
+    conn.executescript("""
+        INSERT INTO Users (Id, Name, Email) VALUES (1, 'Ana', 'ana@example.com'), (2, 'Bob', 'bob@example.com');
+        INSERT INTO Accounts (Id, Name, Type, UserId) VALUES (1, 'Cash', 'Cash', 1), (2, 'Checking', 'Bank', 2);
+        INSERT INTO Categories (Id, Name, Type, UserId) VALUES (1, 'Restaurants', 'Expense', 1), (2, 'Salary', 'Income', 2);
+    """)
+    conn.close()
+    return TransactionWriter(ConnectionPool(storage.connect, max_size=1)), storage
+
+def receipt_item(**overrides) -> dict:
+    item = {"Type": "Expense", "AccountId": 1, "CategoryId": 1, "Date": "2025-04-20T14:30:00Z",
+            "Amount": 12.5, "Description": "Burger"}
+    item.update(overrides)
+    return item
+
+def test_records_every_item_in_one_call(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    result = writer.record(1, [receipt_item(), receipt_item(Amount="3.20", Description="Soda", AccountId="1")])
+
+    assert result["Result"] == "Success" and result["recorded"] == 2
+    rows = storage.connect().execute("SELECT Date, Amount, Description FROM Transactions ORDER BY Id").fetchall()
+    assert rows == [("2025-04-20 14:30:00", 12.5, "Burger"), ("2025-04-20 14:30:00", 3.2, "Soda")]
+    assert writer.metrics.writes == 1 and writer.metrics.rows == 2
+
+def test_invalid_item_rejects_the_whole_call(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    result = writer.record(1, [receipt_item(), receipt_item(CategoryId=2, Amount="abc", Date="yesterday")])
+
+    assert result["Result"] == "Error"
+    assert result["errors"][0].startswith("Transaction 2: ")
+    assert "CategoryId 2 is not a category of user 1" in result["errors"][0]
+    assert "is not a number" in result["errors"][0] and "ISO 8601" in result["errors"][0]
+    assert storage.connect().execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 0
+    assert writer.metrics.rejected == 1
+
+def test_negative_amount_is_rejected(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    result = writer.record(1, [receipt_item(Amount="-12.50")])
+
+    assert result["Result"] == "Error" and "Amount must be between 0.01" in result["errors"][0]
+    assert storage.connect().execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 0
+
+class RollbackCountingConnection(sqlite3.Connection):
+    rollbacks = 0
+
+    def rollback(self):
+        type(self).rollbacks += 1
+        super().rollback()
+
+def test_rejected_call_rolls_back_its_reads(tmp_path):
+    # pyodbc opens a transaction on the ownership read, which must not stay open on the pooled connection
+    writer, storage = make_writer(tmp_path)
+    writer.pool = ConnectionPool(lambda: sqlite3.connect(storage.path, factory=RollbackCountingConnection), max_size=1)
+    writer.record(1, [receipt_item(AccountId=2)])
+    assert RollbackCountingConnection.rollbacks == 1
+
+def test_duplicate_receipt_is_reported_before_insert(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    writer.duplicates, writer.dialect = DuplicateDetector(), "sqlite"
+    receipt = "https://example.blob.core.windows.net/receipts/" + "ab" * 32 + ".jpg"
+    assert writer.record(1, [receipt_item(AttachmentUrl=receipt)])["Result"] == "Success"
+
+    # Same receipt uploaded again the next day, the vision agent read another description
+    again = writer.record(1, [receipt_item(Date="2025-04-21", Description="Cheeseburger", AttachmentUrl=receipt)])
+    assert again["Result"] == "PossibleDuplicate"
+    assert again["duplicates"][0]["existing"]["reason"] == "same receipt"
+    # Same amount, other receipt: not a duplicate
+    other = writer.record(1, [receipt_item(AttachmentUrl=receipt.replace("ab", "cd"))])
+    assert other["Result"] == "Success"
+    # Re-said expense without attachment
+    assert writer.record(1, [receipt_item(Description="burger!")])["Result"] == "PossibleDuplicate"
+    assert writer.record(1, [receipt_item(Description="burger!")], allow_duplicates=True)["Result"] == "Success"
+    assert storage.connect().execute("SELECT COUNT(*) FROM TransactionFingerprints").fetchone()[0] == 3
+
+def test_backfill_fingerprints_existing_history(tmp_path):
+    writer, storage = make_writer(tmp_path)
+    writer.record(1, [receipt_item(), receipt_item(Amount=7)])
+    detector = DuplicateDetector()
+    assert detector.backfill(storage, batch_size=1).fingerprinted == 2
+    assert detector.backfill(storage).fingerprinted == 0
+
+    conn = storage.connect()
+    assert detector.find(conn, Fingerprint.of(1, "2025-04-19 10:00:00", "12.50", "BURGER", None))[0]["Id"] == 1
@@ -0,0 +1,57 @@
+import json
+import threading
+
+from finance_data.user_cache import UserDataCache
+
+def counting_loader(payload: dict):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return json.dumps(payload)
+
+    return load, calls
+
+def test_second_read_is_a_hit():
+    cache = UserDataCache()
+    load, calls = counting_loader({"accounts": []})
+    assert cache.get_or_load(1, "accounts", load) == '{"accounts": []}'
+    assert cache.get_or_load(1, "accounts", load) == '{"accounts": []}'
+    assert len(calls) == 1
+    assert cache.metrics.hits == 1 and cache.metrics.hit_ratio == 0.5
+
+def test_invalidate_only_drops_that_user():
+    cache = UserDataCache()
+    load, calls = counting_loader({"accounts": []})
+    cache.get_or_load(1, "accounts", load)
+    cache.get_or_load(2, "accounts", load)
+    cache.invalidate(1)
+    cache.get_or_load(1, "accounts", load)
+    cache.get_or_load(2, "accounts", load)
+    assert len(calls) == 3
+    assert cache.version(1) == 1 and cache.version(2) == 0
+
+def test_ttl_expires_entries():
+    cache = UserDataCache(ttl_seconds=0)
+    load, calls = counting_loader({"categories": []})
+    cache.get_or_load(1, ("categories", None), load)
+    cache.get_or_load(1, ("categories", None), load)
+    assert len(calls) == 2
+    assert cache.metrics.expirations == 1
+
+def test_load_racing_with_invalidate_is_not_stored():
+    cache = UserDataCache()
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait()
+        return "stale"
+
+    thread = threading.Thread(target=cache.get_or_load, args=(1, "accounts", slow_load))
+    thread.start()
+    loading.wait()
+    cache.invalidate(1)
+    release.set()
+    thread.join()
+    assert cache.get_or_load(1, "accounts", lambda: "fresh") == "fresh"
@@ -0,0 +1,252 @@
+import os
+from dotenv import load_dotenv
+import logging
+from typing import Any, Awaitable, Callable, Set, Dict, List, Optional
+import json
+import shutil
+import tempfile
+import urllib.parse
+from pathlib import Path
+
+from .db_pool import ConnectionPool, DatabaseExecutor
+from .user_cache import UserDataCache
+from .statement_import import StatementImporter, StatementFormatError, detect_format, statement_url, download_opener
+from .storage import create_storage
+from .transaction_writer import TransactionWriter
+from .duplicates import DuplicateDetector
+from .outliers import OutlierDetector
+from .budget_alerts import BudgetAlertEvaluator
+from .query_cache import QueryResultCache
+from .sql_query import SqlQueryService
+from .sql_guard import SqlGuard
+from .analytics import AnalyticsService
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Azure SQL, or an embedded SQLite database with DATABASE_BACKEND=sqlite.
+# Importing the tools doesn't touch the database: the first connection creates and migrates it
+storage = create_storage()
+
+# Database connection
+def get_db_connection():
+    return storage.connect()
+
+# Connections are shared by all user functions, so the TLS and login handshake happens once per connection
+pool = ConnectionPool(
+    connect=get_db_connection,
+    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "5")),
+    max_idle_seconds=float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300")),
+    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+)
+
+# Accounts and categories only change when the SetupAgent records one, the TTL covers writes nobody reported
+user_cache = UserDataCache(ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "300")))
+
+def invalidate_user_data(user_id: int) -> None:
+    """Call after record_account or record_category ran for the user."""
+    user_cache.invalidate(user_id)
+
+# Database interaction implementations
+def get_user_accounts(user_id: int) -> str:
+    """
+    Retrieves a list of accounts for the user.
+    :param user_id: The ID of the user.
+    :return: A list of accounts associated with the user.
+    :rtype: str
+    """
+    return user_cache.get_or_load(user_id, "accounts", lambda: load_user_accounts(user_id))
+
+def load_user_accounts(user_id: int) -> str:
+    with pool.connection() as conn:
+        cursor = conn.execute("SELECT Id, Name, Type FROM Accounts WHERE UserId = ?", (user_id,))
+        accounts = [{"id": row[0], "name": row[1], "type": row[2]} for row in cursor.fetchall()]
+    return json.dumps({"accounts": accounts})
+
+def get_transaction_categories(user_id: int, type: Optional[str] = None) -> str:
+    """
+    Retrieves a list of transaction categories for the user.
+    :param user_id: The ID of the user.
+    :param type: The type of categories to retrieve (e.g., 'income', 'expense').
+    :return: A list of transaction categories associated with the user.
+    :rtype: str
+    """
+    return user_cache.get_or_load(user_id, ("categories", type), lambda: load_transaction_categories(user_id, type))
+
+def load_transaction_categories(user_id: int, type: Optional[str] = None) -> str:
+    with pool.connection() as conn:
+        if type:
+            cursor = conn.execute("SELECT Id, Name, Description FROM Categories WHERE UserId = ? AND Type = ?",
+                                  (user_id, type))
+        else:
+            cursor = conn.execute("SELECT Id, Name, Description FROM Categories WHERE UserId = ?", (user_id,))
+
+        categories = [{"id": row[0], "name": row[1], "description": row[2]} for row in cursor.fetchall()]
+    return json.dumps({"categories": categories})
+
+# Budgets crossed by recorded or imported expenses (BUDGET_ALERT_THRESHOLDS percent, or projected above) are written
+# to BudgetAlerts in the same transaction, for the app to push into the user's chat
+budget_alerts = BudgetAlertEvaluator(
+    storage.dialect,
+    thresholds=tuple(float(value) / 100 for value in os.getenv("BUDGET_ALERT_THRESHOLDS", "80,100").split(",")),
+    projection_min_days=int(os.getenv("BUDGET_PROJECTION_MIN_DAYS", "7")),
+)
+
+# Near-duplicates: same amount within DUPLICATE_WINDOW_DAYS, same receipt or similar description
+duplicate_detector = DuplicateDetector(
+    window_days=int(os.getenv("DUPLICATE_WINDOW_DAYS", "1")),
+    min_similarity=float(os.getenv("DUPLICATE_MIN_SIMILARITY", "0.5")),
+)
+
+# Amounts far above the usual ones of their category are flagged in TransactionOutliers as they are recorded or imported
+outlier_detector = OutlierDetector(
+    storage.dialect,
+    min_count=int(os.getenv("OUTLIER_MIN_COUNT", "8")),
+    z_threshold=float(os.getenv("OUTLIER_Z_THRESHOLD", "4.0")),
+    robust_threshold=float(os.getenv("OUTLIER_ROBUST_THRESHOLD", "5.0")),
+)
+
+# Bank statements are inserted in batches of STATEMENT_IMPORT_BATCH_SIZE rows and committed every STATEMENT_IMPORT_COMMIT_ROWS;
+# rows that duplicate a transaction already recorded (e.g. the same statement imported twice) are skipped
+statement_importer = StatementImporter(
+    pool=pool,
+    batch_size=int(os.getenv("STATEMENT_IMPORT_BATCH_SIZE", "1000")),
+    commit_every=int(os.getenv("STATEMENT_IMPORT_COMMIT_ROWS", "10000")),
+    alerts=budget_alerts,
+    duplicates=duplicate_detector,
+    outliers=outlier_detector,
+)
+
+# Statements are only downloaded from the container the app uploads files to
+# (or from LOCAL_BLOB_STORAGE_PATH when the app runs with BLOB_STORAGE_BACKEND=local)
+STATEMENT_ACCOUNT_URL = os.getenv("AZURE_STORAGE_ACCOUNT_URL")
+STATEMENT_CONTAINER_NAME = os.getenv("AZURE_STORAGE_CONTAINER_NAME")
+STATEMENT_LOCAL_PATH = os.getenv("LOCAL_BLOB_STORAGE_PATH") if os.getenv("BLOB_STORAGE_BACKEND", "azure").lower() == "local" else None
+STATEMENT_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("STATEMENT_DOWNLOAD_TIMEOUT_SECONDS", "60"))
+
+def import_bank_statement(user_id: int, account_id: int, file_url: str, date_format: Optional[str] = None) -> str:
+    """
+    Imports all the transactions of a bank statement file (CSV, OFX or QIF) uploaded by the user.
+    :param user_id: The ID of the user.
+    :param account_id: The ID of the account the statement belongs to.
+    :param file_url: The statement file url provided in the conversation.
+    :param date_format: strptime format of the statement dates, e.g. %d/%m/%Y. Only needed when the import reports ambiguous dates; ask the user.
+    :return: A summary of the import (rows imported, rows skipped, duplicates skipped and the first errors).
+    :rtype: str
+    """
+    try:
+        file_url = statement_url(file_url, STATEMENT_ACCOUNT_URL, STATEMENT_CONTAINER_NAME, STATEMENT_LOCAL_PATH)
+        format = detect_format(urllib.parse.urlparse(file_url).path)
+    except StatementFormatError as e:
+        return json.dumps({"error": str(e)})
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The statement is streamed to disk, never held in memory
+        path = Path(directory) / f"statement.{format}"
+        try:
+            with download_opener.open(file_url, timeout=STATEMENT_DOWNLOAD_TIMEOUT_SECONDS) as response, open(path, "wb") as file:
+                shutil.copyfileobj(response, file)
+        except (StatementFormatError, OSError) as e:
+            return json.dumps({"error": f"Could not download the statement: {e}"})
+        try:
+            report = statement_importer.import_file(path, user_id=user_id, account_id=account_id, format=format, date_format=date_format)
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+    return json.dumps(report.to_dict())
+
+# Transactions are validated and inserted in-process instead of through the record_transaction Logic App.
+# Near-duplicates are reported before insert, and unusual amounts are flagged.
+transaction_writer = TransactionWriter(
+    pool,
+    dialect=storage.dialect,
+    duplicates=duplicate_detector,
+    outliers=outlier_detector,
+    alerts=budget_alerts,
+)
+
+def record_transaction(user_id: int, transactions: List[Dict[str, Any]], allow_duplicates: bool = False) -> str:
+    """
+    Records one or more transactions of the user at once, e.g. every item of a receipt.
+    Either all the transactions are recorded or none when one of them is invalid or a possible duplicate.
+    :param user_id: The ID of the user.
+    :param transactions: The transactions to record. Each one has Type (Income, Expense, Transfer or Investment),
+        AccountId, CategoryId, Date (ISO 8601), Amount, Description and optionally AttachmentUrl.
+    :param allow_duplicates: Record the transactions even if they look like already recorded ones. Only set it after the user confirmed.
+    :return: The number of transactions recorded with the unusual amounts among them, the validation errors, or the possible duplicates.
+    :rtype: str
+    """
+    return json.dumps(transaction_writer.record(user_id, transactions, allow_duplicates=allow_duplicates))
+
+# Repeated or equivalent queries and reports are answered from memory until the user's data changes
+query_cache = QueryResultCache(
+    max_bytes=int(os.getenv("QUERY_CACHE_MAX_MB", "32")) * 1024 * 1024,
+    max_entry_bytes=int(os.getenv("QUERY_CACHE_MAX_ENTRY_KB", "1024")) * 1024,
+)
+
+query_service = SqlQueryService(
+    pool,
+    storage,
+    cache=query_cache,
+    # Generated queries are scoped to the user, row-limited and timed out before they reach the database
+    guard=SqlGuard(
+        max_rows=int(os.getenv("QUERY_MAX_ROWS", "1000")),
+        max_cost=int(os.getenv("QUERY_MAX_COST", "2000000")),
+        timeout_seconds=float(os.getenv("QUERY_TIMEOUT_SECONDS", "10")),
+    ),
+)
+
+def fetch_data_using_sql_query(user_id: int, query: str) -> str:
+    """
+    Fetches data from the database using a SQL query (T-SQL, see the database schema).
+    :param user_id: The ID of the user the query is about; the query must only read that user's data.
+    :param query: The SQL query to execute.
+    :return: The rows returned by the query as {"ResultSets": {"Table1": [rows]}}, or an error.
+    :rtype: str
+    """
+    return query_service.fetch(user_id, query)
+
+# The whole analysis catalog from one fetch of the user's transactions, computed in memory
+analytics_service = AnalyticsService(pool, storage, cache=query_cache,
+                                     default_months=int(os.getenv("ANALYTICS_DEFAULT_MONTHS", "24")))
+
+def analyze_transactions(user_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+    """
+    Computes every standard analysis of the user's transactions in a date range in one call: totals, top
+    categories and distribution of expenses and income, monthly evolution and net balance with deficit and
+    unusual months, budget compliance, spending by day of the week, transaction frequency, outlier
+    transactions, projection of the current month and year-over-year comparison.
+    :param user_id: The ID of the user.
+    :param start_date: First day of the range (YYYY-MM-DD), by default the first day of the month 24 months ago.
+    :param end_date: Last day of the range (YYYY-MM-DD), by default today.
+    :return: A JSON summary with one section per analysis, or an error.
+    :rtype: str
+    """
+    return analytics_service.analyze(user_id, start_date, end_date)
+
+# Statically defined tools of each agent for fast reference
+transactions_functions: Set[Callable[..., Any]] = {
+    get_user_accounts,
+    get_transaction_categories,
+    import_bank_statement,
+    record_transaction,
+    fetch_data_using_sql_query,
+}
+
+analyzer_functions: Set[Callable[..., Any]] = {
+    fetch_data_using_sql_query,
+    analyze_transactions,
+}
+
+# Blocking calls run on a dedicated executor as large as the connection pool, so tool calls
+# from many runs overlap their I/O without blocking the event loop
+db_executor = DatabaseExecutor(max_workers=pool.max_size)
+
+# Async versions for AsyncFunctionTool and kernel plugins, same names and docstrings as the functions above
+async_transactions_functions: Set[Callable[..., Awaitable[str]]] = {
+    db_executor.wrap(function) for function in transactions_functions
+}
+
+async_analyzer_functions: Set[Callable[..., Awaitable[str]]] = {
+    db_executor.wrap(function) for function in analyzer_functions
+}
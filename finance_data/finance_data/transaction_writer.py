@@ -0,0 +1,185 @@
+import time
+import logging
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+from dataclasses import dataclass, field
+
+from .statement_import import INSERT_TRANSACTION_SQL
+from .duplicates import DuplicateDetector, Fingerprint
+from .outliers import OutlierDetector
+from .budget_alerts import BudgetAlertEvaluator, add_expenses
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_TYPES = {"Income", "Expense", "Transfer", "Investment"}
+
+# DECIMAL(10, 2)
+MAX_AMOUNT = Decimal("99999999.99")
+
+@dataclass
+class WriteMetrics:
+    writes: int = 0
+    rows: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    outliers: int = 0
+    alerts: int = 0
+    latencies_ms: list[float] = field(default_factory=list)
+
+    def record(self, rows: int, latency_ms: float) -> None:
+        self.writes += 1
+        self.rows += rows
+        # Keep the most recent writes only
+        self.latencies_ms = self.latencies_ms[-999:] + [latency_ms]
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def parse_transaction_date(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    # fromisoformat only accepts the Z suffix from Python 3.11
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(text)
+    return parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def as_id(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+# Inserts one transaction and returns its ID, which the fingerprint and the outlier flag reference.
+# OUTPUT without INTO is not allowed on tables with triggers, so Azure SQL reads SCOPE_IDENTITY() in the same batch.
+INSERT_RETURNING_ID_SQL = {
+    "tsql": "SET NOCOUNT ON; " + INSERT_TRANSACTION_SQL.strip() + "; SELECT CAST(SCOPE_IDENTITY() AS INT)",
+    "sqlite": INSERT_TRANSACTION_SQL.rstrip() + " RETURNING Id",
+}
+
+# One round trip for the ownership checks of a call
+OWNED_IDS_SQL = """
+SELECT 'Account', Id FROM Accounts WHERE UserId = ?
+UNION ALL
+SELECT 'Category', Id FROM Categories WHERE UserId = ?
+"""
+
+class TransactionWriter:
+    """
+    Validates transactions and inserts them through the connection pool in one database
+    transaction: either every row of a call is recorded or none (e.g. the items of a receipt).
+    Field names follow the RecordTransactionRequest of the Logic App the tool replaces.
+    """
+
+    def __init__(self, pool, dialect: str = "tsql", duplicates: DuplicateDetector | None = None,
+                 outliers: OutlierDetector | None = None, alerts: BudgetAlertEvaluator | None = None):
+        self.pool = pool
+        self.dialect = dialect
+        self.duplicates = duplicates
+        self.outliers = outliers
+        self.alerts = alerts
+        self.metrics = WriteMetrics()
+
+    def validate(self, user_id: int, transactions: list[dict], account_ids: set, category_ids: set) -> tuple[list[tuple], list[str]]:
+        rows, errors = [], []
+        for index, transaction in enumerate(transactions, start=1):
+            problems = []
+            if not isinstance(transaction, dict):
+                errors.append(f"Transaction {index}: expected an object")
+                continue
+            type = str(transaction.get("Type", "")).strip().capitalize()
+            if type not in TRANSACTION_TYPES:
+                problems.append(f"Type must be one of {', '.join(sorted(TRANSACTION_TYPES))}")
+            account_id = as_id(transaction.get("AccountId"))
+            if account_id not in account_ids:
+                problems.append(f"AccountId {transaction.get('AccountId')} is not an account of user {user_id}")
+            category_id = as_id(transaction.get("CategoryId"))
+            if category_id not in category_ids:
+                problems.append(f"CategoryId {transaction.get('CategoryId')} is not a category of user {user_id}")
+            try:
+                amount = Decimal(str(transaction.get("Amount"))).quantize(Decimal("0.01"))
+                # The Type says which way the money went, so amounts are never negative
+                if amount <= 0 or amount > MAX_AMOUNT:
+                    problems.append(f"Amount must be between 0.01 and {MAX_AMOUNT}")
+            except (InvalidOperation, ValueError):
+                problems.append(f"Amount {transaction.get('Amount')!r} is not a number")
+            try:
+                date = parse_transaction_date(transaction.get("Date"))
+            except (TypeError, ValueError):
+                problems.append(f"Date {transaction.get('Date')!r} is not an ISO 8601 date")
+            description = str(transaction.get("Description") or "").strip()
+            if not description or len(description) > 1000:
+                problems.append("Description is required (up to 1000 characters)")
+            attachment_url = transaction.get("AttachmentUrl") or None
+            if attachment_url and len(attachment_url) > 255:
+                problems.append("AttachmentUrl is longer than 255 characters")
+
+            if problems:
+                errors.append(f"Transaction {index}: " + "; ".join(problems))
+            else:
+                rows.append((type, account_id, category_id, user_id, date, amount, description, attachment_url))
+        return rows, errors
+
+    def record(self, user_id: int, transactions: list[dict], allow_duplicates: bool = False) -> dict:
+        start = time.perf_counter()
+        if not transactions:
+            return {"Result": "Error", "errors": ["No transactions to record"]}
+
+        with self.pool.connection() as conn:
+            owned = conn.execute(OWNED_IDS_SQL, (user_id, user_id)).fetchall()
+            account_ids = {row[1] for row in owned if row[0] == "Account"}
+            category_ids = {row[1] for row in owned if row[0] == "Category"}
+            rows, errors = self.validate(user_id, transactions, account_ids, category_ids)
+            # Nothing was written, but the reads above opened a transaction on the pooled connection
+            if errors:
+                conn.rollback()
+                self.metrics.rejected += 1
+                return {"Result": "Error", "errors": errors}
+            outliers = []
+            if self.duplicates is None and self.outliers is None:
+                conn.executemany(INSERT_TRANSACTION_SQL, rows)
+            else:
+                fingerprints = None
+                if self.duplicates is not None:
+                    fingerprints = [Fingerprint.of(user_id, row[4], row[5], row[6], row[7]) for row in rows]
+                    if not allow_duplicates:
+                        duplicates = self.find_duplicates(conn, fingerprints)
+                        if duplicates:
+                            conn.rollback()
+                            self.metrics.duplicates += 1
+                            return {"Result": "PossibleDuplicate", "duplicates": duplicates,
+                                    "message": "Nothing was recorded. Ask the user whether these are new transactions; "
+                                               "if so, call record_transaction again with allow_duplicates set to true."}
+                ids = self.insert_returning_ids(conn, rows)
+                if fingerprints is not None:
+                    self.duplicates.add(conn, list(zip(ids, fingerprints)))
+                if self.outliers is not None:
+                    outliers = self.outliers.observe(conn, list(zip(ids, rows)))
+                    self.metrics.outliers += len(outliers)
+            if self.alerts is not None:
+                self.metrics.alerts += len(self.alerts.evaluate(conn, add_expenses({}, rows)))
+            conn.commit()
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.metrics.record(len(rows), latency_ms)
+        logger.info(f"Recorded {len(rows)} transactions for user {user_id} in {latency_ms:.1f} ms")
+        result = {"Result": "Success", "recorded": len(rows), "latency_ms": round(latency_ms, 1)}
+        if outliers:
+            result["outliers"] = outliers
+            result["message"] = "Recorded. These amounts are unusually high for their category; mention it to the user."
+        return result
+
+    def find_duplicates(self, conn, fingerprints: list[Fingerprint]) -> list[dict]:
+        duplicates = []
+        for index, fingerprint in enumerate(fingerprints, start=1):
+            for existing in self.duplicates.find(conn, fingerprint):
+                duplicates.append({"transaction": index, "existing": existing})
+        return duplicates
+
+    def insert_returning_ids(self, conn, rows: list[tuple]) -> list[int]:
+        sql = INSERT_RETURNING_ID_SQL[self.dialect]
+        return [conn.execute(sql, row).fetchone()[0] for row in rows]
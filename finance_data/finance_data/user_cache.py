@@ -0,0 +1,84 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+@dataclass
+class CacheEntry:
+    payload: str
+    version: int
+    expires_at: float
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hit_ratio, 3),
+        }
+
+class UserDataCache:
+    """
+    Read-through cache of pre-serialized JSON payloads per user (accounts, categories...).
+
+    Every user has a version number that invalidate() increments. A payload loaded while the
+    version changed is returned but not stored, so a write racing with a read can't leave stale
+    data behind. The TTL only covers writes made elsewhere that nobody reported.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self.metrics = CacheMetrics()
+        self._entries: dict[tuple[int, Hashable], CacheEntry] = {}
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get_or_load(self, user_id: int, key: Hashable, load: Callable[[], str]) -> str:
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.setdefault(user_id, 0)
+            entry = self._entries.get((user_id, key))
+            if entry is not None and entry.version == version:
+                if entry.expires_at > now:
+                    self.metrics.hits += 1
+                    return entry.payload
+                self.metrics.expirations += 1
+            self.metrics.misses += 1
+
+        payload = load()
+
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._entries[(user_id, key)] = CacheEntry(payload, version, time.monotonic() + self.ttl_seconds)
+        return payload
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop every payload of the user, call it after a write to the user's accounts or categories."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == user_id]:
+                del self._entries[cache_key]
+            self.metrics.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for user_id in self._versions:
+                self._versions[user_id] += 1
+            self._entries.clear()